@@ -0,0 +1,63 @@
+"""
+Compare the time to read the bundled data files, and a generated instance
+with 2000 nodes, from JSON and from the binary instance format, see
+mpa.utilities.file_utils.write_instance.
+
+Run from the repository root: python benchmarks/instance_store.py
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from mpa.utilities.file_utils import convert_json, read_json, write_json
+
+FILES = [
+    "src/mpa/ruteplanlægning/7_3_big_data.json",
+    "src/mpa/aflevering_2/full_data.json",
+]
+
+
+def random_instance(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    coords = rng.uniform(0, 100, (n + 1, 2))
+    dist = np.linalg.norm(coords[:, None] - coords[None, :], axis=2)
+    return {"n": n, "dist": dist.tolist(), "q": rng.integers(1, 20, n + 1).tolist()}
+
+
+def timed_read(path: str, prefer_binary: bool, repeats: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        read_json(path, prefer_binary=prefer_binary)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    print(
+        f"{'instance':<26}{'JSON (MB)':>11}{'binary (MB)':>13}{'JSON (s)':>10}{'binary (s)':>12}"
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        # Convert copies, so no binary files are left next to the bundled files
+        paths = []
+        for path in FILES:
+            paths.append(os.path.join(folder, os.path.basename(path)))
+            shutil.copy(path, paths[-1])
+        paths.append(os.path.join(folder, "random_2000.json"))
+        write_json(random_instance(2000), paths[-1], indent=None)
+
+        for path in paths:
+            binary = convert_json(path)
+            print(
+                f"{os.path.basename(path):<26}"
+                f"{os.path.getsize(path) / 2**20:>11.2f}"
+                f"{os.path.getsize(binary) / 2**20:>13.2f}"
+                f"{timed_read(path, prefer_binary=False):>10.4f}"
+                f"{timed_read(path, prefer_binary=True):>12.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare the formulations of the setup constraints of the lot sizing models
+(see FORMULATIONS in 5_2_0_ULS.py and 5_3_0_MPS.py) on generated 52 and 104
+week instances: the bound of the LP relaxation, the objective and gap of the
+MIP within the time limit, and the build and solve times. The root gap is
+the gap between the LP bound and the best solution found. The records are
+appended to benchmarks/lot_sizing_formulations.jsonl.
+
+Run from the repository root: python benchmarks/lot_sizing_formulations.py
+"""
+
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.instance_generator import lot_sizing_instance
+from mpa.utilities.model_utils import SolveRecorder
+
+PRODUCTION_PATH = "src/mpa/produktionsplanlægning/"
+
+# The name, script, number of periods and number of products of each case
+CASES = [
+    ("ULS 52", "5_2_0_ULS.py", 52, 1),
+    ("ULS 104", "5_2_0_ULS.py", 104, 1),
+    ("MPS 52 x 5", "5_3_0_MPS.py", 52, 5),
+    ("MPS 104 x 5", "5_3_0_MPS.py", 104, 5),
+]
+
+
+def lp_bound(model: pyomo.ConcreteModel(), solver: str) -> float:
+    relax = pyomo.TransformationFactory("core.relax_integer_vars")
+    reverse = relax.apply_to(model)
+    try:
+        pyomo.SolverFactory(solver).solve(model)
+        bound = pyomo.value(model.obj)
+    finally:
+        relax.apply_to(model, reverse=reverse)
+
+    return bound
+
+
+def main(
+    solver: str = "appsi_highs",
+    timelimit: float = 60,
+    seed: int = 1,
+    path: str = "benchmarks/lot_sizing_formulations.jsonl",
+):
+    print(
+        f"{'case':<14}{'formulation':<20}{'LP bound':>16}{'objective':>16}"
+        f"{'root gap':>10}{'gap':>9}{'build':>8}{'solve':>8}"
+    )
+    for name, script_name, T, products in CASES:
+        script = load_script(PRODUCTION_PATH + script_name)
+        data = lot_sizing_instance(T, products, seed=seed)
+
+        for formulation in script.FORMULATIONS:
+            recorder = SolveRecorder(path, case=name, formulation=formulation)
+            model = recorder.build(script.build_model, data, formulation)
+            with recorder.phase("lp"):
+                bound = lp_bound(model, solver)
+            recorder.solve(model, solver=solver, timelimit=timelimit)
+            record = recorder.finish(lp_bound=bound)
+
+            objective = record["objective"]
+            root_gap = (objective - bound) / objective if objective else None
+            print(
+                f"{name:<14}{formulation:<20}{bound:>16,.0f}"
+                f"{_format(objective, ',.0f'):>16}{_format(root_gap, '.2%'):>10}"
+                f"{_format(record['gap'], '.2%'):>9}"
+                f"{record['phases']['build']['wall']:>8.2f}"
+                f"{record['phases']['solve']['wall']:>8.2f}"
+            )
+
+
+def _format(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare the time to build the CVRP one-commodity flow model and write it as an LP
+file with the generalized bounds added through a ConstraintList, with the
+generalized bounds added through the sparse matrix builder, and with the whole
+model assembled as a sparse matrix and written straight to the LP file.
+
+Run from the repository root: python benchmarks/matrix_builder.py
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from mpa.utilities.file_utils import load_script, read_json
+
+CVRP_OCF_PATH = "src/mpa/ruteplanlægning/7_4_3_CVRP_One_commodity_flow.py"
+
+
+def random_instance(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    q = [0] + rng.integers(1, 30, n).tolist()
+    return {
+        "n": n,
+        "m": max(1, sum(q) // 150 + 1),
+        "q": q,
+        "Q": 160,
+        "dist": rng.uniform(0, 100, (n + 1, n + 1)).round(2).tolist(),
+    }
+
+
+def main():
+    script = load_script(CVRP_OCF_PATH)
+    instances = {
+        "n_50": read_json("src/mpa/ruteplanlægning/7_4_CVRP_n_50_data.json"),
+        "n_100 (random)": random_instance(100),
+        "n_200 (random)": random_instance(200),
+    }
+
+    print(
+        f"{'instance':<16}{'ConstraintList':>16}{'matrix':>10}{'direct LP':>12}"
+        "  (build + LP write, seconds)"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "model.lp")
+        for name, data in instances.items():
+            times = []
+            for matrix_form in [False, True]:
+                start = time.perf_counter()
+                model = script.build_model(data, matrix_form=matrix_form)
+                model.write(path)
+                times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            script.write_lp_model(data, path)
+            times.append(time.perf_counter() - start)
+
+            print(f"{name:<16}{times[0]:>16.2f}{times[1]:>10.2f}{times[2]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Record where the time goes for the routing models: building the model,
+writing it for the solver, solving and loading the solution, see
+mpa.utilities.model_utils.SolveRecorder. The records are appended to
+benchmarks/solve_phases.jsonl.
+
+Run from the repository root: python benchmarks/solve_phases.py
+"""
+
+from mpa.utilities.file_utils import load_script, read_json
+from mpa.utilities.model_utils import SolveRecorder
+
+ROUTING_PATH = "src/mpa/ruteplanlægning/"
+CASES = [
+    ("7_4_2_CVRP_MTZ.py", "7_4_CVRP_n_29_data.json"),
+    ("7_4_2_CVRP_MTZ.py", "7_4_CVRP_n_50_data.json"),
+    ("7_4_3_CVRP_One_commodity_flow.py", "7_4_CVRP_n_29_data.json"),
+    ("7_4_3_CVRP_One_commodity_flow.py", "7_4_CVRP_n_50_data.json"),
+]
+
+
+def main(
+    solver: str = "appsi_highs",
+    timelimit: float = 10,
+    path: str = "benchmarks/solve_phases.jsonl",
+):
+    print(
+        f"{'model':<36}{'instance':<26}{'build':>8}{'write':>8}"
+        f"{'solve':>8}{'load':>8}{'nonzeros':>10}"
+    )
+    for script_name, data_name in CASES:
+        script = load_script(ROUTING_PATH + script_name)
+        data = read_json(ROUTING_PATH + data_name)
+
+        recorder = SolveRecorder(path, model=script_name, instance=data_name)
+        model = recorder.build(script.build_model, data)
+        recorder.solve(model, solver=solver, timelimit=timelimit)
+        record = recorder.finish()
+
+        times = [
+            record["phases"].get(phase, {}).get("wall", 0)
+            for phase in ["build", "write", "solve", "load"]
+        ]
+        print(
+            f"{script_name:<36}{data_name:<26}"
+            + "".join(f"{t:>8.2f}" for t in times)
+            + f"{record['nonzeros']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
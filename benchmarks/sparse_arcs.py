@@ -0,0 +1,49 @@
+"""
+Compare the size and build time of the routing models over all arcs with the
+models over the k nearest neighbours of each node (plus all depot arcs).
+
+Run from the repository root: python benchmarks/sparse_arcs.py
+"""
+
+import time
+
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import load_script
+
+ROUTING_PATH = "src/mpa/ruteplanlægning/"
+CASES = [
+    ("7_3_1_mTSP_MTZ.py", "7_3_big_data.json"),
+    ("7_3_2_mTSP_One_commodity_flow.py", "7_3_big_data.json"),
+    ("7_4_2_CVRP_MTZ.py", "7_4_CVRP_n_50_data.json"),
+    ("7_4_3_CVRP_One_commodity_flow.py", "7_4_CVRP_n_50_data.json"),
+]
+
+
+def model_size(model: pyomo.ConcreteModel) -> tuple:
+    variables = sum(1 for _ in model.component_data_objects(pyomo.Var))
+    constraints = sum(1 for _ in model.component_data_objects(pyomo.Constraint))
+    return variables, constraints
+
+
+def main(k_values: tuple = (None, 10, 5)):
+    print(
+        f"{'model':<36}{'instance':<26}{'k':>5}{'variables':>11}"
+        f"{'constraints':>13}{'build (s)':>11}"
+    )
+    for script_name, data_name in CASES:
+        script = load_script(ROUTING_PATH + script_name)
+        data = script.read_data(ROUTING_PATH + data_name)
+        for k in k_values:
+            start = time.perf_counter()
+            model = script.build_model(data, k=k)
+            build_time = time.perf_counter() - start
+            variables, constraints = model_size(model)
+            print(
+                f"{script_name:<36}{data_name:<26}{str(k or 'all'):>5}"
+                f"{variables:>11}{constraints:>13}{build_time:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
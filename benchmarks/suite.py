@@ -0,0 +1,254 @@
+"""
+Run every formulation on the bundled instances with HiGHS, record the build
+time, solve time, objective and gap of each, and compare them with the stored
+baseline in benchmarks/baseline.json.
+
+A case regresses when it builds more than time_tolerance slower (and at
+least min_seconds slower) than in the baseline. A case solved to optimality
+in the baseline also regresses when it is no longer solved to optimality,
+its objective is worse, its gap is larger or it solves slower. The cases
+stopped by the time limit are not compared on the solution, since how far
+the solver gets within the limit varies from run to run. The times of the
+baseline depend on the machine it was recorded on, so record a new baseline
+on the machine the suite is run on before relying on the time checks.
+
+Run from the repository root:
+    python benchmarks/suite.py                    # compare with the baseline
+    python benchmarks/suite.py --update-baseline  # store the results as the baseline
+"""
+
+import sys
+import time
+
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import load_script, read_json, write_json
+from mpa.utilities.model_utils import SolveRecorder
+
+ROUTING_PATH = "src/mpa/ruteplanlægning/"
+LOCATION_PATH = "src/mpa/lokationsplanlægning_og_netværksdesign/"
+STOCHASTIC_PATH = "src/mpa/stokastisk_optimering/"
+FLP_DATA = STOCHASTIC_PATH + "9_1_data.json"
+LOCATION_DATA = "src/mpa/aflevering_2/full_data.json"
+BASELINE_PATH = "benchmarks/baseline.json"
+RESULTS_PATH = "benchmarks/results.jsonl"
+
+
+def routing_data(name: str):
+    return lambda script: read_json(ROUTING_PATH + name)
+
+
+def flp_data(numScenarios: int):
+    return lambda script: script.read_data(FLP_DATA, numScenarios)
+
+
+def location_data(weighted: bool):
+    # The municipalities are both the candidate sites and the customers. The
+    # p-median weighs the distances by the inhabitants, the p-center does not
+    def read(script):
+        data = read_json(LOCATION_DATA)
+        c = [
+            [
+                distance * (inhabitants if weighted else 1)
+                for distance, inhabitants in zip(row, data["inhab2022"])
+            ]
+            for row in data["distances"]
+        ]
+        municipalities = data["municipalities"]
+        return {"I": municipalities, "J": municipalities, "c": c, "p": data["p"]}
+
+    return read
+
+
+# The name, script, data and extra build_model arguments of each case
+CASES = [
+    ("TSP DFJ", ROUTING_PATH + "7_2_0_TSP_DFJ.py", routing_data("7_2_data.json"), {"lazy": True}),
+    ("TSP MTZ", ROUTING_PATH + "7_2_1_TSP_MTZ.py", routing_data("7_2_data.json"), {}),
+    ("TSP OCF", ROUTING_PATH + "7_2_2_TSP_One_commodity_flow.py", routing_data("7_2_data.json"), {}),
+    ("mTSP MTZ small", ROUTING_PATH + "7_3_1_mTSP_MTZ.py", routing_data("7_3_small_data.json"), {}),
+    ("mTSP OCF small", ROUTING_PATH + "7_3_2_mTSP_One_commodity_flow.py", routing_data("7_3_small_data.json"), {}),
+    ("mTSP MTZ big", ROUTING_PATH + "7_3_1_mTSP_MTZ.py", routing_data("7_3_big_data.json"), {}),
+    ("mTSP OCF big", ROUTING_PATH + "7_3_2_mTSP_One_commodity_flow.py", routing_data("7_3_big_data.json"), {}),
+    *[
+        (f"CVRP {formulation} {n}", ROUTING_PATH + script, routing_data(f"7_4_CVRP_{n}_data.json"), {})
+        for n in ["n_29", "n_39", "n_50"]
+        for formulation, script in [("MTZ", "7_4_2_CVRP_MTZ.py"), ("OCF", "7_4_3_CVRP_One_commodity_flow.py")]
+    ],
+    ("FLP two-stage", STOCHASTIC_PATH + "two_stage/9_1_two_stage_stochastic_program.py", flp_data(10), {}),
+    ("FLP chance single", STOCHASTIC_PATH + "chance_constrained/single/9_1_FLP_chance_constrained_single.py", flp_data(10), {"alpha": 0.9}),
+    ("FLP chance joint", STOCHASTIC_PATH + "chance_constrained/joint/9_1_FLP_chance_constrained_joint.py", flp_data(10), {"alpha": 0.9}),
+    ("p-median", LOCATION_PATH + "4_2_1_p-median.py", location_data(weighted=True), {}),
+    ("p-center", LOCATION_PATH + "4_2_2_p-center.py", location_data(weighted=False), {}),
+]  # fmt: skip
+
+
+def run_case(
+    case: tuple, recorder: SolveRecorder, solver: str, timelimit: float
+) -> dict:
+    name, path, read_data, build_args = case
+    script = load_script(path)
+    data = read_data(script)
+
+    model = recorder.build(script.build_model, data, **build_args)
+    lazy = None
+    if build_args.get("lazy"):
+        # The SECs of the DFJ model are separated between solves
+        with recorder.phase("solve"):
+            lazy = script.solve_model_lazy(model, solver=solver)
+    else:
+        recorder.solve(model, solver=solver, timelimit=timelimit)
+
+    objective = next(model.component_data_objects(pyomo.Objective, active=True))
+    fields = {
+        "case": name,
+        "sense": "minimize" if objective.is_minimizing() else "maximize",
+    }
+    if lazy is not None:
+        optimal = lazy["termination"] == "optimal"
+        fields.update(
+            termination=lazy["termination"],
+            objective=pyomo.value(objective),
+            gap=0.0 if optimal else None,
+        )
+
+    return recorder.finish(**fields)
+
+
+def run(
+    cases: list = CASES,
+    solver: str = "appsi_highs",
+    timelimit: float = 30,
+    path: str = RESULTS_PATH,
+) -> list:
+    """
+    Run the benchmark cases.
+
+    Parameters:
+    cases (list, optional): The cases, see CASES. Defaults to CASES.
+    solver (str, optional): The solver. Defaults to "appsi_highs".
+    timelimit (float, optional): The time limit of each solve in seconds. Defaults to 30.
+    path (str, optional): The JSON-lines file the records are appended to. Defaults to RESULTS_PATH.
+
+    Returns:
+    list: The records, see model_utils.SolveRecorder.
+    """
+    recorder = SolveRecorder(
+        path, run=time.strftime("%Y-%m-%d %H:%M:%S"), timelimit=timelimit
+    )
+    records = []
+    for case in cases:
+        record = run_case(case, recorder, solver, timelimit)
+        records.append(record)
+        print(
+            f"{record['case']:<22}{record['phases']['build']['wall']:>8.2f}"
+            f"{record['phases']['solve']['wall']:>9.2f}{_format(record['objective']):>16}"
+            f"{_format(record['gap'], '.2%'):>9}  {record['termination']}"
+        )
+
+    return records
+
+
+def summarize(record: dict) -> dict:
+    # The fields of a record that are stored in the baseline
+    return {
+        "build": round(record["phases"]["build"]["wall"], 4),
+        "solve": round(record["phases"]["solve"]["wall"], 4),
+        "objective": record["objective"],
+        "gap": record["gap"],
+        "termination": record["termination"],
+        "sense": record["sense"],
+    }
+
+
+def compare(
+    records: list,
+    baseline: dict,
+    objective_tolerance: float = 1e-4,
+    gap_tolerance: float = 0.01,
+    time_tolerance: float = 0.5,
+    min_seconds: float = 0.5,
+) -> list:
+    """
+    Compare the records of a run with the baseline.
+
+    Parameters:
+    records (list): The records of the run.
+    baseline (dict): The summary of each case, see summarize.
+    objective_tolerance (float, optional): The relative worsening of the objective allowed, e.g. within the MIP gap tolerance of the solver. Defaults to 1e-4.
+    gap_tolerance (float, optional): The absolute increase of the gap allowed. Defaults to 0.01.
+    time_tolerance (float, optional): The relative increase of the build and solve times allowed. Defaults to 0.5.
+    min_seconds (float, optional): The increase of a time in seconds below which it is never flagged. Defaults to 0.5.
+
+    Returns:
+    list: A message for each regression.
+    """
+    regressions = []
+    for record in records:
+        name, new = record["case"], summarize(record)
+        old = baseline.get(name)
+        if old is None:
+            print(f"{name}: not in the baseline")
+            continue
+
+        # The solutions found within a time limit vary from run to run, so only
+        # the cases solved to optimality are compared on objective, gap and solve time
+        optimal = old["termination"] == "optimal"
+        if optimal and new["termination"] != "optimal":
+            regressions.append(f"{name}: {new['termination']} (was optimal)")
+
+        if optimal:
+            sign = 1 if new["sense"] == "minimize" else -1
+            worse = new["objective"] is None or sign * (
+                new["objective"] - old["objective"]
+            ) > objective_tolerance * max(1, abs(old["objective"]))
+            if worse:
+                regressions.append(
+                    f"{name}: objective {_format(new['objective'])} (was {_format(old['objective'])})"
+                )
+
+            if new["gap"] is None or new["gap"] > old["gap"] + gap_tolerance:
+                regressions.append(
+                    f"{name}: gap {_format(new['gap'], '.2%')} (was {_format(old['gap'], '.2%')})"
+                )
+
+        for phase in ["build", "solve"] if optimal else ["build"]:
+            slower = new[phase] - old[phase]
+            if slower > min_seconds and new[phase] > (1 + time_tolerance) * old[phase]:
+                regressions.append(
+                    f"{name}: {phase} time {new[phase]:.2f} seconds (was {old[phase]:.2f})"
+                )
+
+    return regressions
+
+
+def main(
+    update_baseline: bool = False, solver: str = "appsi_highs", timelimit: float = 30
+) -> list:
+    print(
+        f"{'case':<22}{'build':>8}{'solve':>9}{'objective':>16}{'gap':>9}  termination"
+    )
+    records = run(solver=solver, timelimit=timelimit)
+
+    if update_baseline:
+        write_json(
+            {record["case"]: summarize(record) for record in records}, BASELINE_PATH
+        )
+        print(f"Baseline written to {BASELINE_PATH}")
+        return []
+
+    regressions = compare(records, read_json(BASELINE_PATH))
+    for regression in regressions:
+        print("REGRESSION", regression)
+    if not regressions:
+        print("No regressions")
+
+    return regressions
+
+
+def _format(value, spec: str = ".4f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+if __name__ == "__main__":
+    regressions = main(update_baseline="--update-baseline" in sys.argv)
+    sys.exit(1 if regressions else 0)
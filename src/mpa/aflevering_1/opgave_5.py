@@ -1,15 +1,17 @@
+import numpy as np
 import pyomo.environ as pyomo
 
+from mpa.utilities.distance_cache import cached_distance_matrix
 from mpa.utilities.file_utils import read_json
-from mpa.utilities.support_functions import make_lp_morm_distance_matrix
 
 
 def read_data(path: str) -> dict:
     data = read_json(path)
 
-    euclidian_dist_matrix = make_lp_morm_distance_matrix(
-        data,
-        keys=["murder", "assault", "urbanPop", "rape"],
+    euclidian_dist_matrix = cached_distance_matrix(
+        np.column_stack(
+            [data[key] for key in ["murder", "assault", "urbanPop", "rape"]]
+        ),
         p=2,
     )
 
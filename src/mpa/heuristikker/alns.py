@@ -0,0 +1,533 @@
+# Adaptive large neighbourhood search (ALNS) for the CVRP, for instances far
+# beyond what the MILPs in ruteplanlægning can solve. Each iteration removes a
+# number of customers with a destroy operator, inserts them again with a
+# repair operator, and accepts the new solution with simulated annealing. The
+# operators are chosen by roulette wheel with weights that adapt to how often
+# each operator has led to new best, improving or accepted solutions.
+
+import time
+from typing import List
+
+import numpy as np
+
+from mpa.heuristikker.construction import clarke_wright, merge_routes
+from mpa.heuristikker.local_search import two_opt
+from mpa.utilities.file_utils import read_json
+from mpa.utilities.plot_utils import plot_series, render
+
+# The scores of an iteration: a new best solution, a better solution than the
+# current one, and an accepted worse solution
+SCORES = (33, 9, 13)
+
+
+class Solution:
+    """
+    A set of routes with the load and length of each route kept up to date as customers are removed and inserted.
+
+    Empty routes are unused vehicles.
+    """
+
+    __slots__ = ("routes", "loads", "costs", "route_of", "dist", "q", "Q")
+
+    def __init__(self, routes: List[list], dist: np.ndarray, q: np.ndarray, Q: float):
+        """
+        Set up the bookkeeping of a set of routes.
+
+        Parameters:
+        routes (List[list]): The routes as lists of customers, see construction.py. Empty routes are allowed.
+        dist (np.ndarray): The distance matrix.
+        q (np.ndarray): The demand of each node.
+        Q (float): The vehicle capacity.
+        """
+        self.routes = [list(route) for route in routes]
+        self.dist = dist
+        self.q = q
+        self.Q = Q
+        self.loads = np.array([q[route].sum() for route in self.routes], dtype=float)
+        self.costs = np.array([self._route_cost(r) for r in range(len(routes))])
+        self.route_of = np.full(len(dist), -1, dtype=np.int64)
+        for r, route in enumerate(self.routes):
+            self.route_of[route] = r
+
+    def copy(self) -> "Solution":
+        """
+        Copy the solution, sharing the distances, demands and capacity.
+
+        Returns:
+        Solution: The copy.
+        """
+        solution = Solution.__new__(Solution)
+        solution.routes = [list(route) for route in self.routes]
+        solution.loads = self.loads.copy()
+        solution.costs = self.costs.copy()
+        solution.route_of = self.route_of.copy()
+        solution.dist = self.dist
+        solution.q = self.q
+        solution.Q = self.Q
+        return solution
+
+    @property
+    def cost(self) -> float:
+        return float(self.costs.sum())
+
+    def remove(self, c: int):
+        """
+        Remove a customer from its route.
+
+        Parameters:
+        c (int): The customer.
+        """
+        r = self.route_of[c]
+        route = self.routes[r]
+        p = route.index(c)
+        a = route[p - 1] if p > 0 else 0
+        b = route[p + 1] if p + 1 < len(route) else 0
+        d = self.dist
+        self.costs[r] += d[a, b] - d[a, c] - d[c, b]
+        self.loads[r] -= self.q[c]
+        del route[p]
+        self.route_of[c] = -1
+
+    def insert(self, c: int, r: int, p: int):
+        """
+        Insert a customer into a route.
+
+        Parameters:
+        c (int): The customer.
+        r (int): The route.
+        p (int): The position in the route, 0 being right after the depot.
+        """
+        route = self.routes[r]
+        a = route[p - 1] if p > 0 else 0
+        b = route[p] if p < len(route) else 0
+        d = self.dist
+        self.costs[r] += d[a, c] + d[c, b] - d[a, b]
+        self.loads[r] += self.q[c]
+        route.insert(p, c)
+        self.route_of[c] = r
+
+    def add_route(self):
+        """
+        Add an empty route.
+        """
+        self.routes.append([])
+        self.loads = np.append(self.loads, 0.0)
+        self.costs = np.append(self.costs, 0.0)
+
+    def improve_route(self, r: int):
+        """
+        Improve a route with 2-opt, see local_search.two_opt.
+
+        Parameters:
+        r (int): The route.
+        """
+        self.routes[r], gain = two_opt(self.routes[r], self.dist)
+        self.costs[r] -= gain
+
+    def _route_cost(self, r: int) -> float:
+        nodes = np.array([0] + self.routes[r] + [0])
+        return float(self.dist[nodes[:-1], nodes[1:]].sum())
+
+
+# Destroy operators, removing count customers and returning them
+
+
+def random_removal(solution: Solution, count: int, rng: np.random.Generator) -> list:
+    customers = np.flatnonzero(solution.route_of >= 0)
+    removed = rng.choice(customers, size=min(count, len(customers)), replace=False)
+    for c in removed.tolist():
+        solution.remove(c)
+    return removed.tolist()
+
+
+def worst_removal(solution: Solution, count: int, rng: np.random.Generator) -> list:
+    # Remove the customers with the largest detours, with some randomness. The
+    # detours are computed once, before the removals
+    customers, saving = _removal_savings(solution)
+    order = customers[np.argsort(-saving, kind="stable")].tolist()
+    removed = []
+    for _ in range(min(count, len(order))):
+        c = order.pop(int(rng.random() ** 3 * len(order)))
+        solution.remove(c)
+        removed.append(c)
+    return removed
+
+
+def related_removal(solution: Solution, count: int, rng: np.random.Generator) -> list:
+    # Shaw removal: remove customers that are close to each other and have
+    # similar demands, so they can be inserted again in a different way
+    d, q = solution.dist, solution.q
+    customers = np.flatnonzero(solution.route_of >= 0)
+    removed = [int(rng.choice(customers))]
+    solution.remove(removed[0])
+    scale_d, scale_q = max(d.max(), 1e-9), max(q.max() - q.min(), 1e-9)
+    while len(removed) < count:
+        customers = np.flatnonzero(solution.route_of >= 0)
+        if len(customers) == 0:
+            break
+        seed = removed[rng.integers(len(removed))]
+        relatedness = (
+            d[seed, customers] / scale_d + np.abs(q[seed] - q[customers]) / scale_q
+        )
+        order = np.argsort(relatedness, kind="stable")
+        c = int(customers[order[int(rng.random() ** 6 * len(order))]])
+        solution.remove(c)
+        removed.append(c)
+    return removed
+
+
+def route_removal(solution: Solution, count: int, rng: np.random.Generator) -> list:
+    # Remove whole routes, starting with a random one, until count customers are removed
+    removed = []
+    used = [r for r, route in enumerate(solution.routes) if route]
+    for r in rng.permutation(used).tolist():
+        if len(removed) >= count:
+            break
+        for c in list(solution.routes[r]):
+            solution.remove(c)
+            removed.append(c)
+    return removed
+
+
+# Repair operators, inserting the removed customers again. They return False
+# if a customer does not fit in any route
+
+
+def greedy_insertion(
+    solution: Solution, customers: list, rng: np.random.Generator
+) -> bool:
+    return _insert(solution, customers, regret=1)
+
+
+def regret_2_insertion(
+    solution: Solution, customers: list, rng: np.random.Generator
+) -> bool:
+    return _insert(solution, customers, regret=2)
+
+
+def regret_3_insertion(
+    solution: Solution, customers: list, rng: np.random.Generator
+) -> bool:
+    return _insert(solution, customers, regret=3)
+
+
+DESTROY_OPERATORS = {
+    "random": random_removal,
+    "worst": worst_removal,
+    "related": related_removal,
+    "route": route_removal,
+}
+REPAIR_OPERATORS = {
+    "greedy": greedy_insertion,
+    "regret_2": regret_2_insertion,
+    "regret_3": regret_3_insertion,
+}
+
+
+def alns(
+    data: dict,
+    max_iterations: int = 10000,
+    time_limit: float = None,
+    seed: int = 1,
+    destroy_fraction: tuple = (0.02, 0.3),
+    max_destroy: int = 30,
+    start_temperature: float = 0.2,
+    end_temperature: float = 0.002,
+    segment_length: int = 100,
+    reaction: float = 0.1,
+    destroy_operators: dict = None,
+    repair_operators: dict = None,
+    verbose: bool = True,
+) -> dict:
+    """
+    Solve a CVRP with adaptive large neighbourhood search.
+
+    The search starts from the Clarke-Wright solution. The temperature of the
+    simulated annealing acceptance falls exponentially from the start to the
+    end temperature over the iteration or time budget, whichever is used up
+    first. With an iteration budget only, runs with the same seed give the
+    same result.
+
+    Parameters:
+    data (dict): The data, with "n", "q", "Q", "dist" and optionally "m" (the number of vehicles, else any number of vehicles can be used), see the CVRP data in ruteplanlægning.
+    max_iterations (int, optional): The number of iterations. Defaults to 10000.
+    time_limit (float, optional): The wall-clock budget in seconds. Defaults to None (no time limit).
+    seed (int, optional): The seed of the random number generator. Defaults to 1.
+    destroy_fraction (tuple, optional): The smallest and largest fraction of the customers to remove per iteration. Defaults to (0.02, 0.3).
+    max_destroy (int, optional): The largest number of customers to remove per iteration. Defaults to 30.
+    start_temperature (float, optional): The start temperature, as the worsening accepted with probability 1/2 relative to the average share of the cost that is destroyed and repaired. Defaults to 0.2.
+    end_temperature (float, optional): The end temperature, relative like start_temperature. Defaults to 0.002.
+    segment_length (int, optional): The number of iterations between updates of the operator weights. Defaults to 100.
+    reaction (float, optional): How fast the operator weights follow the scores of the last segment, between 0 and 1. Defaults to 0.1.
+    destroy_operators (dict, optional): The destroy operators by name. Defaults to None (DESTROY_OPERATORS).
+    repair_operators (dict, optional): The repair operators by name. Defaults to None (REPAIR_OPERATORS).
+    verbose (bool, optional): Whether to print the progress. Defaults to True.
+
+    Returns:
+    dict: The best "routes", their "cost", the number of "iterations", the "time" in seconds, the final operator "weights", and the convergence "trace" with one row per iteration (iteration, time, current cost, best cost).
+    """
+    start = time.time()
+    rng = np.random.default_rng(seed)
+    dist = np.asarray(data["dist"], dtype=np.float64)
+    q = np.asarray(data["q"], dtype=np.float64)
+    Q = data["Q"]
+    n = len(dist) - 1
+    destroy_operators = destroy_operators or DESTROY_OPERATORS
+    repair_operators = repair_operators or REPAIR_OPERATORS
+
+    # The initial solution, with a route slot for every vehicle
+    routes = clarke_wright(dist, q, Q)
+    fixedFleet = "m" in data
+    if fixedFleet:
+        routes = merge_routes(routes, dist, q, Q, data["m"])
+        if len(routes) > data["m"]:
+            print(
+                f"Using {len(routes)} routes, as the customers do not fit in {data['m']}"
+            )
+        routes += [[] for _ in range(data["m"] - len(routes))]
+    current = Solution(routes, dist, q, Q)
+    for r in range(len(routes)):
+        current.improve_route(r)
+    best = current.copy()
+
+    smallest = max(1, int(destroy_fraction[0] * n))
+    largest = max(smallest, min(max_destroy, int(destroy_fraction[1] * n)))
+
+    # The part of the cost that a destroy and repair changes on average
+    destroyedCost = (smallest + largest) / 2 / n
+
+    def temperature(progress: float) -> float:
+        # The temperature at which a worsening of w times the destroyed part of
+        # the cost is accepted with probability 1/2
+        w = start_temperature * (end_temperature / start_temperature) ** progress
+        return w * destroyedCost * best.cost / np.log(2)
+
+    destroyNames, repairNames = list(destroy_operators), list(repair_operators)
+    weights = {
+        "destroy": np.ones(len(destroyNames)),
+        "repair": np.ones(len(repairNames)),
+    }
+    scores = {kind: np.zeros(len(w)) for kind, w in weights.items()}
+    uses = {kind: np.zeros(len(w)) for kind, w in weights.items()}
+    trace = {"iteration": [], "time": [], "current": [], "best": []}
+
+    iteration = 0
+    while iteration < max_iterations:
+        elapsed = time.time() - start
+        if time_limit is not None and elapsed >= time_limit:
+            break
+        progress = iteration / max_iterations
+        if time_limit is not None:
+            progress = max(progress, elapsed / time_limit)
+
+        d = rng.choice(
+            len(destroyNames), p=weights["destroy"] / weights["destroy"].sum()
+        )
+        r = rng.choice(len(repairNames), p=weights["repair"] / weights["repair"].sum())
+
+        candidate = current.copy()
+        if not fixedFleet and all(candidate.routes):
+            # Without a fixed fleet there is always an empty route to insert into
+            candidate.add_route()
+        removed = destroy_operators[destroyNames[d]](
+            candidate, int(rng.integers(smallest, largest + 1)), rng
+        )
+        feasible = repair_operators[repairNames[r]](candidate, removed, rng)
+
+        score = 0
+        if feasible:
+            # Improve the routes that lost or got customers
+            touched = current.route_of[removed].tolist()
+            touched += candidate.route_of[removed].tolist()
+            for route in set(touched):
+                candidate.improve_route(route)
+            delta = candidate.cost - current.cost
+            if candidate.cost < best.cost - 1e-9:
+                score = SCORES[0]
+                best = candidate.copy()
+            elif delta < -1e-9:
+                score = SCORES[1]
+            if delta < -1e-9 or rng.random() < np.exp(-delta / temperature(progress)):
+                current = candidate
+                score = score or SCORES[2]
+
+        uses["destroy"][d] += 1
+        uses["repair"][r] += 1
+        scores["destroy"][d] += score
+        scores["repair"][r] += score
+
+        iteration += 1
+        trace["iteration"].append(iteration)
+        trace["time"].append(time.time() - start)
+        trace["current"].append(current.cost)
+        trace["best"].append(best.cost)
+
+        if iteration % segment_length == 0:
+            for kind in weights:
+                used = uses[kind] > 0
+                weights[kind][used] = (1 - reaction) * weights[kind][
+                    used
+                ] + reaction * (scores[kind][used] / uses[kind][used])
+                weights[kind] = np.maximum(weights[kind], 1e-3)
+                scores[kind][:] = 0
+                uses[kind][:] = 0
+            if verbose and iteration % (10 * segment_length) == 0:
+                print(
+                    f"Iteration {iteration}: current {current.cost:.2f}, "
+                    f"best {best.cost:.2f}, {trace['time'][-1]:.1f} seconds"
+                )
+
+    return {
+        "routes": [route for route in best.routes if route],
+        "cost": best.cost,
+        "iterations": iteration,
+        "time": time.time() - start,
+        "weights": {
+            **dict(zip(destroyNames, weights["destroy"].tolist())),
+            **dict(zip(repairNames, weights["repair"].tolist())),
+        },
+        "trace": {key: np.array(values) for key, values in trace.items()},
+    }
+
+
+def _removal_savings(solution: Solution):
+    # The customers in routes and the length saved by removing each of them
+    customers, tails, heads = [], [], []
+    for route in solution.routes:
+        if route:
+            nodes = [0] + route + [0]
+            customers += route
+            tails += nodes[:-2]
+            heads += nodes[2:]
+    customers, tails, heads = np.array(customers), np.array(tails), np.array(heads)
+    d = solution.dist
+    saving = d[tails, customers] + d[customers, heads] - d[tails, heads]
+    return customers, saving
+
+
+def _insert(solution: Solution, customers: list, regret: int) -> bool:
+    # Insert the customers one at a time. With regret 1 the customer with the
+    # cheapest insertion goes first (greedy), otherwise the customer with the
+    # largest regret, the sum of the differences between its cheapest
+    # insertion and its cheapest insertion in each of the next regret - 1
+    # best routes. Only the costs of the changed route are recomputed
+    customers = np.asarray(customers, dtype=np.int64)
+    costs, positions = _insertion_costs(
+        solution, range(len(solution.routes)), customers
+    )
+
+    remaining = np.ones(len(customers), dtype=bool)
+    while remaining.any():
+        waiting = np.flatnonzero(remaining)
+        cheapest = costs[:, waiting].min(axis=0)
+        # Routes only get fuller, so a customer that does not fit now never will
+        if np.isinf(cheapest).any():
+            return False
+        k = min(regret, len(costs))
+        if k == 1:
+            choice = int(np.argmin(cheapest))
+        else:
+            best = np.sort(np.partition(costs[:, waiting], k - 1, axis=0)[:k], axis=0)
+            choice = int(np.argmax((best[1:] - best[0]).sum(axis=0)))
+        index = waiting[choice]
+        r = int(np.argmin(costs[:, index]))
+        solution.insert(int(customers[index]), r, int(positions[r, index]))
+        remaining[index] = False
+        costs[r], positions[r] = _insertion_costs(solution, [r], customers)
+
+    return True
+
+
+def _insertion_costs(solution: Solution, routes, customers: np.ndarray):
+    # The cheapest insertion cost and position of each customer in each of the
+    # routes, infinite if the customer does not fit. The arcs of all the routes
+    # are evaluated at once, and the cheapest arc is found per route
+    d = solution.dist
+    tails, heads, starts = [], [], []
+    for r in routes:
+        nodes = [0] + solution.routes[r] + [0]
+        starts.append(len(tails))
+        tails += nodes[:-1]
+        heads += nodes[1:]
+    tails, heads, starts = np.array(tails), np.array(heads), np.array(starts)
+
+    added = (
+        d[tails[:, None], customers[None, :]]
+        + d[customers[None, :], heads[:, None]]
+        - d[tails, heads][:, None]
+    )
+    costs = np.minimum.reduceat(added, starts, axis=0)
+    # The position of the cheapest arc within its route
+    lengths = np.diff(np.append(starts, len(tails)))
+    route_of_arc = np.repeat(np.arange(len(starts)), lengths)
+    is_cheapest = added == costs[route_of_arc]
+    first = np.where(is_cheapest, np.arange(len(tails))[:, None], len(tails))
+    positions = np.minimum.reduceat(first, starts, axis=0) - starts[:, None]
+
+    loads = solution.loads[list(routes)]
+    costs[loads[:, None] + solution.q[customers][None, :] > solution.Q] = np.inf
+    return costs, positions
+
+
+def random_instance(n: int, seed: int = 1, Q: int = 100) -> dict:
+    """
+    Make a random CVRP instance with the customers uniformly spread in a square around the depot.
+
+    Parameters:
+    n (int): The number of customers.
+    seed (int, optional): The seed of the random number generator. Defaults to 1.
+    Q (int, optional): The vehicle capacity. Defaults to 100.
+
+    Returns:
+    dict: The data, in the schema of the CVRP data in ruteplanlægning.
+    """
+    rng = np.random.default_rng(seed)
+    coords = np.vstack([[50, 50], rng.uniform(0, 100, (n, 2))])
+    q = np.concatenate([[0], rng.integers(1, 20, n)])
+    return {
+        "n": n,
+        "q": q.tolist(),
+        "Q": Q,
+        "x_coord": coords[:, 0].tolist(),
+        "y_coord": coords[:, 1].tolist(),
+        "dist": np.linalg.norm(coords[:, None] - coords[None, :], axis=2),
+    }
+
+
+def main(max_iterations: int = 5000, time_limit: float = 60, path: str = None):
+    instances = {
+        name: read_json(f"src/mpa/ruteplanlægning/7_4_CVRP_{name}_data.json")
+        for name in ["n_29", "n_39", "n_50"]
+    }
+    instances["n_1000 (random)"] = random_instance(1000)
+
+    for name, data in instances.items():
+        # Few iterations per customer on the large instance call for a colder search
+        temperatures = (0.01, 0.0001) if len(data["dist"]) > 100 else (0.2, 0.002)
+        result = alns(
+            data,
+            max_iterations=max_iterations,
+            time_limit=time_limit,
+            start_temperature=temperatures[0],
+            end_temperature=temperatures[1],
+            verbose=False,
+        )
+        print(
+            f"{name}: cost {result['cost']:.2f} with {len(result['routes'])} routes, "
+            f"{result['iterations']} iterations in {result['time']:.1f} seconds"
+        )
+        if path is not None:
+            # The convergence of the best solution
+            render(
+                plot_series,
+                result["trace"]["time"],
+                result["trace"]["best"],
+                xlabel="Seconds",
+                ylabel="Best cost",
+                style="-b",
+                path=f"{path}_{name.split()[0]}.png",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+from typing import List
+
+import numpy as np
+
+# Routes are lists of customers, without the depot at the ends, e.g. [3, 1, 4]
+# for the route 0 -> 3 -> 1 -> 4 -> 0
+
+
+def route_cost(route: list, dist: np.ndarray, depot: int = 0) -> float:
+    """
+    Compute the length of a route, including the arcs from and to the depot.
+
+    Parameters:
+    route (list): The customers of the route in visiting order.
+    dist (np.ndarray): The distance matrix.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    float: The length of the route.
+    """
+    if not route:
+        return 0.0
+    nodes = np.concatenate([[depot], route, [depot]])
+
+    return float(dist[nodes[:-1], nodes[1:]].sum())
+
+
+def total_cost(routes: List[list], dist: np.ndarray, depot: int = 0) -> float:
+    """
+    Compute the total length of a set of routes.
+
+    Parameters:
+    routes (List[list]): The routes.
+    dist (np.ndarray): The distance matrix.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    float: The total length.
+    """
+    return sum(route_cost(route, dist, depot) for route in routes)
+
+
+def nearest_neighbour(
+    dist: np.ndarray,
+    q: np.ndarray = None,
+    Q: float = np.inf,
+    num_routes: int = None,
+    customers: list = None,
+    depot: int = 0,
+) -> List[list]:
+    """
+    Build routes by always driving to the nearest unvisited customer that fits in the vehicle.
+
+    A new route is started from the depot when no customer fits. With
+    num_routes, routes are split until there are exactly num_routes routes.
+
+    Parameters:
+    dist (np.ndarray): The distance matrix.
+    q (np.ndarray, optional): The demand of each node. Defaults to None (no capacity).
+    Q (float, optional): The vehicle capacity. Defaults to np.inf.
+    num_routes (int, optional): The number of routes to return, see merge_routes and split_routes. Defaults to None (as many as needed).
+    customers (list, optional): The customers to visit. Defaults to None (all nodes but the depot).
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    List[list]: The routes.
+    """
+    dist = np.asarray(dist, dtype=np.float64)
+    q = np.zeros(len(dist)) if q is None else np.asarray(q, dtype=np.float64)
+    if customers is None:
+        customers = [i for i in range(len(dist)) if i != depot]
+
+    unvisited = np.zeros(len(dist), dtype=bool)
+    unvisited[customers] = True
+
+    routes = []
+    while unvisited.any():
+        route, load, node = [], 0.0, depot
+        while True:
+            candidates = np.flatnonzero(unvisited & (load + q <= Q))
+            if len(candidates) == 0:
+                break
+            node = int(candidates[np.argmin(dist[node, candidates])])
+            route.append(node)
+            load += q[node]
+            unvisited[node] = False
+        if not route:
+            raise ValueError("A customer has a demand larger than the capacity")
+        routes.append(route)
+
+    if num_routes is not None:
+        routes = merge_routes(routes, dist, q, Q, num_routes, depot)
+        routes = split_routes(routes, dist, num_routes, depot)
+
+    return routes
+
+
+def clarke_wright(
+    dist: np.ndarray,
+    q: np.ndarray = None,
+    Q: float = np.inf,
+    num_routes: int = None,
+    customers: list = None,
+    depot: int = 0,
+) -> List[list]:
+    """
+    Build routes with the Clarke-Wright savings algorithm.
+
+    Every customer starts on its own route, and routes are merged by the arcs
+    (i, j) with the largest savings dist[i, 0] + dist[0, j] - dist[i, j],
+    joining a route ending in i with a route starting in j if the merged load
+    fits. The savings are computed and sorted at once with NumPy.
+
+    Parameters:
+    dist (np.ndarray): The distance matrix.
+    q (np.ndarray, optional): The demand of each node. Defaults to None (no capacity).
+    Q (float, optional): The vehicle capacity. Defaults to np.inf.
+    num_routes (int, optional): The number of routes to return. Savings merges are made until there are num_routes routes, and the routes are merged or split afterwards if the number is still off, see merge_routes and split_routes. Defaults to None (merge while the savings are positive).
+    customers (list, optional): The customers to visit. Defaults to None (all nodes but the depot).
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    List[list]: The routes.
+    """
+    dist = np.asarray(dist, dtype=np.float64)
+    q = np.zeros(len(dist)) if q is None else np.asarray(q, dtype=np.float64)
+    if customers is None:
+        customers = [i for i in range(len(dist)) if i != depot]
+    customers = np.asarray(customers, dtype=np.int64)
+    if (q[customers] > Q).any():
+        raise ValueError("A customer has a demand larger than the capacity")
+
+    # The savings of all pairs of customers, largest first
+    sub = dist[np.ix_(customers, customers)]
+    savings = dist[customers, depot][:, None] + dist[depot, customers][None, :] - sub
+    np.fill_diagonal(savings, -np.inf)
+    order = np.argsort(-savings, axis=None, kind="stable")
+    order = order[savings.ravel()[order] > (-np.inf if num_routes else 0)]
+    tails, heads = np.divmod(order, len(customers))
+
+    # Each customer starts on its own route
+    routes = {int(i): [int(i)] for i in customers}
+    route_of = {int(i): int(i) for i in customers}
+    loads = {int(i): q[i] for i in customers}
+
+    for i, j in zip(customers[tails].tolist(), customers[heads].tolist()):
+        if num_routes is not None and len(routes) <= num_routes:
+            break
+        a, b = route_of[i], route_of[j]
+        # i must end one route and j start another
+        if a == b or routes[a][-1] != i or routes[b][0] != j:
+            continue
+        if loads[a] + loads[b] > Q:
+            continue
+        routes[a].extend(routes[b])
+        loads[a] += loads[b]
+        for node in routes.pop(b):
+            route_of[node] = a
+        del loads[b]
+
+    routes = list(routes.values())
+    if num_routes is not None:
+        routes = merge_routes(routes, dist, q, Q, num_routes, depot)
+        routes = split_routes(routes, dist, num_routes, depot)
+
+    return routes
+
+
+def split_routes(
+    routes: List[list], dist: np.ndarray, num_routes: int, depot: int = 0
+) -> List[list]:
+    """
+    Split routes until there are num_routes routes, e.g. when a fixed number of vehicles must be used.
+
+    Each split cuts the arc (a, b) of the route with the most customers that
+    adds the least length, replacing it with the arcs (a, 0) and (0, b).
+
+    Parameters:
+    routes (List[list]): The routes.
+    dist (np.ndarray): The distance matrix.
+    num_routes (int): The number of routes to return. Routes are only split, so more routes are returned unchanged.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    List[list]: The routes.
+    """
+    routes = [list(route) for route in routes]
+    while len(routes) < num_routes:
+        longest = max(range(len(routes)), key=lambda r: len(routes[r]))
+        route = np.asarray(routes[longest])
+        if len(route) < 2:
+            raise ValueError(f"There are too few customers for {num_routes} routes")
+        added = (
+            dist[route[:-1], depot]
+            + dist[depot, route[1:]]
+            - dist[route[:-1], route[1:]]
+        )
+        cut = int(np.argmin(added)) + 1
+        routes.insert(longest + 1, routes[longest][cut:])
+        routes[longest] = routes[longest][:cut]
+
+    return routes
+
+
+def merge_routes(
+    routes: List[list],
+    dist: np.ndarray,
+    q: np.ndarray,
+    Q: float,
+    num_routes: int,
+    depot: int = 0,
+) -> List[list]:
+    """
+    Remove routes until there are num_routes routes, by inserting their customers into the other routes.
+
+    The route with the smallest load is tried first. Its customers are
+    inserted where they add the least length, the largest demand first, and
+    the next route is tried if they do not fit. If no route can be removed,
+    the routes are returned with more than num_routes routes.
+
+    Parameters:
+    routes (List[list]): The routes.
+    dist (np.ndarray): The distance matrix.
+    q (np.ndarray): The demand of each node.
+    Q (float): The vehicle capacity.
+    num_routes (int): The number of routes to return. Routes are only removed, so fewer routes are returned unchanged.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    List[list]: The routes.
+    """
+    routes = [list(route) for route in routes]
+    while len(routes) > num_routes:
+        loads = [q[route].sum() for route in routes]
+        for removed in np.argsort(loads, kind="stable").tolist():
+            merged = _insert_all(
+                [route for r, route in enumerate(routes) if r != removed],
+                sorted(routes[removed], key=lambda i: -q[i]),
+                dist,
+                q,
+                Q,
+                depot,
+            )
+            if merged is not None:
+                routes = merged
+                break
+        else:
+            print(f"Could not reduce the {len(routes)} routes to {num_routes} routes")
+            break
+
+    return routes
+
+
+def _insert_all(routes, customers, dist, q, Q, depot):
+    # Insert the customers one by one where they add the least length, or give
+    # None if a customer does not fit in any route
+    routes = [list(route) for route in routes]
+    loads = [q[route].sum() for route in routes]
+    for c in customers:
+        best, place = np.inf, None
+        for r, route in enumerate(routes):
+            if loads[r] + q[c] > Q:
+                continue
+            nodes = np.array([depot] + route + [depot])
+            added = (
+                dist[nodes[:-1], c] + dist[c, nodes[1:]] - dist[nodes[:-1], nodes[1:]]
+            )
+            p = int(np.argmin(added))
+            if added[p] < best:
+                best, place = added[p], (r, p)
+        if place is None:
+            return None
+        routes[place[0]].insert(place[1], c)
+        loads[place[0]] += q[c]
+
+    return routes
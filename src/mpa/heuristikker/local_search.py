@@ -0,0 +1,390 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# The moves improve routes in place, see construction.py for the route format.
+# Every move is evaluated by its change in length (delta evaluation) instead of
+# recomputing the route lengths, and the inter-route moves only consider
+# customers that are among each other's nearest neighbours. Routes are never
+# emptied, so the number of vehicles is kept.
+
+EPSILON = 1e-9
+
+
+def neighbour_lists(dist: np.ndarray, k: int = 10, depot: int = 0) -> np.ndarray:
+    """
+    Find the k nearest customers of each node.
+
+    Parameters:
+    dist (np.ndarray): The distance matrix.
+    k (int, optional): The number of neighbours. Defaults to 10.
+    depot (int, optional): The depot node, which is never a neighbour. Defaults to 0.
+
+    Returns:
+    np.ndarray: An array of shape (n, k) with the neighbours of each node, nearest first.
+    """
+    dist = np.array(dist, dtype=np.float64)
+    k = min(k, len(dist) - 2)
+    if k < 1:
+        return np.empty((len(dist), 0), dtype=np.int64)
+
+    np.fill_diagonal(dist, np.inf)
+    dist[:, depot] = np.inf
+    nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(dist, nearest, axis=1), axis=1, kind="stable")
+
+    return np.take_along_axis(nearest, order, axis=1)
+
+
+def two_opt(route: list, dist: np.ndarray, depot: int = 0) -> Tuple[list, float]:
+    """
+    Improve a route with 2-opt moves, reversing the segment that shortens the route the most until no reversal helps.
+
+    All moves of a route are evaluated at once with NumPy. The cost of the
+    reversed segment is taken from prefix sums, so asymmetric distances are
+    handled as well.
+
+    Parameters:
+    route (list): The customers of the route in visiting order.
+    dist (np.ndarray): The distance matrix.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    Tuple[list, float]: The improved route and the decrease in length.
+    """
+    nodes = np.concatenate([[depot], route, [depot]]).astype(np.int64)
+    gain = 0.0
+    if len(nodes) < 5:
+        return list(route), gain
+
+    while True:
+        # Reversing nodes[i + 1], ..., nodes[j] replaces the arcs (i, i + 1) and
+        # (j, j + 1) with (i, j) and (i + 1, j + 1), and reverses the arcs between
+        forward = np.concatenate([[0], np.cumsum(dist[nodes[:-1], nodes[1:]])])
+        backward = np.concatenate([[0], np.cumsum(dist[nodes[1:], nodes[:-1]])])
+        a, b = nodes[:-1], nodes[1:]
+        delta = (
+            dist[a[:, None], a[None, :]]
+            + dist[b[:, None], b[None, :]]
+            - dist[a, b][:, None]
+            - dist[a, b][None, :]
+            + (backward[None, :-1] - backward[1:, None])
+            - (forward[None, :-1] - forward[1:, None])
+        )
+        # Only i + 1 < j is a move
+        delta[np.tril_indices(len(a), 1)] = np.inf
+
+        i, j = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[i, j] >= -EPSILON:
+            break
+        first, last = i + 1, j + 1
+        nodes[first:last] = nodes[first:last][::-1]
+        gain -= delta[i, j]
+
+    return nodes[1:-1].tolist(), float(gain)
+
+
+def or_opt(
+    route: list, dist: np.ndarray, depot: int = 0, max_segment: int = 3
+) -> Tuple[list, float]:
+    """
+    Improve a route with Or-opt moves, moving segments of up to max_segment customers to a better place in the route.
+
+    Parameters:
+    route (list): The customers of the route in visiting order.
+    dist (np.ndarray): The distance matrix.
+    depot (int, optional): The depot node. Defaults to 0.
+    max_segment (int, optional): The longest segment to move. Defaults to 3.
+
+    Returns:
+    Tuple[list, float]: The improved route and the decrease in length.
+    """
+    nodes = [depot] + list(route) + [depot]
+    gain = 0.0
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            for start in range(1, len(nodes) - length):
+                stop = start + length
+                a, b = nodes[start - 1], nodes[stop]
+                first, last = nodes[start], nodes[stop - 1]
+                removed = dist[a, first] + dist[last, b] - dist[a, b]
+
+                # Insert the segment between any two consecutive nodes of the rest
+                rest = np.array(nodes[:start] + nodes[stop:])
+                tails, heads = rest[:-1], rest[1:]
+                added = dist[tails, first] + dist[last, heads] - dist[tails, heads]
+                added[start - 1] = np.inf  # The current position
+                best = int(np.argmin(added))
+                if added[best] - removed < -EPSILON:
+                    segment = nodes[start:stop]
+                    rest = rest.tolist()
+                    place = best + 1
+                    nodes = rest[:place] + segment + rest[place:]
+                    gain += removed - added[best]
+                    improved = True
+                    break
+            if improved:
+                break
+
+    return nodes[1:-1], float(gain)
+
+
+def relocate(
+    routes: List[list],
+    dist: np.ndarray,
+    q: np.ndarray,
+    Q: float,
+    neighbours: np.ndarray,
+    depot: int = 0,
+) -> float:
+    """
+    Move customers to the routes of their nearest neighbours, right before or after the neighbour, while it shortens the routes.
+
+    Parameters:
+    routes (List[list]): The routes, which are changed in place.
+    dist (np.ndarray): The distance matrix.
+    q (np.ndarray): The demand of each node.
+    Q (float): The vehicle capacity.
+    neighbours (np.ndarray): The neighbour lists, see neighbour_lists.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    float: The decrease in length.
+    """
+    d = dist.tolist()
+    route_of, position = _positions(routes, len(dist))
+    loads = [sum(q[i] for i in route) for route in routes]
+    gain = 0.0
+
+    improved = True
+    while improved:
+        improved = False
+        for c in [c for route in routes for c in route]:
+            r, p = route_of[c], position[c]
+            route = routes[r]
+            if len(route) == 1:
+                continue
+            a = route[p - 1] if p > 0 else depot
+            b = route[p + 1] if p + 1 < len(route) else depot
+            removed = d[a][c] + d[c][b] - d[a][b]
+
+            for v in neighbours[c].tolist():
+                s = route_of[v]
+                if s == r or s < 0 or loads[s] + q[c] > Q:
+                    continue
+                target = routes[s]
+                u = target[position[v] - 1] if position[v] > 0 else depot
+                w = target[position[v] + 1] if position[v] + 1 < len(target) else depot
+                before = d[u][c] + d[c][v] - d[u][v]
+                after = d[v][c] + d[c][w] - d[v][w]
+                added = min(before, after)
+                if added - removed < -EPSILON:
+                    del route[p]
+                    target.insert(position[v] + (after < before), c)
+                    loads[r] -= q[c]
+                    loads[s] += q[c]
+                    _update_positions(routes, [r, s], route_of, position)
+                    gain += removed - added
+                    improved = True
+                    break
+
+    return float(gain)
+
+
+def exchange(
+    routes: List[list],
+    dist: np.ndarray,
+    q: np.ndarray,
+    Q: float,
+    neighbours: np.ndarray,
+    depot: int = 0,
+) -> float:
+    """
+    Swap customers with their nearest neighbours on other routes while it shortens the routes.
+
+    Parameters:
+    routes (List[list]): The routes, which are changed in place.
+    dist (np.ndarray): The distance matrix.
+    q (np.ndarray): The demand of each node.
+    Q (float): The vehicle capacity.
+    neighbours (np.ndarray): The neighbour lists, see neighbour_lists.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    float: The decrease in length.
+    """
+    d = dist.tolist()
+    route_of, position = _positions(routes, len(dist))
+    loads = [sum(q[i] for i in route) for route in routes]
+    gain = 0.0
+
+    def ends(route: list, p: int) -> Tuple[int, int]:
+        return (
+            route[p - 1] if p > 0 else depot,
+            route[p + 1] if p + 1 < len(route) else depot,
+        )
+
+    improved = True
+    while improved:
+        improved = False
+        for c in [c for route in routes for c in route]:
+            r = route_of[c]
+            a, b = ends(routes[r], position[c])
+            for v in neighbours[c].tolist():
+                s = route_of[v]
+                if s == r or s < 0:
+                    continue
+                if loads[r] - q[c] + q[v] > Q or loads[s] - q[v] + q[c] > Q:
+                    continue
+                u, w = ends(routes[s], position[v])
+                delta = (d[a][v] + d[v][b] - d[a][c] - d[c][b]) + (
+                    d[u][c] + d[c][w] - d[u][v] - d[v][w]
+                )
+                if delta < -EPSILON:
+                    routes[r][position[c]], routes[s][position[v]] = v, c
+                    loads[r] += q[v] - q[c]
+                    loads[s] += q[c] - q[v]
+                    _update_positions(routes, [r, s], route_of, position)
+                    gain -= delta
+                    improved = True
+                    break
+
+    return float(gain)
+
+
+def drop_and_insert(
+    routes: List[list],
+    dist: np.ndarray,
+    prize: np.ndarray,
+    q: np.ndarray,
+    Q: float,
+    max_routes: int,
+    depot: int = 0,
+) -> float:
+    """
+    Drop customers whose prize does not pay for their detour, and insert unvisited customers whose prize does, for prize-collecting routing.
+
+    Parameters:
+    routes (List[list]): The routes, which are changed in place. Emptied routes are removed.
+    dist (np.ndarray): The distance matrix.
+    prize (np.ndarray): The prize of each node.
+    q (np.ndarray): The demand of each node.
+    Q (float): The vehicle capacity.
+    max_routes (int): The number of vehicles, so new routes can be opened while there are fewer routes.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    float: The increase in collected prize minus length.
+    """
+    gain = 0.0
+
+    # Drop customers while it pays
+    improved = True
+    while improved:
+        improved = False
+        for route in routes:
+            nodes = np.array([depot] + route + [depot])
+            saved = (
+                dist[nodes[:-2], nodes[1:-1]]
+                + dist[nodes[1:-1], nodes[2:]]
+                - dist[nodes[:-2], nodes[2:]]
+                - prize[nodes[1:-1]]
+            )
+            p = int(np.argmax(saved))
+            if saved[p] > EPSILON:
+                del route[p]
+                gain += saved[p]
+                improved = True
+        routes[:] = [route for route in routes if route]
+
+    # Insert the unvisited customers at their cheapest place while it pays
+    visited = {c for route in routes for c in route}
+    for c in sorted(set(range(len(dist))) - visited - {depot}, key=lambda c: -prize[c]):
+        best, place = np.inf, None
+        for r, route in enumerate(routes):
+            if sum(q[i] for i in route) + q[c] > Q:
+                continue
+            nodes = np.array([depot] + route + [depot])
+            added = (
+                dist[nodes[:-1], c] + dist[c, nodes[1:]] - dist[nodes[:-1], nodes[1:]]
+            )
+            p = int(np.argmin(added))
+            if added[p] < best:
+                best, place = added[p], (r, p)
+        if (
+            len(routes) < max_routes
+            and q[c] <= Q
+            and dist[depot, c] + dist[c, depot] < best
+        ):
+            best, place = dist[depot, c] + dist[c, depot], (len(routes), 0)
+        if place is not None and prize[c] - best > EPSILON:
+            if place[0] == len(routes):
+                routes.append([])
+            routes[place[0]].insert(place[1], c)
+            gain += prize[c] - best
+
+    return float(gain)
+
+
+def local_search(
+    routes: List[list],
+    dist: np.ndarray,
+    q: np.ndarray = None,
+    Q: float = np.inf,
+    neighbours: np.ndarray = None,
+    k: int = 10,
+    depot: int = 0,
+    max_rounds: int = 100,
+) -> List[list]:
+    """
+    Improve routes with 2-opt and Or-opt within each route, and relocate and exchange between routes, until no move helps.
+
+    Parameters:
+    routes (List[list]): The routes, e.g. from construction.clarke_wright.
+    dist (np.ndarray): The distance matrix.
+    q (np.ndarray, optional): The demand of each node. Defaults to None (no capacity).
+    Q (float, optional): The vehicle capacity. Defaults to np.inf.
+    neighbours (np.ndarray, optional): The neighbour lists of the inter-route moves. Defaults to None, which computes the k nearest neighbours.
+    k (int, optional): The number of neighbours, if neighbours is not given. Defaults to 10.
+    depot (int, optional): The depot node. Defaults to 0.
+    max_rounds (int, optional): The maximum number of rounds over all moves. Defaults to 100.
+
+    Returns:
+    List[list]: The improved routes.
+    """
+    dist = np.asarray(dist, dtype=np.float64)
+    q = np.zeros(len(dist)) if q is None else np.asarray(q, dtype=np.float64)
+    if neighbours is None:
+        neighbours = neighbour_lists(dist, k, depot)
+    routes = [list(route) for route in routes]
+
+    for _ in range(max_rounds):
+        gain = 0.0
+        for r, route in enumerate(routes):
+            routes[r], two_opt_gain = two_opt(route, dist, depot)
+            routes[r], or_opt_gain = or_opt(routes[r], dist, depot)
+            gain += two_opt_gain + or_opt_gain
+        if len(routes) > 1:
+            gain += relocate(routes, dist, q, Q, neighbours, depot)
+            gain += exchange(routes, dist, q, Q, neighbours, depot)
+        if gain <= EPSILON:
+            break
+
+    return routes
+
+
+def _positions(routes: List[list], num_nodes: int) -> Tuple[list, list]:
+    # The route and the position in the route of each node, -1 if not visited
+    route_of = [-1] * num_nodes
+    position = [-1] * num_nodes
+    _update_positions(routes, range(len(routes)), route_of, position)
+    return route_of, position
+
+
+def _update_positions(routes: List[list], changed, route_of: list, position: list):
+    for r in changed:
+        for p, node in enumerate(routes[r]):
+            route_of[node] = r
+            position[node] = p
@@ -0,0 +1,102 @@
+import time
+
+import numpy as np
+
+from mpa.heuristikker.construction import (
+    clarke_wright,
+    nearest_neighbour,
+    route_cost,
+    total_cost,
+)
+from mpa.heuristikker.local_search import (
+    drop_and_insert,
+    local_search,
+    neighbour_lists,
+)
+from mpa.utilities.file_utils import read_json
+
+CONSTRUCTIONS = {"clarke_wright": clarke_wright, "nearest_neighbour": nearest_neighbour}
+
+
+def solve_routing(
+    data: dict,
+    construction: str = "clarke_wright",
+    improve: bool = True,
+    k: int = 10,
+) -> dict:
+    """
+    Find routes for a TSP, mTSP, CVRP or prize-collecting instance of ruteplanlægning with a construction heuristic and local search.
+
+    The problem follows from the data: "prize" is the prize-collecting CVRP
+    with at most m routes, "q" and "Q" the CVRP with m routes, "S" the mTSP
+    with m routes of at most S customers, and otherwise the TSP.
+
+    Parameters:
+    data (dict): The data of the instance, as read by the read_data functions in ruteplanlægning.
+    construction (str, optional): The construction heuristic, "clarke_wright" or "nearest_neighbour". Defaults to "clarke_wright".
+    improve (bool, optional): Whether to improve the routes with local search. Defaults to True.
+    k (int, optional): The number of neighbours of the inter-route moves. Defaults to 10.
+
+    Returns:
+    dict: The "routes", their total length "cost", the "objective" of the model (the collected prize minus the length for the prize-collecting problem, else the length), and the "time" in seconds.
+    """
+    start = time.time()
+    dist = np.asarray(data["dist"], dtype=np.float64)
+    numNodes = len(dist)
+    numRoutes = data.get("m", 1)
+
+    if "q" in data:
+        q, Q = np.asarray(data["q"], dtype=np.float64), data["Q"]
+    elif "S" in data:
+        # At most S customers per route is a capacity of S with unit demands
+        q, Q = np.ones(numNodes), data["S"]
+        q[0] = 0
+    else:
+        q, Q = np.zeros(numNodes), np.inf
+
+    build = CONSTRUCTIONS[construction]
+    neighbours = neighbour_lists(dist, k)
+
+    if "prize" in data:
+        prize = np.asarray(data["prize"], dtype=np.float64)
+        # Keep the most profitable of the routes through the customers that fit
+        customers = [i for i in range(1, numNodes) if q[i] <= Q]
+        routes = build(dist, q, Q, customers=customers)
+        routes = sorted(
+            routes, key=lambda route: route_cost(route, dist) - prize[route].sum()
+        )[:numRoutes]
+        while True:
+            if improve:
+                routes = local_search(routes, dist, q, Q, neighbours)
+            if drop_and_insert(routes, dist, prize, q, Q, numRoutes) <= 0:
+                break
+        prizes = sum(prize[route].sum() for route in routes)
+        objective = prizes - total_cost(routes, dist)
+    else:
+        routes = build(dist, q, Q, num_routes=numRoutes)
+        if improve:
+            routes = local_search(routes, dist, q, Q, neighbours)
+        objective = total_cost(routes, dist)
+
+    return {
+        "routes": routes,
+        "cost": total_cost(routes, dist),
+        "objective": float(objective),
+        "time": time.time() - start,
+    }
+
+
+def main():
+    # Standalone use, e.g. for instances that are too large for the MIP
+    for name in ["7_3_big_data.json", "7_4_CVRP_n_50_data.json", "7_5_CVRP_data.json"]:
+        data = read_json("src/mpa/ruteplanlægning/" + name)
+        for construction in CONSTRUCTIONS:
+            result = solve_routing(data, construction)
+            print(
+                f"{name}, {construction}: objective {result['objective']:.2f} with "
+                f"{len(result['routes'])} routes in {result['time']:.2f} seconds"
+            )
+
+
+if __name__ == "__main__":
+    main()
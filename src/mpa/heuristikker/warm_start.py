@@ -0,0 +1,71 @@
+from typing import List
+
+import pyomo.environ as pyomo
+
+
+def set_warm_start(
+    model: pyomo.ConcreteModel,
+    routes: List[list],
+    q: list = None,
+    depot: int = 0,
+):
+    """
+    Set the variables of a routing model to the solution given by routes, so it can be passed to the solver as a MIP start.
+
+    The arc variables x are set for all the routing models in ruteplanlægning.
+    The other variables are set when the model has them: the visit variables
+    y of the prize-collecting model, the MTZ positions u and loads v, and the
+    one-commodity flows f, which carry the demand picked up so far.
+
+    Example:
+        routes = solve_routing(data)["routes"]
+        set_warm_start(model, routes)
+        pyomo.SolverFactory("gurobi").solve(model, warmstart=True)
+
+    Parameters:
+    model (pyomo.ConcreteModel): A routing model, see the build_model functions in ruteplanlægning.
+    routes (List[list]): The routes as lists of customers without the depot, see heuristikker.construction.
+    q (list, optional): The demand of each node, used for v and f. Defaults to None, which uses model.q if the model has it and 1 per customer otherwise.
+    depot (int, optional): The depot node. Defaults to 0.
+
+    Returns:
+    None
+    """
+    if q is None:
+        q = getattr(model, "q", None)
+    if q is None:
+        q = [0 if i == depot else 1 for i in range(max(i for i, _ in model.x) + 1)]
+
+    arcs = {}  # The used arcs and the demand picked up before driving them
+    position = {}
+    load = {}
+    for route in routes:
+        nodes = [depot] + list(route) + [depot]
+        picked_up = 0
+        for t in range(len(nodes) - 1):
+            if t > 0:
+                picked_up += q[nodes[t]]
+                position[nodes[t]] = t
+                load[nodes[t]] = picked_up
+            arcs[nodes[t], nodes[t + 1]] = picked_up
+
+    missing = [arc for arc in arcs if arc not in model.x]
+    if missing:
+        raise ValueError(f"The routes use arcs that are not in the model: {missing}")
+
+    for index, var in model.x.items():
+        var.set_value(1 if index in arcs else 0)
+
+    if hasattr(model, "f"):
+        for index, var in model.f.items():
+            var.set_value(arcs.get(index, 0))
+
+    if hasattr(model, "y"):
+        for i, var in model.y.items():
+            var.set_value(1 if i in position else 0)
+
+    for name, values in [("u", position), ("v", load)]:
+        if hasattr(model, name):
+            for i, var in getattr(model, name).items():
+                if i in values:
+                    var.set_value(values[i])
@@ -1,7 +1,8 @@
-import matplotlib.pyplot as plt
 import numpy as np
 import pyomo.environ as pyomo
 
+from mpa.utilities.plot_utils import render
+
 
 def read_data() -> dict:
     data = {
@@ -50,7 +51,21 @@ def read_data() -> dict:
     return data
 
 
-def build_model(data: dict) -> pyomo.ConcreteModel():
+# The formulations of the setup constraints. "big_m" links production and
+# setup with the total demand as big-M, "tight_big_m" with the demand remaining
+# from the period on (the stock is empty at the end), and "facility_location"
+# adds the production of each period for the demand of each later period on
+# top of the tight big-M, whose LP relaxation is the convex hull of the
+# uncapacitated problem
+FORMULATIONS = ("big_m", "tight_big_m", "facility_location")
+
+
+def build_model(data: dict, formulation: str = "big_m") -> pyomo.ConcreteModel():
+    if formulation not in FORMULATIONS:
+        raise ValueError(
+            f"Unknown formulation {formulation!r}, expected one of {FORMULATIONS}"
+        )
+
     # Instantiate model
     model = pyomo.ConcreteModel()
 
@@ -64,7 +79,12 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.h = data["inv_cost"]
     model.d = data["demands"]
 
-    model.bigM = sum(model.d)
+    if formulation == "big_m":
+        model.bigM = [sum(model.d)] * model.T
+    else:
+        model.bigM = [
+            min(sum(model.d[t:]), data["max_prod"] or sum(model.d)) for t in model.t
+        ]
 
     # Define variables
     model.x = pyomo.Var(
@@ -101,7 +121,24 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     # Constraint: big-m
     model.bigMConstraint = pyomo.ConstraintList()
     for t in model.t:
-        model.bigMConstraint.add(expr=model.x[t] <= model.bigM * model.y[t])
+        model.bigMConstraint.add(expr=model.x[t] <= model.bigM[t] * model.y[t])
+
+    if formulation == "facility_location":
+        # z[i, t] is the production in period i for the demand of period t
+        model.z_index = [(i, t) for t in model.t for i in range(t + 1)]
+        model.z = pyomo.Var(model.z_index, within=pyomo.NonNegativeReals)
+
+        model.FacilityLocation = pyomo.ConstraintList()
+        for t in model.t:
+            model.FacilityLocation.add(
+                expr=sum(model.z[i, t] for i in range(t + 1)) == model.d[t]
+            )
+        for i, t in model.z_index:
+            model.FacilityLocation.add(expr=model.z[i, t] <= model.d[t] * model.y[i])
+        for i in model.t:
+            model.FacilityLocation.add(
+                expr=model.x[i] == sum(model.z[i, t] for t in range(i, model.T))
+            )
 
     # Constraint: Open and closing inventory is empty
     model.beginningInventory = pyomo.Constraint(expr=model.s[0] == 0)
@@ -116,39 +153,49 @@ def solve_model(model: pyomo.ConcreteModel()):
     solver.solve(model, tee=True)
 
 
-def display_solution(model: pyomo.ConcreteModel()):
-    optimal_cost = round(pyomo.value(model.obj), 2)
-
-    print(f"Optimal objection function value = {optimal_cost:,}")
-
-    # Number of periods - used to control placement on the x-axis
-    numPeriods = len(model.t_labels)
+def plot_production_plan(
+    fig, t_labels: list, d: list, x: list, s: list, optimal_cost: float
+) -> None:
+    ax = fig.add_subplot()
 
     # Position of bars on x-axis
-    pos = np.arange(numPeriods)
-
-    # Extract the optimal variable values
-    s_values = [pyomo.value(model.s[t]) for t in model.t]
-    x_values = [pyomo.value(model.x[t]) for t in model.t]
+    pos = np.arange(len(t_labels))
 
     # Width of the bars
     width = 0.4
 
-    # Add the three plots to the fig-figure
-    plt.bar(pos, model.d, width, label="Demands", color="blue")
-    plt.bar(pos + width, s_values, width, label="Inventory level", color="grey")
-    plt.plot(pos, x_values, color="darkred", label="Production level")
+    # Add the three plots to the figure
+    ax.bar(pos, d, width, label="Demands", color="blue")
+    ax.bar(pos + width, s, width, label="Inventory level", color="grey")
+    ax.plot(pos, x, color="darkred", label="Production level")
 
     # Set the ticks on the x-axis
-    plt.xticks(pos + width / 2, model.t_labels)
+    ax.set_xticks(pos + width / 2, t_labels)
 
     # Labels on axis
-    plt.xlabel("Periods to plan")
-    plt.ylabel("Demand")
-    plt.title(f"Optimal production plan. Optimal cost is: {(optimal_cost):,}")
+    ax.set_xlabel("Periods to plan")
+    ax.set_ylabel("Demand")
+    ax.set_title(f"Optimal production plan. Optimal cost is: {(optimal_cost):,}")
+
 
-    # Show the figure
-    plt.show()
+def display_solution(model: pyomo.ConcreteModel(), path: str = None):
+    optimal_cost = round(pyomo.value(model.obj), 2)
+
+    print(f"Optimal objection function value = {optimal_cost:,}")
+
+    # Extract the optimal variable values
+    s_values = [pyomo.value(model.s[t]) for t in model.t]
+    x_values = [pyomo.value(model.x[t]) for t in model.t]
+
+    render(
+        plot_production_plan,
+        model.t_labels,
+        model.d,
+        x_values,
+        s_values,
+        optimal_cost,
+        path=path,
+    )
 
 
 def main():
@@ -1,7 +1,8 @@
-import matplotlib.pyplot as plt
 import numpy as np
 import pyomo.environ as pyomo
 
+from mpa.utilities.plot_utils import render
+
 
 def read_data() -> dict:
     data = {
@@ -39,7 +40,18 @@ def read_data() -> dict:
     return data
 
 
-def build_model(data: dict) -> pyomo.ConcreteModel():
+# The formulations of the setup constraints, see 5_2_0_ULS.py. The
+# facility location formulation is the convex hull of each product on its own,
+# so only the capacities are left to branching
+FORMULATIONS = ("big_m", "tight_big_m", "facility_location")
+
+
+def build_model(data: dict, formulation: str = "big_m") -> pyomo.ConcreteModel():
+    if formulation not in FORMULATIONS:
+        raise ValueError(
+            f"Unknown formulation {formulation!r}, expected one of {FORMULATIONS}"
+        )
+
     # Instantiate model
     model = pyomo.ConcreteModel()
 
@@ -59,7 +71,12 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
 
     model.batch_size = data["batch_size"]
 
-    model.bigM = [sum(row) for row in model.d]
+    if formulation == "big_m":
+        model.bigM = [[sum(row)] * model.T for row in model.d]
+    else:
+        model.bigM = [
+            [min(sum(row[t:]), data["max_prod"]) for t in model.t] for row in model.d
+        ]
 
     # Define variables
     model.x = pyomo.Var(
@@ -105,9 +122,33 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     for t in model.t:
         for k in model.k:
             model.bigMConstraint.add(
-                expr=model.x[k, t] <= model.bigM[k] * model.y[k, t]
+                expr=model.x[k, t] <= model.bigM[k][t] * model.y[k, t]
             )
 
+    if formulation == "facility_location":
+        # z[k, i, t] is the production of product k in period i for the demand of period t
+        model.z_index = [
+            (k, i, t) for k in model.k for t in model.t for i in range(t + 1)
+        ]
+        model.z = pyomo.Var(model.z_index, within=pyomo.NonNegativeReals)
+
+        model.FacilityLocation = pyomo.ConstraintList()
+        for k in model.k:
+            for t in model.t:
+                model.FacilityLocation.add(
+                    expr=sum(model.z[k, i, t] for i in range(t + 1)) == model.d[k][t]
+                )
+        for k, i, t in model.z_index:
+            model.FacilityLocation.add(
+                expr=model.z[k, i, t] <= model.d[k][t] * model.y[k, i]
+            )
+        for k in model.k:
+            for i in model.t:
+                model.FacilityLocation.add(
+                    expr=model.x[k, i]
+                    == sum(model.z[k, i, t] for t in range(i, model.T))
+                )
+
     # Constraint: Open and closing inventory is empty
     model.beginningInventory = pyomo.ConstraintList()
     model.endingInventory = pyomo.ConstraintList()
@@ -124,62 +165,37 @@ def solve_model(model: pyomo.ConcreteModel()):
     solver.solve(model, tee=True)
 
 
-def display_solution(model: pyomo.ConcreteModel()):
-    optimal_cost = round(pyomo.value(model.obj), 2)
-
-    print(f"Optimal objection function value = {optimal_cost:,}")
-
+def plot_production_plan(
+    fig, t_labels: list, k_labels: list, d: list, x: list, s: list
+) -> None:
     # Label locations for bars
-    pos = np.arange(len(model.t_labels))
+    pos = np.arange(len(t_labels))
 
-    number_of_plots = model.K + 1  # One plot for each product k and one aggregate plot
+    number_of_plots = (
+        len(k_labels) + 1
+    )  # One plot for each product k and one aggregate plot
     number_of_columns = 1
 
     bar_width = 0.4
 
-    # Creating aggregate production plot ##############################################
-    plt.subplot(number_of_plots, number_of_columns, 1)
-
-    x_values = [sum(pyomo.value(model.x[k, t]) for k in model.k) for t in model.t]
-    d_values = [sum(model.d[k][t] for k in model.k) for t in model.t]
-    s_values = [sum(pyomo.value(model.s[k, t]) for k in model.k) for t in model.t]
-
-    plt.plot(pos, x_values, color="darkred", label="Production level")
-
-    plt.bar(
-        pos - bar_width / 2,
-        height=d_values,
-        label="Demand",
-        width=bar_width,
-        color="blue",
-    )
-
-    plt.bar(
-        pos + bar_width / 2,
-        height=s_values,
-        label="Inventory",
-        width=bar_width,
-        color="grey",
-    )
-
-    plt.title("Aggregate production")
-    plt.ylabel("Enheder")
-    plt.xticks(pos, model.t_labels)
-    plt.legend()
-
-    # Creating individual product plots ###############################################
-    for k in model.k:
-        plt.subplot(
-            number_of_plots, number_of_columns, k + 2
-        )  # Starting by plotting the second plot (first k == 0)
+    # Rows are the aggregate production followed by the individual products
+    rows = [
+        (
+            "Aggregate production",
+            np.sum(d, axis=0),
+            np.sum(x, axis=0),
+            np.sum(s, axis=0),
+        )
+    ]
+    for k, product_label in enumerate(k_labels):
+        rows.append((f"{product_label} (k={k})", d[k], x[k], s[k]))
 
-        x_values = [pyomo.value(model.x[k, t]) for t in model.t]
-        d_values = [pyomo.value(model.d[k][t]) for t in model.t]
-        s_values = [pyomo.value(model.s[k, t]) for t in model.t]
+    for row, (title, d_values, x_values, s_values) in enumerate(rows, start=1):
+        ax = fig.add_subplot(number_of_plots, number_of_columns, row)
 
-        plt.plot(x_values, label="Production level", color="darkred")
+        ax.plot(pos, x_values, color="darkred", label="Production level")
 
-        plt.bar(
+        ax.bar(
             pos - bar_width / 2,
             height=d_values,
             label="Demand",
@@ -187,7 +203,7 @@ def display_solution(model: pyomo.ConcreteModel()):
             color="blue",
         )
 
-        plt.bar(
+        ax.bar(
             pos + bar_width / 2,
             height=s_values,
             label="Inventory",
@@ -195,14 +211,33 @@ def display_solution(model: pyomo.ConcreteModel()):
             color="grey",
         )
 
-        product_label = model.k_labels[k]
-        plt.title(f"{product_label} (k={k})")
-        plt.ylabel("Enheder")
-        plt.xticks(pos, model.t_labels)
-        plt.legend()
+        ax.set_title(title)
+        ax.set_ylabel("Enheder")
+        ax.set_xticks(pos, t_labels)
+        ax.legend()
+
+    fig.set_size_inches(6.4, 2.4 * number_of_plots)
+    fig.tight_layout()
+
+
+def display_solution(model: pyomo.ConcreteModel(), path: str = None):
+    optimal_cost = round(pyomo.value(model.obj), 2)
+
+    print(f"Optimal objection function value = {optimal_cost:,}")
 
-    plt.tight_layout()
-    plt.show()
+    # Extract the optimal variable values once, and plot them
+    x_values = [[pyomo.value(model.x[k, t]) for t in model.t] for k in model.k]
+    s_values = [[pyomo.value(model.s[k, t]) for t in model.t] for k in model.k]
+
+    render(
+        plot_production_plan,
+        model.t_labels,
+        model.k_labels,
+        model.d,
+        x_values,
+        s_values,
+        path=path,
+    )
 
 
 def main():
@@ -0,0 +1,264 @@
+# Plan many independent lot sizing instances in the schema of
+# EKSAMEN/ordinary2022Data.json, e.g. one per item, in parallel processes.
+# The instances are read one at a time from a directory of JSON files or a
+# JSON-lines file, and only a bounded number of them is in flight at once, so
+# the inputs are never all in memory. Each worker loads the model script and
+# creates its solver once, and reuses them for all its instances. The plans
+# are yielded as they are solved, or in input order.
+#
+# Run from the repository root:
+#     python src/mpa/produktionsplanlægning/batch_lot_sizing.py instances/ plans.jsonl
+#     python src/mpa/produktionsplanlægning/batch_lot_sizing.py items.jsonl --ordered
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, Tuple
+
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import append_json_line, load_script
+from mpa.utilities.model_utils import set_solver_options
+
+SRC_PATH = os.path.join(os.path.dirname(__file__), "..")
+
+# The model scripts and the name of the function converting an instance to
+# the data the build_model of the script expects, if it is not the same schema
+MODELS = {
+    "opgave_2_4": ("EKSAMEN/opgave_2_4.py", None),
+    "opgave_2_5": ("EKSAMEN/opgave_2_5.py", None),
+    "opgave_2_6": ("EKSAMEN/opgave_2_6.py", None),
+    "5_2_0_ULS": ("produktionsplanlægning/5_2_0_ULS.py", "uls_data"),
+}
+
+# The script, solver and options of each worker process
+_worker = {}
+
+
+def uls_data(data: dict) -> dict:
+    """
+    Convert an instance in the schema of ordinary2022Data.json to the schema of read_data in 5_2_0_ULS.py.
+
+    The stock has no upper bound, and the starting and minimum stock are not part of the ULS model.
+
+    Parameters:
+    data (dict): The instance.
+
+    Returns:
+    dict: The instance in the ULS schema.
+    """
+    T = data["nrPeriods"]
+    return {
+        "periods": data.get("periods", [f"period{t + 1}" for t in range(T)]),
+        "demands": data["demands"],
+        "var_cost": data["var_cost"],
+        "fixed_cost": data.get("fixed_cost", [0] * T),
+        "inv_cost": data["inv_cost"],
+        "max_prod": data["max_production"],
+        "max_inv": None,
+    }
+
+
+def iter_instances(source: str) -> Iterator[Tuple[str, str]]:
+    """
+    Iterate over the instances of a directory of JSON files or a JSON-lines file, one at a time.
+
+    Parameters:
+    source (str): A directory, whose .json files are read in name order, a JSON-lines file with one instance per line, or "-" for JSON lines on the standard input.
+
+    Returns:
+    Iterator[Tuple[str, str]]: The name of each instance (the file name, or the "name" key or line number of a line) and the path of its file or its JSON text.
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".json"):
+                yield name, os.path.join(source, name)
+        return
+
+    with sys.stdin if source == "-" else open(source) as file:
+        for number, line in enumerate(file, start=1):
+            if line.strip():
+                yield f"line {number}", line
+
+
+def solve_batch(
+    source: str,
+    model: str = "opgave_2_4",
+    solver: str = "appsi_highs",
+    timelimit: float = None,
+    MIPgap: float = None,
+    max_workers: int = None,
+    threads_per_worker: int = 1,
+    ordered: bool = False,
+    max_pending: int = None,
+) -> Iterator[dict]:
+    """
+    Solve the instances of a directory or JSON-lines file in parallel worker processes.
+
+    At most max_pending instances are read ahead of the plans yielded, which
+    in ordered mode includes the plans waiting for an earlier instance. A
+    failing instance gives a row with its "error" instead of stopping the batch.
+
+    Parameters:
+    source (str): The instances, see iter_instances.
+    model (str, optional): The model script to solve the instances with, one of MODELS. Defaults to "opgave_2_4".
+    solver (str, optional): The name of the solver to use. Defaults to "appsi_highs".
+    timelimit (float, optional): The time limit for each instance, in seconds. Defaults to None.
+    MIPgap (float, optional): The MIP gap tolerance for the solver. Defaults to None.
+    max_workers (int, optional): The number of worker processes. Defaults to None, which uses all cores divided by threads_per_worker.
+    threads_per_worker (int, optional): The number of threads each solver may use. Defaults to 1.
+    ordered (bool, optional): Whether to yield the plans in the order of the instances. Defaults to False (as they are solved).
+    max_pending (int, optional): The largest number of instances read ahead. Defaults to None, which is 4 per worker.
+
+    Returns:
+    Iterator[dict]: One row per instance with its "index", "name", "objective", "termination_condition", the plan "x", "y" and "s", the "wall_time" of the solve and the "error".
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}, expected one of {list(MODELS)}")
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+    max_pending = max_pending or 4 * max_workers
+
+    instances = enumerate(iter_instances(source))
+    pending = set()
+    finished = {}
+    next_index = 0
+    exhausted = False
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(model, solver, timelimit, MIPgap, threads_per_worker),
+    ) as executor:
+        while True:
+            while not exhausted and len(pending) + len(finished) < max_pending:
+                try:
+                    index, (name, instance) = next(instances)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(_plan_instance, index, name, instance))
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                row = future.result()
+                if not ordered:
+                    yield row
+                else:
+                    finished[row["index"]] = row
+
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+
+
+def run_batch(source: str, results_path: str = None, **kwargs) -> dict:
+    """
+    Solve a batch of instances with solve_batch and write the plans as JSON lines.
+
+    Parameters:
+    source (str): The instances, see iter_instances.
+    results_path (str, optional): The JSON-lines file the plans are appended to as they come. Defaults to None, which writes them to the standard output.
+    **kwargs: The options of solve_batch.
+
+    Returns:
+    dict: The number of "instances" and "failures", the names of the "failed" instances, the "wall_time" in seconds and the "throughput" in instances per second.
+    """
+    start = time.time()
+    summary = {"instances": 0, "failures": 0, "failed": []}
+    for row in solve_batch(source, **kwargs):
+        summary["instances"] += 1
+        if row["error"] is not None:
+            summary["failures"] += 1
+            summary["failed"].append(row["name"])
+        if results_path is None:
+            print(json.dumps(row), flush=True)
+        else:
+            append_json_line(row, results_path)
+
+    summary["wall_time"] = time.time() - start
+    summary["throughput"] = summary["instances"] / max(summary["wall_time"], 1e-9)
+
+    return summary
+
+
+def _init_worker(
+    model: str, solver: str, timelimit: float, MIPgap: float, threads: int
+):
+    script, convert = MODELS[model]
+    module = load_script(os.path.join(SRC_PATH, script), model)
+
+    _worker.update(
+        build_model=module.build_model,
+        convert=globals()[convert] if convert else None,
+        solver=pyomo.SolverFactory(solver),
+    )
+    set_solver_options(_worker["solver"], solver, timelimit, MIPgap, threads)
+
+
+def _plan_instance(index: int, name: str, instance: str) -> dict:
+    row = {
+        "index": index,
+        "name": name,
+        "objective": None,
+        "termination_condition": None,
+        "x": None,
+        "y": None,
+        "s": None,
+        "wall_time": 0.0,
+        "error": None,
+    }
+
+    try:
+        # A line of a JSON-lines file, or the path of a JSON file
+        if instance.lstrip().startswith("{"):
+            data = json.loads(instance)
+            row["name"] = data.get("name", name)
+        else:
+            with open(instance) as file:
+                data = json.load(file)
+        if _worker["convert"]:
+            data = _worker["convert"](data)
+
+        model = _worker["build_model"](data)
+
+        start = time.perf_counter()
+        results = _worker["solver"].solve(model, load_solutions=False)
+        row["wall_time"] = time.perf_counter() - start
+        row["termination_condition"] = str(results.solver.termination_condition)
+
+        if len(results.solution) > 0:
+            model.solutions.load_from(results)
+            row["objective"] = pyomo.value(model.obj)
+            for key in ["x", "y", "s"]:
+                var = getattr(model, key)
+                row[key] = [var[t].value for t in model.t]
+        else:
+            row["error"] = f"No solution ({row['termination_condition']})"
+    except Exception as error:  # Keep the batch going and record the failure
+        row["error"] = f"{type(error).__name__}: {error}"
+
+    return row
+
+
+def main(source: str, results_path: str = None, ordered: bool = False):
+    summary = run_batch(source, results_path, ordered=ordered)
+
+    print(
+        f"Planned {summary['instances']:,} instances in {summary['wall_time']:.2f} "
+        f"seconds ({summary['throughput']:,.1f} instances per second), "
+        f"{summary['failures']} failed",
+        file=sys.stderr,
+    )
+    for name in summary["failed"]:
+        print(f"Failed: {name}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith("--")]
+    main(*arguments, ordered="--ordered" in sys.argv)
@@ -0,0 +1,316 @@
+# Relax-and-fix and fix-and-optimize heuristics for the multi-product lot
+# sizing model of 5_3_0_MPS.py. Both decompose the setups y into blocks of
+# products and periods and solve one block at a time as a MIP:
+#
+# - relax-and-fix moves a window of periods through the horizon. The variables
+#   of the window are integer, those after it are relaxed to continuous, and
+#   the setups of the first periods of the window are fixed before it moves on.
+# - fix-and-optimize starts from a plan with every setup fixed, frees the
+#   setups of one block at a time and re-solves, which never makes the plan
+#   worse as the old setups are still feasible.
+#
+# The model is loaded in a persistent solver once, and each step only changes
+# the domains and fixings of its variables.
+
+import os
+import time
+
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.instance_generator import lot_sizing_instance
+from mpa.utilities.model_utils import SolverSession, set_solver_options
+
+
+def relax_and_fix(
+    session: SolverSession,
+    window: int = 4,
+    overlap: int = 2,
+    products: int = None,
+) -> float:
+    """
+    Find a plan of a multi-product lot sizing model with relax-and-fix.
+
+    The windows start window - overlap periods apart. In each window the
+    products are taken products at a time, and the setups of the periods the
+    next window does not cover are fixed. After the last window every setup is
+    fixed, and the production and stock are integer.
+
+    Parameters:
+    session (SolverSession): The persistent solver with the model of build_model in 5_3_0_MPS.py.
+    window (int, optional): The number of periods of a window. Defaults to 4.
+    overlap (int, optional): The number of periods consecutive windows share, below window. Defaults to 2.
+    products (int, optional): The number of products solved at a time. Defaults to None (all).
+
+    Returns:
+    float: The cost of the plan.
+    """
+    if not 0 <= overlap < window:
+        raise ValueError(f"overlap must be between 0 and window - 1, got {overlap}")
+
+    model = session.model
+    unfix_setups(session)
+    for k in model.k:
+        for t in model.t:
+            _set_integer(session, k, t, False)
+
+    for group, periods, step in _blocks(model, window, window - overlap, products):
+        for k in group:
+            for t in periods:
+                _set_integer(session, k, t, True)
+
+        _solve(session, f"The window of products {group} and periods {periods}")
+
+        # Fix the setups of the periods the next window does not cover
+        for k in group:
+            for t in periods[:step]:
+                _fix(session, model.y[k, t])
+
+    return pyomo.value(model.obj)
+
+
+def fix_and_optimize(
+    session: SolverSession,
+    window: int = 6,
+    overlap: int = 3,
+    products: int = None,
+    passes: int = 1,
+    timelimit: float = None,
+) -> list:
+    """
+    Improve the plan of a multi-product lot sizing model with fix-and-optimize.
+
+    All setups are fixed to the current plan, e.g. that of relax_and_fix,
+    and the setups of one block of products and periods at a time are freed
+    and re-solved. A pass runs over all blocks, and the passes stop early when
+    a pass does not improve the plan.
+
+    Parameters:
+    session (SolverSession): The persistent solver with the model of build_model in 5_3_0_MPS.py, holding a plan.
+    window (int, optional): The number of periods of a block. Defaults to 6.
+    overlap (int, optional): The number of periods consecutive blocks share, below window. Defaults to 3.
+    products (int, optional): The number of products of a block. Defaults to None (all).
+    passes (int, optional): The largest number of passes. Defaults to 1.
+    timelimit (float, optional): The wall time in seconds after which no further block is started. Defaults to None.
+
+    Returns:
+    list: The cost of the plan before the first pass and after each pass.
+    """
+    if not 0 <= overlap < window:
+        raise ValueError(f"overlap must be between 0 and window - 1, got {overlap}")
+
+    start_time = time.time()
+    model = session.model
+    for k in model.k:
+        for t in model.t:
+            _set_integer(session, k, t, True)
+            _fix(session, model.y[k, t])
+
+    best = {index: var.value for index, var in model.y.items()}
+    history = [pyomo.value(model.obj)]
+    changed = False
+    for _ in range(passes):
+        cost = history[-1]
+        for group, periods, _step in _blocks(model, window, window - overlap, products):
+            if timelimit and time.time() - start_time > timelimit:
+                break
+
+            for k in group:
+                for t in periods:
+                    model.y[k, t].unfix()
+                    session.update_var(model.y[k, t])
+
+            _solve(session, f"The block of products {group} and periods {periods}")
+
+            # The solver may stop within its gap above the old plan, which is kept then
+            if pyomo.value(model.obj) < cost - 1e-6:
+                cost = pyomo.value(model.obj)
+                best = {index: var.value for index, var in model.y.items()}
+                changed = False
+            else:
+                changed = True
+            for k in group:
+                for t in periods:
+                    _fix(session, model.y[k, t], best[k, t])
+
+        improved = cost < history[-1] - 1e-6
+        history.append(cost)
+        if not improved or (timelimit and time.time() - start_time > timelimit):
+            break
+
+    # Load the production and stock of the best plan if the last block rejected it
+    if changed:
+        _solve(session, "The best plan")
+
+    return history
+
+
+def unfix_setups(session: SolverSession) -> None:
+    """
+    Unfix the setups of the model and make all variables integer again.
+
+    Parameters:
+    session (SolverSession): The persistent solver with the model of build_model in 5_3_0_MPS.py.
+
+    Returns:
+    None
+    """
+    model = session.model
+    for k in model.k:
+        for t in model.t:
+            model.y[k, t].unfix()
+            _set_integer(session, k, t, True)
+
+
+def lot_sizing_heuristic(
+    model: pyomo.ConcreteModel(),
+    window: int = 4,
+    overlap: int = 2,
+    products: int = None,
+    improve_window: int = 6,
+    improve_overlap: int = 3,
+    improve_products: int = None,
+    passes: int = 1,
+    solver: str = "appsi_highs",
+    timelimit: float = None,
+    MIPgap: float = None,
+) -> dict:
+    """
+    Plan a multi-product lot sizing model with relax-and-fix followed by fix-and-optimize.
+
+    Smaller windows and product groups give faster but worse plans, and more
+    passes give better plans at the cost of more solves. The model is left
+    with the plan loaded and its setups fixed, see unfix_setups.
+
+    Parameters:
+    model (pyomo.ConcreteModel): The model of build_model in 5_3_0_MPS.py.
+    window (int, optional): The number of periods of a relax-and-fix window. Defaults to 4.
+    overlap (int, optional): The number of periods consecutive relax-and-fix windows share. Defaults to 2.
+    products (int, optional): The number of products of a relax-and-fix window. Defaults to None (all).
+    improve_window (int, optional): The number of periods of a fix-and-optimize block. Defaults to 6.
+    improve_overlap (int, optional): The number of periods consecutive fix-and-optimize blocks share. Defaults to 3.
+    improve_products (int, optional): The number of products of a fix-and-optimize block. Defaults to None (all).
+    passes (int, optional): The largest number of fix-and-optimize passes, where 0 skips it. Defaults to 1.
+    solver (str, optional): The name of a persistent solver, see SolverSession. Defaults to "appsi_highs".
+    timelimit (float, optional): The time limit of each subproblem in seconds. Defaults to None.
+    MIPgap (float, optional): The MIP gap tolerance of each subproblem. Defaults to None.
+
+    Returns:
+    dict: The "cost" of the plan, the "history" of costs (after relax-and-fix and after each pass), and the wall "times" in seconds of "relax_and_fix", "fix_and_optimize" and in "total".
+    """
+    start_time = time.time()
+    session = SolverSession(model, solver=solver, timelimit=timelimit, MIPgap=MIPgap)
+
+    relax_and_fix(session, window, overlap, products)
+    relax_end = time.time()
+
+    history = [pyomo.value(model.obj)]
+    if passes:
+        history = fix_and_optimize(
+            session, improve_window, improve_overlap, improve_products, passes
+        )
+    end = time.time()
+
+    return {
+        "cost": history[-1],
+        "history": history,
+        "times": {
+            "relax_and_fix": relax_end - start_time,
+            "fix_and_optimize": end - relax_end,
+            "total": end - start_time,
+        },
+    }
+
+
+def _blocks(model, window, step, products):
+    # The blocks of products and periods in the order of the periods, with the
+    # number of periods of each block not covered by the next window
+    products = products or model.K
+    groups = [
+        list(range(i, min(i + products, model.K))) for i in range(0, model.K, products)
+    ]
+    for start in range(0, model.T, step):
+        periods = list(range(start, min(start + window, model.T)))
+        last = start + window >= model.T
+        for group in groups:
+            yield group, periods, len(periods) if last else step
+        if last:
+            break
+
+
+def _set_integer(session, k, t, integer):
+    model = session.model
+    domains = [
+        (model.y[k, t], pyomo.Binary, pyomo.UnitInterval),
+        (model.x[k, t], pyomo.NonNegativeIntegers, pyomo.NonNegativeReals),
+        (model.s[k, t], pyomo.NonNegativeIntegers, pyomo.NonNegativeReals),
+    ]
+    for var, integer_domain, relaxed_domain in domains:
+        domain = integer_domain if integer else relaxed_domain
+        if var.domain is not domain:
+            var.domain = domain
+            session.update_var(var)
+
+
+def _fix(session, var, value=None):
+    var.fix(round(var.value if value is None else value))
+    session.update_var(var)
+
+
+def _solve(session, name):
+    results = session.solve(load_solutions=False)
+    termination = results.solver.termination_condition
+    if termination in [
+        pyomo.TerminationCondition.infeasible,
+        pyomo.TerminationCondition.infeasibleOrUnbounded,
+    ]:
+        raise RuntimeError(f"{name} is infeasible")
+    # E.g. stopped by the time limit before a plan was found
+    if len(results.solution) == 0:
+        raise RuntimeError(f"{name} has no solution ({termination})")
+    session.load_solution()
+
+
+def main(
+    T: int = 52,
+    products: int = 10,
+    solver: str = "appsi_highs",
+    timelimit: float = 300,
+    MIPgap: float = 1e-3,
+):
+    mps = load_script(os.path.join(os.path.dirname(__file__), "5_3_0_MPS.py"))
+
+    data = lot_sizing_instance(T, products)
+
+    start = time.time()
+    model = mps.build_model(data)
+    monolithic = pyomo.SolverFactory(solver)
+    set_solver_options(monolithic, solver, timelimit=timelimit, MIPgap=MIPgap)
+    monolithic.solve(model)
+    monolithic_cost = pyomo.value(model.obj)
+    monolithic_time = time.time() - start
+    print(f"Monolithic: {monolithic_cost:,.2f} in {monolithic_time:.2f} seconds")
+
+    # From fast and coarse to slow and fine
+    settings = [
+        {"window": 4, "overlap": 1, "products": 5, "passes": 0},
+        {"window": 4, "overlap": 2, "passes": 1},
+        {"window": 8, "overlap": 4, "passes": 2, "improve_window": 8},
+    ]
+    for setting in settings:
+        start = time.time()
+        model = mps.build_model(data)
+        result = lot_sizing_heuristic(
+            model, solver=solver, timelimit=timelimit, MIPgap=MIPgap, **setting
+        )
+        print(
+            f"{setting}: {result['cost']:,.2f} "
+            f"({result['cost'] / monolithic_cost - 1:+.3%}) in "
+            f"{time.time() - start:.2f} seconds (relax-and-fix "
+            f"{result['times']['relax_and_fix']:.2f}, fix-and-optimize "
+            f"{result['times']['fix_and_optimize']:.2f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# Rolling-horizon planning of the multi-product lot sizing model of
+# 5_3_0_MPS.py. A window of W periods is solved, the first F periods of its
+# plan are frozen, the stock at the end of the frozen periods becomes the
+# opening stock of the next window, and the window moves F periods ahead. The
+# window model is built once with mutable Params for the data of a window,
+# kept in a persistent solver, and updated for each window instead of being
+# rebuilt.
+
+import os
+import time
+
+import numpy as np
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.instance_generator import lot_sizing_instance
+from mpa.utilities.model_utils import SolverSession, set_solver_options
+
+# The formulations of the setup constraints, see 5_3_0_MPS.py
+FORMULATIONS = ("big_m", "tight_big_m")
+
+
+def build_model(
+    data: dict, window: int, formulation: str = "big_m"
+) -> pyomo.ConcreteModel():
+    """
+    Build the model of a window of the multi-product lot sizing problem, with the data of the window as mutable Params, see set_window.
+
+    The model is that of 5_3_0_MPS.py over the periods of the window, with
+    an opening stock s0 before the first period. The periods after the end
+    of the horizon are padded with idle periods.
+
+    Parameters:
+    data (dict): The instance in the schema of read_data in 5_3_0_MPS.py.
+    window (int): The number of periods of a window.
+    formulation (str, optional): The formulation of the setup constraints, "big_m" or "tight_big_m", see 5_3_0_MPS.py. Defaults to "big_m".
+
+    Returns:
+    pyomo.ConcreteModel: The model, with the data of the first window.
+    """
+    if formulation not in FORMULATIONS:
+        raise ValueError(
+            f"Unknown formulation {formulation!r}, expected one of {FORMULATIONS}"
+        )
+
+    # Instantiate model
+    model = pyomo.ConcreteModel()
+
+    # Add data of the whole horizon, from which the windows are set
+    model.data = data
+    model.formulation = formulation
+    model.T = len(data["periods"])
+    model.K = len(data["products"])
+    model.W = window
+
+    model.t = range(0, model.W)
+    model.k = range(0, model.K)
+    model.batch_size = data["batch_size"]
+
+    # The cumulative demand of each product, for the big-M of each window
+    model.cumulative_demand = np.hstack(
+        [np.zeros((model.K, 1)), np.cumsum(data["demands"], axis=1)]
+    )
+
+    # Add the data of a window, set by set_window
+    mutable = {"mutable": True, "initialize": 0, "within": pyomo.Reals}
+    model.p = pyomo.Param(model.k, model.t, **mutable)
+    model.q = pyomo.Param(model.k, model.t, **mutable)
+    model.h = pyomo.Param(model.t, **mutable)
+    model.d = pyomo.Param(model.k, model.t, **mutable)
+    model.bigM = pyomo.Param(model.k, model.t, **mutable)
+    model.s0 = pyomo.Param(model.k, **mutable)
+
+    # Define variables
+    model.x = pyomo.Var(
+        model.k, model.t, within=pyomo.NonNegativeIntegers, bounds=(0, data["max_prod"])
+    )
+    model.y = pyomo.Var(model.k, model.t, within=pyomo.Binary)
+    model.s = pyomo.Var(
+        model.k, model.t, within=pyomo.NonNegativeIntegers, bounds=(0, data["max_inv"])
+    )
+
+    # Define objective function
+    model.obj = pyomo.Objective(
+        expr=sum(
+            model.p[k, t] * model.batch_size * model.x[k, t]
+            + model.q[k, t] * model.y[k, t]
+            + model.h[t] * model.s[k, t]
+            for k in model.k
+            for t in model.t
+        ),
+        sense=pyomo.minimize,
+    )
+
+    # Constraint: demand is met and excess production is added to stock
+    model.DemandStock = pyomo.ConstraintList()
+    for t in model.t:
+        for k in model.k:
+            previous = model.s0[k] if t == 0 else model.s[k, t - 1]
+            model.DemandStock.add(
+                expr=previous + model.x[k, t] == model.d[k, t] + model.s[k, t]
+            )
+
+    # Constraint: big-m
+    model.bigMConstraint = pyomo.ConstraintList()
+    for t in model.t:
+        for k in model.k:
+            model.bigMConstraint.add(
+                expr=model.x[k, t] <= model.bigM[k, t] * model.y[k, t]
+            )
+
+    set_window(model, 0, np.zeros(model.K))
+
+    return model
+
+
+def set_window(
+    model: pyomo.ConcreteModel(),
+    start: int,
+    opening_stock: np.ndarray,
+    session: SolverSession = None,
+) -> None:
+    """
+    Set the data of the window model to the window starting in a period.
+
+    The stock is empty at the end of the first period (as in 5_3_0_MPS.py)
+    when the window starts the horizon, and at the end of the horizon when
+    the window reaches it. The periods after the end of the horizon are idle.
+
+    Parameters:
+    model (pyomo.ConcreteModel): The window model, see build_model.
+    start (int): The period of the horizon the window starts in.
+    opening_stock (np.ndarray): The stock of each product before the window.
+    session (SolverSession, optional): The persistent solver the model is loaded in, which is told about the changes. Defaults to None.
+    """
+    data = model.data
+    set_value = (
+        session.set_value if session else lambda param, value: param.set_value(value)
+    )
+
+    def set_bounds(var, upper, fixed=None):
+        changed = var.ub != upper or var.fixed != (fixed is not None)
+        var.setub(upper)
+        if fixed is None:
+            var.unfix()
+        else:
+            var.fix(fixed)
+        if changed and session:
+            session.update_var(var)
+
+    for k in model.k:
+        set_value(model.s0[k], int(round(opening_stock[k])))
+        demands = data["demands"][k]
+
+        for t in model.t:
+            period = start + t
+            idle = period >= model.T
+            if idle:
+                values = {"p": 0, "q": 0, "d": 0, "bigM": 0}
+            else:
+                values = {
+                    "p": data["var_cost"][k][period],
+                    "q": data["fixed_cost"][k][period],
+                    "d": demands[period],
+                    "bigM": _big_m(model, k, period, start + model.W),
+                }
+            for name, value in values.items():
+                set_value(getattr(model, name)[k, t], value)
+
+            empty = period == 0 or period >= model.T - 1
+            set_bounds(model.s[k, t], 0 if empty else data["max_inv"])
+            set_bounds(model.x[k, t], data["max_prod"], 0 if idle else None)
+            set_bounds(model.y[k, t], 1, 0 if idle else None)
+
+    for t in model.t:
+        period = start + t
+        set_value(model.h[t], data["inv_cost"][period] if period < model.T else 0)
+
+
+def _big_m(model, k, period, end):
+    # The total demand as in 5_3_0_MPS.py, or the demand left in the window,
+    # as producing for the periods after the window only adds holding costs
+    D = model.cumulative_demand[k]
+    if model.formulation == "big_m":
+        return D[-1]
+    return min(D[min(end, model.T)] - D[period], model.data["max_prod"])
+
+
+def rolling_horizon(
+    data: dict,
+    window: int = 12,
+    frozen: int = 4,
+    formulation: str = "big_m",
+    solver: str = "appsi_highs",
+    timelimit: float = None,
+    MIPgap: float = None,
+) -> dict:
+    """
+    Plan a multi-product lot sizing instance with a rolling horizon.
+
+    Windows of window periods are solved one after the other, each starting
+    frozen periods after the previous one, so consecutive windows overlap in
+    window - frozen periods. The first frozen periods of each plan are kept,
+    and the last window keeps its whole plan.
+
+    Parameters:
+    data (dict): The instance in the schema of read_data in 5_3_0_MPS.py.
+    window (int, optional): The number of periods of a window. Defaults to 12.
+    frozen (int, optional): The number of periods frozen after each window, between 1 and window. Defaults to 4.
+    formulation (str, optional): The formulation of the setup constraints, see build_model. Defaults to "big_m".
+    solver (str, optional): The name of a persistent solver, see SolverSession. Defaults to "appsi_highs".
+    timelimit (float, optional): The time limit of each window in seconds. Defaults to None.
+    MIPgap (float, optional): The MIP gap tolerance of each window. Defaults to None.
+
+    Returns:
+    dict: The production "x", setups "y" and stock "s" of each product and period, the "cost" of the plan, the number of "windows", and the wall "times" in seconds of the "build", "update" and "solve" steps, each window ("windows") and in "total".
+    """
+    if not 1 <= frozen <= window:
+        raise ValueError(f"frozen must be between 1 and window, got {frozen}")
+
+    start_time = time.time()
+    K, T = len(data["products"]), len(data["periods"])
+    times = {"build": 0.0, "update": 0.0, "solve": 0.0, "windows": []}
+
+    model = build_model(data, window, formulation)
+    session = SolverSession(model, solver=solver, timelimit=timelimit, MIPgap=MIPgap)
+    times["build"] = time.time() - start_time
+
+    plan = {key: np.zeros((K, T), dtype=np.int64) for key in ["x", "y", "s"]}
+    stock = np.zeros(K)
+    start = 0
+    while start < T:
+        window_start = time.time()
+        if start > 0:
+            set_window(model, start, stock, session)
+        update_end = time.time()
+
+        results = session.solve(load_solutions=False)
+        termination = results.solver.termination_condition
+        if termination in [
+            pyomo.TerminationCondition.infeasible,
+            pyomo.TerminationCondition.infeasibleOrUnbounded,
+        ]:
+            raise RuntimeError(f"The window starting in period {start} is infeasible")
+        # E.g. stopped by the time limit before a plan was found
+        if len(results.solution) == 0:
+            raise RuntimeError(
+                f"The window starting in period {start} has no solution ({termination})"
+            )
+        session.load_solution()
+        solve_end = time.time()
+
+        # Freeze the first periods of the plan, or all of them in the last window
+        last = start + window >= T
+        keep = min(T, start + window) - start if last else frozen
+        stop = start + keep
+        for key in ["x", "y", "s"]:
+            var = getattr(model, key)
+            plan[key][:, start:stop] = [
+                [round(var[k, t].value) for t in range(keep)] for k in model.k
+            ]
+        stock = plan["s"][:, stop - 1]
+
+        times["update"] += update_end - window_start
+        times["solve"] += solve_end - update_end
+        times["windows"].append(time.time() - window_start)
+        start = stop
+
+    times["total"] = time.time() - start_time
+
+    return {
+        **{key: value.tolist() for key, value in plan.items()},
+        "cost": plan_cost(data, plan),
+        "windows": len(times["windows"]),
+        "times": times,
+    }
+
+
+def plan_cost(data: dict, plan: dict) -> float:
+    """
+    Compute the cost of a plan as in the objective of 5_3_0_MPS.py.
+
+    Parameters:
+    data (dict): The instance in the schema of read_data in 5_3_0_MPS.py.
+    plan (dict): The production "x", setups "y" and stock "s" of each product and period.
+
+    Returns:
+    float: The cost.
+    """
+    x, y, s = (np.asarray(plan[key]) for key in ["x", "y", "s"])
+
+    return float(
+        (np.asarray(data["var_cost"]) * data["batch_size"] * x).sum()
+        + (np.asarray(data["fixed_cost"]) * y).sum()
+        + (np.asarray(data["inv_cost"]) * s).sum()
+    )
+
+
+def main(
+    T: int = 52,
+    products: int = 10,
+    window: int = 12,
+    frozen: int = 4,
+    solver: str = "appsi_highs",
+    timelimit: float = 300,
+    MIPgap: float = 1e-3,
+):
+    mps = load_script(os.path.join(os.path.dirname(__file__), "5_3_0_MPS.py"))
+
+    data = lot_sizing_instance(T, products)
+
+    start = time.time()
+    model = mps.build_model(data)
+    monolithic = pyomo.SolverFactory(solver)
+    set_solver_options(monolithic, solver, timelimit=timelimit, MIPgap=MIPgap)
+    monolithic.solve(model)
+    monolithic_cost = pyomo.value(model.obj)
+    monolithic_time = time.time() - start
+    print(f"Monolithic: {monolithic_cost:,.2f} in {monolithic_time:.2f} seconds")
+
+    # The same time limit and gap for each window, which is a much smaller problem
+    result = rolling_horizon(
+        data, window, frozen, solver=solver, timelimit=timelimit, MIPgap=MIPgap
+    )
+    times = result["times"]
+    print(
+        f"Rolling horizon ({window} periods, {frozen} frozen): {result['cost']:,.2f} "
+        f"({result['cost'] / monolithic_cost - 1:+.3%}) in {times['total']:.2f} seconds "
+        f"over {result['windows']} windows (build {times['build']:.2f}, "
+        f"update {times['update']:.2f}, solve {times['solve']:.2f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
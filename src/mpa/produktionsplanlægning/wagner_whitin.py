@@ -0,0 +1,194 @@
+# The Wagner-Whitin dynamic program for uncapacitated lot sizing (ULS). An
+# optimal plan only produces when the stock runs empty, so each production
+# covers the demand of a run of consecutive periods, and the cheapest plan of
+# the first j periods is the cheapest plan of the first i periods plus one
+# production in period i covering periods i, ..., j - 1. The cost of each
+# such run is read off cumulative sums, and many items are solved at once by
+# vectorising the recursion over the items.
+#
+# With H[t] the holding cost of carrying a unit from period 0 to period t, a
+# unit produced in period i for period t costs p[i] - H[i] + H[t], so with the
+# cumulative sums D of the demands and DH of the demands times H
+#
+#     cost(i, j) = q[i] + (p[i] - H[i]) * (D[j] - D[i]) + DH[j] - DH[i]
+#
+# where the setup cost q[i] is only paid when the run has any demand.
+
+import os
+import time
+
+import numpy as np
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.instance_generator import lot_sizing_instance
+
+
+def wagner_whitin_batch(
+    demands: np.ndarray,
+    var_cost: np.ndarray,
+    fixed_cost: np.ndarray,
+    inv_cost: np.ndarray,
+    chunk_size: int = 10_000,
+) -> dict:
+    """
+    Solve the uncapacitated lot sizing problem of many items with the Wagner-Whitin dynamic program.
+
+    Each row is an independent item with zero opening and closing stock. The
+    capacities max_prod and max_inv of the MILP in 5_2_0_ULS.py are not part
+    of the problem. The recursion runs over the periods and is vectorised over
+    the items, in chunks of chunk_size items to bound the memory use.
+
+    Parameters:
+    demands (np.ndarray): The demand of each item (row) in each period (column), shape (K, T).
+    var_cost (np.ndarray): The unit production costs, broadcastable to (K, T), e.g. a row shared by all items.
+    fixed_cost (np.ndarray): The setup costs, broadcastable to (K, T).
+    inv_cost (np.ndarray): The unit holding costs of the stock at the end of each period, broadcastable to (K, T).
+    chunk_size (int, optional): The number of items solved at once. Defaults to 10_000.
+
+    Returns:
+    dict: The production "x", setups "y" and end-of-period stock "s" of each item and period, shape (K, T), and the optimal "cost" of each item, shape (K,).
+    """
+    demands = np.atleast_2d(np.asarray(demands))
+    K, T = demands.shape
+    costs = [
+        np.broadcast_to(np.asarray(cost, dtype=np.float64), (K, T))
+        for cost in (var_cost, fixed_cost, inv_cost)
+    ]
+
+    plan = {
+        "x": np.zeros((K, T), dtype=demands.dtype),
+        "y": np.zeros((K, T), dtype=bool),
+        "s": np.zeros((K, T), dtype=demands.dtype),
+        "cost": np.zeros(K),
+    }
+    for start in range(0, K, chunk_size):
+        rows = slice(start, start + chunk_size)
+        chunk = _solve_chunk(demands[rows], *(cost[rows] for cost in costs))
+        for key, value in chunk.items():
+            plan[key][rows] = value
+
+    return plan
+
+
+def wagner_whitin(data: dict) -> dict:
+    """
+    Solve a single-item lot sizing instance with the Wagner-Whitin dynamic program.
+
+    Parameters:
+    data (dict): The instance in the schema of read_data in 5_2_0_ULS.py. The capacities "max_prod" and "max_inv" are ignored.
+
+    Returns:
+    dict: The production "x", setups "y" and end-of-period stock "s" as lists indexed by period like the variables of the MILP, and the optimal "cost".
+    """
+    plan = wagner_whitin_batch(
+        data["demands"], data["var_cost"], data["fixed_cost"], data["inv_cost"]
+    )
+
+    return {
+        "x": plan["x"][0].tolist(),
+        "y": plan["y"][0].astype(int).tolist(),
+        "s": plan["s"][0].tolist(),
+        "cost": float(plan["cost"][0]),
+    }
+
+
+def load_plan(model: pyomo.ConcreteModel(), plan: dict) -> None:
+    """
+    Set the variables x, y and s of a ULS model to a plan, e.g. to display it with display_solution of 5_2_0_ULS.py or as a warm start.
+
+    Parameters:
+    model (pyomo.ConcreteModel): A model from build_model in 5_2_0_ULS.py.
+    plan (dict): The plan, see wagner_whitin.
+    """
+    for t in model.t:
+        model.x[t].value = plan["x"][t]
+        model.y[t].value = plan["y"][t]
+        model.s[t].value = plan["s"][t]
+
+
+def _solve_chunk(d, p, q, h):
+    K, T = d.shape
+    zeros = np.zeros((K, 1))
+
+    # Cumulative sums from period 0, with D[:, j] the demand of periods 0, ..., j - 1
+    D = np.hstack([zeros, np.cumsum(d, axis=1, dtype=np.float64)])
+    H = np.hstack([zeros, np.cumsum(h, axis=1)])
+    DH = np.hstack([zeros, np.cumsum(d * H[:, :T], axis=1)])
+    unit = p - H[:, :T]
+
+    # best[:, j] is the cost of the first j periods, produced last in period previous[:, j]
+    best = np.zeros((K, T + 1))
+    previous = np.zeros((K, T + 1), dtype=np.int64)
+    for j in range(1, T + 1):
+        covered = D[:, [j]] - D[:, :j]
+        cost = (
+            best[:, :j]
+            + np.where(covered > 0, q[:, :j], 0)
+            + unit[:, :j] * covered
+            + DH[:, [j]]
+            - DH[:, :j]
+        )
+        previous[:, j] = np.argmin(cost, axis=1)
+        best[:, j] = cost[np.arange(K), previous[:, j]]
+
+    # Follow the runs back from the last period, all items at once
+    x = np.zeros(d.shape, dtype=d.dtype)
+    items = np.arange(K)
+    j = np.full(K, T)
+    while (j > 0).any():
+        active = items[j > 0]
+        i = previous[active, j[active]]
+        run = D[active, j[active]] - D[active, i]
+        # The float sums of integer demands are rounded back to whole units
+        x[active, i] = np.round(run) if d.dtype.kind in "iu" else run
+        j[active] = i
+
+    return {
+        "x": x,
+        "y": x > 0,
+        "s": np.cumsum(x - d, axis=1),
+        "cost": best[:, T],
+    }
+
+
+def main(num_items: int = 10_000, T: int = 52):
+    # The MILP of 5_2_0_ULS.py, with the capacities lifted and no stock
+    # requirement at the end of the first period, is the same problem
+    uls = load_script(os.path.join(os.path.dirname(__file__), "5_2_0_ULS.py"))
+
+    data = uls.read_data()
+    data.update(max_prod=None, max_inv=None)
+    model = uls.build_model(data)
+    model.beginningInventory.deactivate()
+
+    start = time.time()
+    pyomo.SolverFactory("appsi_highs").solve(model)
+    milp_time = time.time() - start
+
+    start = time.time()
+    plan = wagner_whitin(data)
+    ww_time = time.time() - start
+
+    print(f"MILP:          {pyomo.value(model.obj):,.2f} in {milp_time:.4f} seconds")
+    print(f"Wagner-Whitin: {plan['cost']:,.2f} in {ww_time:.4f} seconds")
+
+    # A catalogue of items with the same weekly holding costs
+    items = [lot_sizing_instance(T, seed=seed) for seed in range(num_items)]
+    demands = np.array([item["demands"] for item in items])
+    var_cost = np.array([item["var_cost"] for item in items])
+    fixed_cost = np.array([item["fixed_cost"] for item in items])
+
+    start = time.time()
+    plans = wagner_whitin_batch(demands, var_cost, fixed_cost, items[0]["inv_cost"])
+    elapsed = time.time() - start
+
+    print(
+        f"{num_items:,} items of {T} periods in {elapsed:.2f} seconds, "
+        f"{num_items / elapsed:,.0f} items per second, "
+        f"{plans['y'].sum(axis=1).mean():.1f} setups per item on average"
+    )
+
+
+if __name__ == "__main__":
+    main()
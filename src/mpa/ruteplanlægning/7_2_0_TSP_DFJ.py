@@ -1,19 +1,26 @@
-import matplotlib.pyplot as plt
+import time
+
 import pyomo.environ as pyomo
 
 from mpa.utilities.file_utils import read_json
-from mpa.utilities.support_functions import create_subsets
+from mpa.utilities.plot_utils import plot_routes, render
+from mpa.utilities.route_utils import adjacency, extract_routes, make_arcs
+from mpa.utilities.support_functions import create_subsets, find_connected_components
 
 
-def read_data(path: str) -> dict:
+def read_data(path: str, lazy: bool = False) -> dict:
     data = read_json(path)
 
-    data["all_subsets"] = create_subsets(data["n"])
+    # In lazy mode the SECs are separated while solving instead
+    if not lazy:
+        data["all_subsets"] = create_subsets(data["n"])
 
     return data
 
 
-def build_model(data: dict) -> pyomo.ConcreteModel():
+def build_model(
+    data: dict, lazy: bool = False, k: int = None, arcs: list = None
+) -> pyomo.ConcreteModel():
     # Instantiate model
     model = pyomo.ConcreteModel()
 
@@ -21,17 +28,17 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.nodes = range(0, data["n"] + 1)
     model.dist = data["dist"]
 
+    # The arcs of the model: all arcs, the k nearest neighbours of each node
+    # (see route_utils.knn_arcs), or an explicit arc set
+    model.arcs = make_arcs(model.dist, k, arcs)
+    model.out_nodes, model.in_nodes = adjacency(model.arcs, len(model.nodes))
+
     # Define variables
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
-    for i in model.nodes:
-        model.x[i, i].fix(0)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
 
     # Define objective function
     model.obj = pyomo.Objective(
-        expr=sum(
-            sum(model.dist[i][j] * model.x[i, j] for j in model.nodes)
-            for i in model.nodes
-        ),
+        expr=sum(model.dist[i][j] * model.x[i, j] for i, j in model.arcs),
         sense=pyomo.minimize,
     )
 
@@ -39,73 +46,112 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.sum_to_one = pyomo.ConstraintList()
     # In to node j
     for j in model.nodes:
-        model.sum_to_one.add(expr=sum(model.x[i, j] for i in model.nodes) == 1)
+        model.sum_to_one.add(expr=sum(model.x[i, j] for i in model.in_nodes[j]) == 1)
     # Out of node i
     for i in model.nodes:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for j in model.out_nodes[i]) == 1)
 
     # Constraint: Add all the sub-tour elimination constraints
     model.SECs = pyomo.ConstraintList()
-    for set in data["all_subsets"]:
-        model.SECs.add(
-            expr=sum(model.x[i, j] for i in set for j in set if i != j) <= len(set) - 1
-        )
+    if not lazy:
+        for set in data["all_subsets"]:
+            add_SEC(model, set)
 
     return model
 
 
+def add_SEC(model: pyomo.ConcreteModel(), set: list):
+    members = frozenset(set)
+    model.SECs.add(
+        expr=sum(model.x[i, j] for i in set for j in model.out_nodes[i] if j in members)
+        <= len(set) - 1
+    )
+
+
+def add_violated_SECs(model: pyomo.ConcreteModel()) -> int:
+    # The support graph of an integer solution satisfying the degree constraints
+    # is a set of disjoint cycles - every cycle but a full tour is a subtour
+    arcs = [(i, j) for (i, j), x in model.x.items() if x.value and x.value > 0.5]
+    components = find_connected_components(model.nodes, arcs)
+
+    if len(components) == 1:
+        return 0
+
+    for component in components:
+        add_SEC(model, component)
+
+    return len(components)
+
+
 def solve_model(model: pyomo.ConcreteModel()):
     solver = pyomo.SolverFactory("gurobi")
 
     solver.solve(model, tee=True)
 
 
-def display_solution(model: pyomo.ConcreteModel(), data: dict):
+def solve_model_lazy(
+    model: pyomo.ConcreteModel(), solver: str = "gurobi", max_rounds: int = 100
+) -> dict:
+    solver = pyomo.SolverFactory(solver)
+
+    stats = {"iterations": 0, "cuts": 0, "round_times": [], "termination": None}
+
+    # Solve with the SECs found so far, until the solution is a single tour
+    while stats["iterations"] < max_rounds:
+        start = time.time()
+        results = solver.solve(model, tee=False, load_solutions=False)
+        termination = results.solver.termination_condition
+        stats["termination"] = str(termination)
+        # The SECs are separated from the solution, which must be optimal
+        if termination != pyomo.TerminationCondition.optimal:
+            raise RuntimeError(
+                f"Round {stats['iterations'] + 1} ended with {termination}"
+            )
+        model.solutions.load_from(results)
+        cuts = add_violated_SECs(model)
+
+        stats["iterations"] += 1
+        stats["cuts"] += cuts
+        stats["round_times"].append(time.time() - start)
+
+        print(
+            f"Round {stats['iterations']}: {cuts} SECs added "
+            f"({stats['round_times'][-1]:.2f} seconds)"
+        )
+
+        if cuts == 0:
+            break
+    else:
+        # The last solution has subtours, so its cost is only a lower bound
+        stats["termination"] = str(pyomo.TerminationCondition.maxIterations)
+        print(f"No single tour after {max_rounds} rounds with {stats['cuts']} SECs")
+        return stats
+
+    print(
+        f"Single tour found after {stats['iterations']} rounds "
+        f"with {stats['cuts']} SECs in {sum(stats['round_times']):.2f} seconds"
+    )
+
+    return stats
+
+
+def display_solution(model: pyomo.ConcreteModel(), data: dict, path: str = None):
     optimal_cost = round(pyomo.value(model.obj), 4)
 
     print(f"Optimal objection function value = {optimal_cost:,}")
 
+    # Find the route from the x[i,j] values
+    solution = extract_routes(model.x)
+    tour = solution["routes"][0]
     print("Optimal tour is")
-    current_node = 0
-    print(f"{current_node} -> ", end="")
-    counter = 0
+    print(" -> ".join(str(i) for i in tour))
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
 
-    # Flag for testing if coordinates are present in the data
+    # Plot the solution in a coordinate system
     coordinates_present = "x_coord" in data and "y_coord" in data
     if coordinates_present:
-        display_x = [data["x_coord"][0]]
-        display_y = [data["y_coord"][0]]
-        labels = [0]
-
-    # Find the route from the x[i,j] values
-    while True:
-        counter = counter + 1
-        # Find next on route
-        for i in model.nodes:
-            if i != current_node and pyomo.value(model.x[current_node, i]) == 1:
-                if coordinates_present:
-                    display_x.append(data["x_coord"][i])
-                    display_y.append(data["y_coord"][i])
-                if i > 0:
-                    print(f"{i} -> ", end="")
-                    if coordinates_present:
-                        labels.append(i)
-                else:
-                    print(i, end="")
-                tmpcurrent_node = i
-        current_node = tmpcurrent_node
-        if current_node < 1:
-            break
-    print("")
-
-    # Start plotting the solution to a coordinate system
-    if coordinates_present:
-        plt.plot(display_x, display_y, "-o")
-        for i, label in enumerate(labels):
-            plt.annotate(label, (display_x[i], display_y[i]))
-        plt.show()
+        render(plot_routes, [tour], data["x_coord"], data["y_coord"], path=path)
 
 
 def display_solution_simple(model: pyomo.ConcreteModel()):
@@ -113,31 +159,21 @@ def display_solution_simple(model: pyomo.ConcreteModel()):
 
     print(f"Optimal objection function value = {optimal_cost:,}")
 
-    current_node = 0
-
-    # Find first on tour:
-    for j in model.nodes:
-        if pyomo.value(model.x[current_node, j]) >= 0.9999:
-            print("0 ->", j, end="")
-            current_node = j
-            break
-
-    # Find the remaining nodes of the tour
-    while current_node != 0:
-        # Find the next node
-        for j in model.nodes:
-            if pyomo.value(model.x[current_node, j]) >= 0.9999:
-                print(f" -> {j}", end="")
-                current_node = j
-                break
+    solution = extract_routes(model.x)
+    print(" -> ".join(str(i) for i in solution["routes"][0]))
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
 
     print("")
 
 
-def main():
-    data = read_data("src/mpa/ruteplanlægning/7_2_data.json")
-    model = build_model(data)
-    solve_model(model)
+def main(lazy: bool = False):
+    data = read_data("src/mpa/ruteplanlægning/7_2_data.json", lazy)
+    model = build_model(data, lazy)
+    if lazy:
+        solve_model_lazy(model)
+    else:
+        solve_model(model)
     # display_solution(model, data)
     display_solution_simple(model)
 
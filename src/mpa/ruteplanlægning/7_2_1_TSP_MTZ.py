@@ -1,7 +1,8 @@
-import matplotlib.pyplot as plt
 import pyomo.environ as pyomo
 
 from mpa.utilities.file_utils import read_json
+from mpa.utilities.plot_utils import plot_routes, render
+from mpa.utilities.route_utils import adjacency, extract_routes, make_arcs
 
 
 def read_data(path: str) -> dict:
@@ -10,7 +11,7 @@ def read_data(path: str) -> dict:
     return data
 
 
-def build_model(data: dict) -> pyomo.ConcreteModel():
+def build_model(data: dict, k: int = None, arcs: list = None) -> pyomo.ConcreteModel():
     # Instantiate model
     model = pyomo.ConcreteModel()
 
@@ -23,10 +24,13 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.nodes = range(0, data["n"] + 1)
     model.dist = data["dist"]
 
+    # The arcs of the model: all arcs, the k nearest neighbours of each node
+    # (see route_utils.knn_arcs), or an explicit arc set
+    model.arcs = make_arcs(model.dist, k, arcs)
+    model.out_nodes, model.in_nodes = adjacency(model.arcs, len(model.nodes))
+
     # Define variables
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
-    for i in model.nodes:
-        model.x[i, i].fix(0)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
 
     model.u = pyomo.Var(
         model.customers, within=pyomo.NonNegativeReals, bounds=(1, model.n)
@@ -34,10 +38,7 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
 
     # Define objective function
     model.obj = pyomo.Objective(
-        expr=sum(
-            sum(model.dist[i][j] * model.x[i, j] for j in model.nodes)
-            for i in model.nodes
-        ),
+        expr=sum(model.dist[i][j] * model.x[i, j] for i, j in model.arcs),
         sense=pyomo.minimize,
     )
 
@@ -45,14 +46,10 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.sum_to_one = pyomo.ConstraintList()
     # In to node j
     for j in model.nodes:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for i in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for i in model.in_nodes[j]) == 1)
     # Out of node i
     for i in model.nodes:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for j in model.out_nodes[i]) == 1)
 
     # Constraints: Add all the sub-tour elimination constraints
     model.mtz_order = pyomo.ConstraintList()
@@ -62,10 +59,12 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
 
     model.mtz_complete = pyomo.ConstraintList()
     for i in model.customers:
-        for j in model.customers:
-            model.mtz_complete.add(
-                expr=model.u[i] - model.u[j] + model.n * model.x[i, j] <= model.n - 1
-            )
+        for j in model.out_nodes[i]:
+            if j != 0:
+                model.mtz_complete.add(
+                    expr=model.u[i] - model.u[j] + model.n * model.x[i, j]
+                    <= model.n - 1
+                )
 
     return model
 
@@ -76,50 +75,23 @@ def solve_model(model: pyomo.ConcreteModel()):
     solver.solve(model, tee=True)
 
 
-def display_solution(model: pyomo.ConcreteModel(), data: dict):
+def display_solution(model: pyomo.ConcreteModel(), data: dict, path: str = None):
     optimal_cost = round(pyomo.value(model.obj), 4)
 
     print(f"Optimal objection function value = {optimal_cost:,}")
 
+    # Find the route from the x[i,j] values
+    solution = extract_routes(model.x)
+    tour = solution["routes"][0]
     print("Optimal tour is")
-    current_node = 0
-    print(f"{current_node} -> ", end="")
-    counter = 0
+    print(" -> ".join(str(i) for i in tour))
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
 
-    # Flag for testing if coordinates are present in the data
+    # Plot the solution in a coordinate system
     coordinates_present = "x_coord" in data and "y_coord" in data
     if coordinates_present:
-        display_x = [data["x_coord"][0]]
-        display_y = [data["y_coord"][0]]
-        labels = [0]
-
-    # Find the route from the x[i,j] values
-    while True:
-        counter = counter + 1
-        # Find next on route
-        for i in model.nodes:
-            if i != current_node and pyomo.value(model.x[current_node, i]) == 1:
-                if coordinates_present:
-                    display_x.append(data["x_coord"][i])
-                    display_y.append(data["y_coord"][i])
-                if i > 0:
-                    print(f"{i} -> ", end="")
-                    if coordinates_present:
-                        labels.append(i)
-                else:
-                    print(i, end="")
-                tmpcurrent_node = i
-        current_node = tmpcurrent_node
-        if current_node < 1:
-            break
-    print("")
-
-    # Start plotting the solution to a coordinate system
-    if coordinates_present:
-        plt.plot(display_x, display_y, "-o")
-        for i, label in enumerate(labels):
-            plt.annotate(label, (display_x[i], display_y[i]))
-        plt.show()
+        render(plot_routes, [tour], data["x_coord"], data["y_coord"], path=path)
 
 
 def display_solution_simple(model: pyomo.ConcreteModel()):
@@ -127,23 +99,10 @@ def display_solution_simple(model: pyomo.ConcreteModel()):
 
     print(f"Optimal objection function value = {optimal_cost:,}")
 
-    current_node = 0
-
-    # Find first on tour:
-    for j in model.nodes:
-        if pyomo.value(model.x[current_node, j]) >= 0.9999:
-            print("0 ->", j, end="")
-            current_node = j
-            break
-
-    # Find the remaining nodes of the tour
-    while current_node != 0:
-        # Find the next node
-        for j in model.nodes:
-            if pyomo.value(model.x[current_node, j]) >= 0.9999:
-                print(f" -> {j}", end="")
-                current_node = j
-                break
+    solution = extract_routes(model.x)
+    print(" -> ".join(str(i) for i in solution["routes"][0]))
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
 
     print("")
 
@@ -1,7 +1,8 @@
-import matplotlib.pyplot as plt
 import pyomo.environ as pyomo
 
 from mpa.utilities.file_utils import read_json
+from mpa.utilities.plot_utils import plot_routes, render
+from mpa.utilities.route_utils import adjacency, extract_routes, make_arcs
 
 
 def read_data(path: str) -> dict:
@@ -10,7 +11,7 @@ def read_data(path: str) -> dict:
     return data
 
 
-def build_model(data: dict) -> pyomo.ConcreteModel():
+def build_model(data: dict, k: int = None, arcs: list = None) -> pyomo.ConcreteModel():
     # Instantiate model
     model = pyomo.ConcreteModel()
 
@@ -26,10 +27,13 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.m = data["m"]
     model.S = data["S"]
 
+    # The arcs of the model: all arcs, the k nearest neighbours of each node
+    # (see route_utils.knn_arcs), or an explicit arc set
+    model.arcs = make_arcs(model.dist, k, arcs)
+    model.out_nodes, model.in_nodes = adjacency(model.arcs, len(model.nodes))
+
     # Define variables
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
-    for i in model.nodes:
-        model.x[i, i].fix(0)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
 
     model.u = pyomo.Var(
         model.customers, within=pyomo.NonNegativeReals, bounds=(1, model.S)
@@ -37,10 +41,7 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
 
     # Define objective function
     model.obj = pyomo.Objective(
-        expr=sum(
-            sum(model.dist[i][j] * model.x[i, j] for j in model.nodes if i != j)
-            for i in model.nodes
-        ),
+        expr=sum(model.dist[i][j] * model.x[i, j] for i, j in model.arcs),
         sense=pyomo.minimize,
     )
 
@@ -48,21 +49,17 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.sum_to_one = pyomo.ConstraintList()
     # In to node j
     for j in model.customers:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for i in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for i in model.in_nodes[j]) == 1)
     # Out of node i
     for i in model.customers:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for j in model.out_nodes[i]) == 1)
 
     # Constraints: m in and m out of storage
     model.depot_out = pyomo.Constraint(
-        expr=sum(model.x[0, j] for j in model.nodes) == model.m
+        expr=sum(model.x[0, j] for j in model.out_nodes[0]) == model.m
     )
     model.depot_in = pyomo.Constraint(
-        expr=sum(model.x[i, 0] for i in model.nodes) == model.m
+        expr=sum(model.x[i, 0] for i in model.in_nodes[0]) == model.m
     )
 
     # Constraint: each vehicle/salesperson can only service S customers:
@@ -74,14 +71,15 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     # Constraint: trefold inequality
     model.trefold_ineq = pyomo.ConstraintList()
     for i in model.customers:
-        for j in model.customers:
-            model.trefold_ineq.add(
-                expr=model.u[i]
-                - model.u[j]
-                + model.S * model.x[i, j]
-                + (model.S - 2) * model.x[j, i]
-                <= model.S - 1
-            )
+        for j in model.out_nodes[i]:
+            if j != 0:
+                model.trefold_ineq.add(
+                    expr=model.u[i]
+                    - model.u[j]
+                    + model.S * model.x[i, j]
+                    + ((model.S - 2) * model.x[j, i] if (j, i) in model.x else 0)
+                    <= model.S - 1
+                )
 
     return model
 
@@ -92,58 +90,32 @@ def solve_model(model: pyomo.ConcreteModel()):
     solver.solve(model, tee=True)
 
 
-def display_solution(model: pyomo.ConcreteModel(), data: dict):
+def display_solution(model: pyomo.ConcreteModel(), data: dict, path: str = None):
     # Print total length of tours
     print("Total length of tours:", pyomo.value(model.obj))
 
     # Find a tour for each vehicle
-    last_route_starter = 0
+    solution = extract_routes(model.x, q=data.get("q"), dist=data["dist"])
     coordinates_present = "x_coord" in data and "y_coord" in data
-    for vehicle in range(1, model.m + 1):
-        if coordinates_present:
-            display_x = [data["x_coord"][0]]
-            display_y = [data["y_coord"][0]]
-            labels = [0]
-
-        # Find the customer, that starts the next route
-        current_node = 0
-        for j in model.customers:
-            if j > last_route_starter and pyomo.value(model.x[0, j]) >= 0.9999:
-                current_node, last_route_starter = j, j
-
-                if coordinates_present:
-                    display_x.append(data["x_coord"][current_node])
-                    display_y.append(data["y_coord"][current_node])
-                    labels.append(current_node)
-
-                break
-
+    for vehicle, route in enumerate(solution["routes"], start=1):
         print(f"The route for vehicle {vehicle} is:")
-        print(f"0 -> {current_node}", end="")
-
-        # Build the route from current node back to the depot
-        while current_node != 0:
-            for j in model.nodes:
-                if (
-                    current_node != j
-                    and pyomo.value(model.x[current_node, j]) >= 0.9999
-                ):
-                    print(f" -> {j}", end="")
-                    current_node = j
-                    if coordinates_present:
-                        display_x.append(data["x_coord"][current_node])
-                        display_y.append(data["y_coord"][current_node])
-                        labels.append(current_node)
-                    break
-
-        print("\n")
-        if coordinates_present:
-            # Start plotting the solution to a coordinate system
-            if coordinates_present:
-                plt.plot(display_x, display_y, "-o")
-                for i, label in enumerate(labels):
-                    plt.annotate(label, (display_x[i], display_y[i]))
-    plt.show()
+        print(" -> ".join(str(i) for i in route))
+        if solution["loads"] is not None:
+            print(f"Load: {solution['loads'][vehicle - 1]}", end=", ")
+        print(f"Length: {solution['lengths'][vehicle - 1]}")
+        print("")
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
+
+    # Plot the solution in a coordinate system
+    if coordinates_present:
+        render(
+            plot_routes,
+            solution["routes"],
+            data["x_coord"],
+            data["y_coord"],
+            path=path,
+        )
 
 
 def display_solution_simple(model: pyomo.ConcreteModel()):
@@ -151,32 +123,13 @@ def display_solution_simple(model: pyomo.ConcreteModel()):
 
     print(f"Optimal objection function value = {optimal_cost:,}")
 
-    last_route_starter = 0
-
-    for vehicle in range(1, model.m + 1):
+    solution = extract_routes(model.x)
+    for vehicle, route in enumerate(solution["routes"], start=1):
         print(f"The route for vehicle {vehicle} is:")
-        current_node = 0
-
-        # Find the first node on the route
-        for j in model.nodes:
-            if (
-                j > last_route_starter
-                and pyomo.value(model.x[current_node, j]) >= 0.9999
-            ):
-                print(f"0 -> {j}", end="")
-                current_node, last_route_starter = j, j
-                break
-
-        # Find the remaining nodes of the route
-        while current_node != 0:
-            # Find the next node
-            for j in model.nodes:
-                if pyomo.value(model.x[current_node, j]) >= 0.9999:
-                    print(f" -> {j}", end="")
-                    current_node = j
-                    break
-
-        print("\n")
+        print(" -> ".join(str(i) for i in route))
+        print("")
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
 
     print("")
 
@@ -1,7 +1,11 @@
-import matplotlib.pyplot as plt
 import pyomo.environ as pyomo
 
+from mpa.heuristikker.routing import solve_routing
+from mpa.heuristikker.warm_start import set_warm_start
+from mpa.utilities.cut_utils import capacity_cut_loop
 from mpa.utilities.file_utils import read_json
+from mpa.utilities.plot_utils import plot_routes, render
+from mpa.utilities.route_utils import adjacency, extract_routes, make_arcs
 
 
 def read_data(path: str) -> dict:
@@ -10,7 +14,7 @@ def read_data(path: str) -> dict:
     return data
 
 
-def build_model(data: dict) -> pyomo.ConcreteModel():
+def build_model(data: dict, k: int = None, arcs: list = None) -> pyomo.ConcreteModel():
     # Instantiate model
     model = pyomo.ConcreteModel()
 
@@ -28,10 +32,13 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.q = data["q"]
     model.Q = data["Q"]
 
+    # The arcs of the model: all arcs, the k nearest neighbours of each node
+    # (see route_utils.knn_arcs), or an explicit arc set
+    model.arcs = make_arcs(model.dist, k, arcs)
+    model.out_nodes, model.in_nodes = adjacency(model.arcs, len(model.nodes))
+
     # Define variables
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
-    for i in model.nodes:
-        model.x[i, i].fix(0)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
 
     model.v = pyomo.Var(
         model.customers, within=pyomo.NonNegativeReals, bounds=(0, model.Q)
@@ -39,10 +46,7 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
 
     # Define objective function
     model.obj = pyomo.Objective(
-        expr=sum(
-            sum(model.dist[i][j] * model.x[i, j] for j in model.nodes if i != j)
-            for i in model.nodes
-        ),
+        expr=sum(model.dist[i][j] * model.x[i, j] for i, j in model.arcs),
         sense=pyomo.minimize,
     )
 
@@ -50,21 +54,17 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.sum_to_one = pyomo.ConstraintList()
     # In to node j
     for j in model.customers:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for i in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for i in model.in_nodes[j]) == 1)
     # Out of node i
     for i in model.customers:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for j in model.out_nodes[i]) == 1)
 
     # Constraints: m in and m out of storage
     model.depot_out = pyomo.Constraint(
-        expr=sum(model.x[0, j] for j in model.nodes) == model.m
+        expr=sum(model.x[0, j] for j in model.out_nodes[0]) == model.m
     )
     model.depot_in = pyomo.Constraint(
-        expr=sum(model.x[i, 0] for i in model.nodes) == model.m
+        expr=sum(model.x[i, 0] for i in model.in_nodes[0]) == model.m
     )
 
     # Constraint: no sub routes (note that it model.v has been bound from 0 to Q)
@@ -75,8 +75,8 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     # Constraint: the capacity is not exceeded
     model.capacity = pyomo.ConstraintList()
     for i in model.customers:
-        for j in model.customers:
-            if i != j:
+        for j in model.out_nodes[i]:
+            if j != 0:
                 model.capacity.add(
                     expr=model.v[i] - model.v[j] + model.Q * model.x[i, j]
                     <= model.Q - model.q[j]
@@ -85,65 +85,40 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     return model
 
 
-def solve_model(model: pyomo.ConcreteModel()):
+def solve_model(model: pyomo.ConcreteModel(), warmstart: bool = False):
     solver = pyomo.SolverFactory("gurobi")
     solver.options["timelimit"] = 60 * 3
 
-    solver.solve(model, tee=True)
+    # Start from the solution set on the variables, see set_warm_start
+    solver.solve(model, tee=True, warmstart=warmstart)
 
 
-def display_solution(model: pyomo.ConcreteModel(), data: dict):
+def display_solution(model: pyomo.ConcreteModel(), data: dict, path: str = None):
     # Print total length of tours
     print("Total length of tours:", pyomo.value(model.obj))
 
     # Find a tour for each vehicle
-    last_route_starter = 0
+    solution = extract_routes(model.x, q=data.get("q"), dist=data["dist"])
     coordinates_present = "x_coord" in data and "y_coord" in data
-    for vehicle in range(1, model.m + 1):
-        if coordinates_present:
-            display_x = [data["x_coord"][0]]
-            display_y = [data["y_coord"][0]]
-            labels = [0]
-
-        # Find the customer, that starts the next route
-        current_node = 0
-        for j in model.customers:
-            if j > last_route_starter and pyomo.value(model.x[0, j]) >= 0.9999:
-                current_node, last_route_starter = j, j
-
-                if coordinates_present:
-                    display_x.append(data["x_coord"][current_node])
-                    display_y.append(data["y_coord"][current_node])
-                    labels.append(current_node)
-
-                break
-
+    for vehicle, route in enumerate(solution["routes"], start=1):
         print(f"The route for vehicle {vehicle} is:")
-        print(f"0 -> {current_node}", end="")
-
-        # Build the route from current node back to the depot
-        while current_node != 0:
-            for j in model.nodes:
-                if (
-                    current_node != j
-                    and pyomo.value(model.x[current_node, j]) >= 0.9999
-                ):
-                    print(f" -> {j}", end="")
-                    current_node = j
-                    if coordinates_present:
-                        display_x.append(data["x_coord"][current_node])
-                        display_y.append(data["y_coord"][current_node])
-                        labels.append(current_node)
-                    break
-
-        print("\n")
-        if coordinates_present:
-            # Start plotting the solution to a coordinate system
-            if coordinates_present:
-                plt.plot(display_x, display_y, "-o")
-                for i, label in enumerate(labels):
-                    plt.annotate(label, (display_x[i], display_y[i]))
-    plt.show()
+        print(" -> ".join(str(i) for i in route))
+        if solution["loads"] is not None:
+            print(f"Load: {solution['loads'][vehicle - 1]}", end=", ")
+        print(f"Length: {solution['lengths'][vehicle - 1]}")
+        print("")
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
+
+    # Plot the solution in a coordinate system
+    if coordinates_present:
+        render(
+            plot_routes,
+            solution["routes"],
+            data["x_coord"],
+            data["y_coord"],
+            path=path,
+        )
 
 
 def display_solution_simple(model: pyomo.ConcreteModel()):
@@ -151,40 +126,28 @@ def display_solution_simple(model: pyomo.ConcreteModel()):
 
     print(f"Optimal objection function value = {optimal_cost:,}")
 
-    last_route_starter = 0
-
-    for vehicle in range(1, model.m + 1):
+    solution = extract_routes(model.x)
+    for vehicle, route in enumerate(solution["routes"], start=1):
         print(f"The route for vehicle {vehicle} is:")
-        current_node = 0
-
-        # Find the first node on the route
-        for j in model.nodes:
-            if (
-                j > last_route_starter
-                and pyomo.value(model.x[current_node, j]) >= 0.9999
-            ):
-                print(f"0 -> {j}", end="")
-                current_node, last_route_starter = j, j
-                break
-
-        # Find the remaining nodes of the route
-        while current_node != 0:
-            # Find the next node
-            for j in model.nodes:
-                if pyomo.value(model.x[current_node, j]) >= 0.9999:
-                    print(f" -> {j}", end="")
-                    current_node = j
-                    break
-
-        print("\n")
+        print(" -> ".join(str(i) for i in route))
+        print("")
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
 
     print("")
 
 
-def main():
+def main(warm_start: bool = False, capacity_cuts: bool = False):
     data = read_data("src/mpa/ruteplanlægning/7_4_CVRP_n_29_data.json")
     model = build_model(data)
-    solve_model(model)
+    if capacity_cuts:
+        # Tighten the weak LP relaxation with rounded capacity inequalities,
+        # separated with an LP solver (HiGHS by default, see capacity_cut_loop)
+        capacity_cut_loop(model)
+    if warm_start:
+        # Give the solver the routes of the heuristic as its first incumbent
+        set_warm_start(model, solve_routing(data)["routes"])
+    solve_model(model, warmstart=warm_start)
     # display_solution(model, data)
     display_solution_simple(model)
 
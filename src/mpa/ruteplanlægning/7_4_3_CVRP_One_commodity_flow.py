@@ -1,7 +1,13 @@
-import matplotlib.pyplot as plt
+import numpy as np
 import pyomo.environ as pyomo
 
+from mpa.heuristikker.routing import solve_routing
+from mpa.heuristikker.warm_start import set_warm_start
+from mpa.utilities.cut_utils import capacity_cut_loop
 from mpa.utilities.file_utils import read_json
+from mpa.utilities.matrix_utils import SparseConstraintBuilder, flatten_vars
+from mpa.utilities.plot_utils import plot_routes, render
+from mpa.utilities.route_utils import adjacency, extract_routes, make_arcs
 
 
 def read_data(path: str) -> dict:
@@ -10,7 +16,9 @@ def read_data(path: str) -> dict:
     return data
 
 
-def build_model(data: dict) -> pyomo.ConcreteModel():
+def build_model(
+    data: dict, matrix_form: bool = False, k: int = None, arcs: list = None
+) -> pyomo.ConcreteModel():
     # Instantiate model
     model = pyomo.ConcreteModel()
 
@@ -24,19 +32,19 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.q = data["q"]
     model.Q = data["Q"]
 
+    # The arcs of the model: all arcs, the k nearest neighbours of each node
+    # (see route_utils.knn_arcs), or an explicit arc set
+    model.arcs = make_arcs(model.dist, k, arcs)
+    model.out_nodes, model.in_nodes = adjacency(model.arcs, len(model.nodes))
+
     # Define variables
-    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
-    for i in model.nodes:
-        model.x[i, i].fix(0)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
 
-    model.f = pyomo.Var(model.nodes, model.nodes, within=pyomo.NonNegativeReals)
+    model.f = pyomo.Var(model.arcs, within=pyomo.NonNegativeReals)
 
     # Define objective function
     model.obj = pyomo.Objective(
-        expr=sum(
-            sum(model.dist[i][j] * model.x[i, j] for j in model.nodes)
-            for i in model.nodes
-        ),
+        expr=sum(model.dist[i][j] * model.x[i, j] for i, j in model.arcs),
         sense=pyomo.minimize,
     )
 
@@ -44,27 +52,25 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.sum_to_one = pyomo.ConstraintList()
     # In to node j
     for j in model.customers:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for i in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for i in model.in_nodes[j]) == 1)
     # Out of node i
     for i in model.customers:
-        model.sum_to_one.add(
-            expr=sum(model.x[i, j] for j in model.nodes if i != j) == 1
-        )
+        model.sum_to_one.add(expr=sum(model.x[i, j] for j in model.out_nodes[i]) == 1)
 
     # Constraints: m in and m out of storage
     model.depot_out = pyomo.Constraint(
-        expr=sum(model.x[0, j] for j in model.nodes) == model.m
+        expr=sum(model.x[0, j] for j in model.out_nodes[0]) == model.m
     )
     model.depot_in = pyomo.Constraint(
-        expr=sum(model.x[i, 0] for i in model.nodes) == model.m
+        expr=sum(model.x[i, 0] for i in model.in_nodes[0]) == model.m
     )
 
     # Constraints: no sub routes and capacity is respected
-    model.generalized_bounds = pyomo.ConstraintList()
-    for i in model.nodes:
-        for j in model.nodes:
+    if matrix_form:
+        model.generalized_bounds = build_generalized_bounds(model)
+    else:
+        model.generalized_bounds = pyomo.ConstraintList()
+        for i, j in model.arcs:
             model.generalized_bounds.add(
                 expr=model.f[i, j] >= model.q[i] * model.x[i, j]
             )
@@ -76,15 +82,102 @@ def build_model(data: dict) -> pyomo.ConcreteModel():
     model.flow_conservation = pyomo.ConstraintList()
     for i in model.customers:
         model.flow_conservation.add(
-            expr=sum(model.f[i, j] for j in model.nodes)
-            == sum(model.f[j, i] for j in model.nodes) + model.q[i]
+            expr=sum(model.f[i, j] for j in model.out_nodes[i])
+            == sum(model.f[j, i] for j in model.in_nodes[i]) + model.q[i]
         )
 
     return model
 
 
+def build_generalized_bounds(model: pyomo.ConcreteModel()) -> pyomo.Constraint:
+    # The same rows as the ConstraintList, assembled as one sparse matrix
+    variables, (x_offset, f_offset) = flatten_vars(model.x, model.f)
+    tails, heads = np.array(model.arcs).T
+
+    builder = SparseConstraintBuilder()
+    add_generalized_bounds(builder, model.q, model.Q, tails, heads, x_offset, f_offset)
+
+    return builder.to_pyomo(variables)
+
+
+def add_generalized_bounds(
+    builder: SparseConstraintBuilder,
+    q: list,
+    Q: float,
+    i: np.ndarray,
+    j: np.ndarray,
+    x_offset: int,
+    f_offset: int,
+):
+    # Arc a = (i[a], j[a]) has the columns x_offset + a and f_offset + a
+    arcs = np.arange(len(i))
+    q = np.asarray(q, dtype=float)
+    rows = np.concatenate([arcs, arcs])
+    cols = np.concatenate([f_offset + arcs, x_offset + arcs])
+    ones = np.ones(len(arcs))
+    zeros = np.zeros(len(arcs))
+
+    # f[i, j] - q[i] * x[i, j] >= 0
+    builder.add_rows(rows, cols, np.concatenate([ones, -q[i]]), lb=zeros)
+    # f[i, j] - (Q - q[j]) * x[i, j] <= 0
+    builder.add_rows(rows, cols, np.concatenate([ones, -(Q - q[j])]), ub=zeros)
+
+
+def write_lp_model(data: dict, path: str, k: int = None, arcs: list = None):
+    # The complete model assembled as one sparse matrix and written straight to an
+    # LP file, bypassing Pyomo. The columns are x[i, j] followed by f[i, j] for
+    # the arcs of build_model
+    n = data["n"] + 1
+    i, j = np.array(make_arcs(data["dist"], k, arcs)).T
+    numArcs = len(i)
+    x, f = np.arange(numArcs), numArcs + np.arange(numArcs)
+    m = np.full(1, data["m"])
+    q = np.asarray(data["q"], dtype=float)
+
+    builder = SparseConstraintBuilder()
+
+    # Constraint: in and out of verticies
+    into = j > 0
+    builder.add_rows(j[into] - 1, x[into], 1, lb=np.ones(n - 1), ub=np.ones(n - 1))
+    out_of = i > 0
+    builder.add_rows(i[out_of] - 1, x[out_of], 1, lb=np.ones(n - 1), ub=np.ones(n - 1))
+
+    # Constraints: m in and m out of storage
+    builder.add_rows(np.zeros((i == 0).sum()), x[i == 0], 1, lb=m, ub=m)
+    builder.add_rows(np.zeros((j == 0).sum()), x[j == 0], 1, lb=m, ub=m)
+
+    # Constraints: no sub routes and capacity is respected
+    add_generalized_bounds(builder, data["q"], data["Q"], i, j, 0, numArcs)
+
+    # Constraint: flow conservation
+    builder.add_rows(
+        np.concatenate([i[out_of], j[into]]) - 1,
+        np.concatenate([f[out_of], f[into]]),
+        np.concatenate([np.ones(out_of.sum()), -np.ones(into.sum())]),
+        lb=q[1:],
+        ub=q[1:],
+    )
+
+    builder.write_lp(
+        path,
+        c=np.concatenate(
+            [np.asarray(data["dist"], dtype=float)[i, j], np.zeros(numArcs)]
+        ),
+        col_lb=np.zeros(2 * numArcs),
+        col_ub=np.concatenate([np.ones(numArcs), np.full(numArcs, np.inf)]),
+        integer=np.concatenate(
+            [np.ones(numArcs, dtype=bool), np.zeros(numArcs, dtype=bool)]
+        ),
+        names=[f"x_{a}_{b}" for a, b in zip(i, j)]
+        + [f"f_{a}_{b}" for a, b in zip(i, j)],
+    )
+
+
 def solve_model(
-    model: pyomo.ConcreteModel(), timelimit: float = None, gap: float = None
+    model: pyomo.ConcreteModel(),
+    timelimit: float = None,
+    gap: float = None,
+    warmstart: bool = False,
 ):
     solver = pyomo.SolverFactory("gurobi")
 
@@ -94,61 +187,36 @@ def solve_model(
     if gap:
         solver.options["mipgap"] = gap
 
-    solver.solve(model, tee=True)
+    # Start from the solution set on the variables, see set_warm_start
+    solver.solve(model, tee=True, warmstart=warmstart)
 
 
-def display_solution(model: pyomo.ConcreteModel(), data: dict):
+def display_solution(model: pyomo.ConcreteModel(), data: dict, path: str = None):
     # Print total length of tours
     print("Total length of tours:", pyomo.value(model.obj))
 
     # Find a tour for each vehicle
-    last_route_starter = 0
+    solution = extract_routes(model.x, q=data.get("q"), dist=data["dist"])
     coordinates_present = "x_coord" in data and "y_coord" in data
-    for vehicle in range(1, model.m + 1):
-        if coordinates_present:
-            display_x = [data["x_coord"][0]]
-            display_y = [data["y_coord"][0]]
-            labels = [0]
-
-        # Find the customer, that starts the next route
-        current_node = 0
-        for j in model.customers:
-            if j > last_route_starter and pyomo.value(model.x[0, j]) >= 0.9999:
-                current_node, last_route_starter = j, j
-
-                if coordinates_present:
-                    display_x.append(data["x_coord"][current_node])
-                    display_y.append(data["y_coord"][current_node])
-                    labels.append(current_node)
-
-                break
-
+    for vehicle, route in enumerate(solution["routes"], start=1):
         print(f"The route for vehicle {vehicle} is:")
-        print(f"0 -> {current_node}", end="")
-
-        # Build the route from current node back to the depot
-        while current_node != 0:
-            for j in model.nodes:
-                if (
-                    current_node != j
-                    and pyomo.value(model.x[current_node, j]) >= 0.9999
-                ):
-                    print(f" -> {j}", end="")
-                    current_node = j
-                    if coordinates_present:
-                        display_x.append(data["x_coord"][current_node])
-                        display_y.append(data["y_coord"][current_node])
-                        labels.append(current_node)
-                    break
-
-        print("\n")
-        if coordinates_present:
-            # Start plotting the solution to a coordinate system
-            if coordinates_present:
-                plt.plot(display_x, display_y, "-o")
-                for i, label in enumerate(labels):
-                    plt.annotate(label, (display_x[i], display_y[i]))
-    plt.show()
+        print(" -> ".join(str(i) for i in route))
+        if solution["loads"] is not None:
+            print(f"Load: {solution['loads'][vehicle - 1]}", end=", ")
+        print(f"Length: {solution['lengths'][vehicle - 1]}")
+        print("")
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
+
+    # Plot the solution in a coordinate system
+    if coordinates_present:
+        render(
+            plot_routes,
+            solution["routes"],
+            data["x_coord"],
+            data["y_coord"],
+            path=path,
+        )
 
 
 def display_solution_simple(model: pyomo.ConcreteModel()):
@@ -156,40 +224,28 @@ def display_solution_simple(model: pyomo.ConcreteModel()):
 
     print(f"Optimal objection function value = {optimal_cost:,}")
 
-    last_route_starter = 0
-
-    for vehicle in range(1, model.m + 1):
+    solution = extract_routes(model.x)
+    for vehicle, route in enumerate(solution["routes"], start=1):
         print(f"The route for vehicle {vehicle} is:")
-        current_node = 0
-
-        # Find the first node on the route
-        for j in model.nodes:
-            if (
-                j > last_route_starter
-                and pyomo.value(model.x[current_node, j]) >= 0.9999
-            ):
-                print(f"0 -> {j}", end="")
-                current_node, last_route_starter = j, j
-                break
-
-        # Find the remaining nodes of the route
-        while current_node != 0:
-            # Find the next node
-            for j in model.nodes:
-                if pyomo.value(model.x[current_node, j]) >= 0.9999:
-                    print(f" -> {j}", end="")
-                    current_node = j
-                    break
-
-        print("\n")
+        print(" -> ".join(str(i) for i in route))
+        print("")
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
 
     print("")
 
 
-def main():
+def main(warm_start: bool = False, capacity_cuts: bool = False):
     data = read_data("src/mpa/ruteplanlægning/7_4_CVRP_n_29_data.json")
     model = build_model(data)
-    solve_model(model, timelimit=60 * 5, gap=0.10)
+    if capacity_cuts:
+        # Tighten the weak LP relaxation with rounded capacity inequalities,
+        # separated with an LP solver (HiGHS by default, see capacity_cut_loop)
+        capacity_cut_loop(model)
+    if warm_start:
+        # Give the solver the routes of the heuristic as its first incumbent
+        set_warm_start(model, solve_routing(data)["routes"])
+    solve_model(model, timelimit=60 * 5, gap=0.10, warmstart=warm_start)
     # display_solution(model, data)
     display_solution_simple(model)
 
@@ -1,7 +1,8 @@
-import matplotlib.pyplot as plt
 import pyomo.environ as pyomo
 
 from mpa.utilities.file_utils import read_json
+from mpa.utilities.plot_utils import plot_routes, render
+from mpa.utilities.route_utils import adjacency, extract_routes, make_arcs
 
 
 def readData(filename: str) -> dict:
@@ -9,7 +10,7 @@ def readData(filename: str) -> dict:
     return data
 
 
-def buildModel(data: dict) -> pyomo.ConcreteModel():
+def buildModel(data: dict, k: int = None, arcs: list = None) -> pyomo.ConcreteModel():
     # Create model
     model = pyomo.ConcreteModel()
     # Copy data to model
@@ -18,16 +19,19 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     model.dist = data["dist"]
     model.customers = range(1, model.numOfNodes)
     model.p = data["prize"]
+    # Use all arcs, the k nearest neighbours of each node or the given arcs
+    model.arcs = make_arcs(model.dist, k, arcs)
+    model.outNodes, model.inNodes = adjacency(model.arcs, model.numOfNodes)
     # Create Variables
-    model.x = pyomo.Var(model.n, model.n, within=pyomo.Binary)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
     model.y = pyomo.Var(model.customers, within=pyomo.Binary)
     model.f = pyomo.Var(
-        model.n, model.n, within=pyomo.NonNegativeReals, bounds=(0, data["Q"])
+        model.arcs, within=pyomo.NonNegativeReals, bounds=(0, data["Q"])
     )
     # Define objective function
     model.obj = pyomo.Objective(
         expr=sum(model.p[i] * model.y[i] for i in model.customers)
-        - sum(model.x[i, j] * model.dist[i][j] for i in model.n for j in model.n),
+        - sum(model.x[i, j] * model.dist[i][j] for i, j in model.arcs),
         sense=pyomo.maximize,
     )
     # Define model constraints
@@ -35,34 +39,33 @@ def buildModel(data: dict) -> pyomo.ConcreteModel():
     for i in model.customers:
         # Out of node i
         model.sumToOne.add(
-            expr=sum(model.x[i, j] for j in model.n if i != j) == model.y[i]
+            expr=sum(model.x[i, j] for j in model.outNodes[i]) == model.y[i]
         )
         # Into node i
         model.sumToOne.add(
-            expr=sum(model.x[j, i] for j in model.n if i != j) == model.y[i]
+            expr=sum(model.x[j, i] for j in model.inNodes[i]) == model.y[i]
         )
     # Add the in- and out-degree constraints for the depot
     model.depotInOut = pyomo.ConstraintList()
     # Leave depot
-    model.depotInOut.add(expr=sum(model.x[0, j] for j in model.n) <= data["m"])
+    model.depotInOut.add(
+        expr=sum(model.x[0, j] for j in model.outNodes[0]) <= data["m"]
+    )
     # Return to depot
-    model.depotInOut.add(expr=sum(model.x[i, 0] for i in model.n) <= data["m"])
+    model.depotInOut.add(expr=sum(model.x[i, 0] for i in model.inNodes[0]) <= data["m"])
     # Add the generalized variable bounds f[i][j] <= (Q-q[j])x[i][j] and f[i][j] >= min(i,1)x[i][j]
     model.GeneralizedBounds = pyomo.ConstraintList()
-    for i in model.n:
-        for j in model.n:
-            model.GeneralizedBounds.add(
-                expr=model.f[i, j] <= (data["Q"] - data["q"][j]) * model.x[i, j]
-            )
-            model.GeneralizedBounds.add(
-                expr=model.f[i, j] >= data["q"][i] * model.x[i, j]
-            )
+    for i, j in model.arcs:
+        model.GeneralizedBounds.add(
+            expr=model.f[i, j] <= (data["Q"] - data["q"][j]) * model.x[i, j]
+        )
+        model.GeneralizedBounds.add(expr=model.f[i, j] >= data["q"][i] * model.x[i, j])
     # Add flow-conservation constraint
     model.flowConservation = pyomo.ConstraintList()
     for i in model.customers:
         model.flowConservation.add(
-            expr=sum(model.f[i, j] for j in model.n)
-            == sum(model.f[j, i] for j in model.n) + data["q"][i] * model.y[i]
+            expr=sum(model.f[i, j] for j in model.outNodes[i])
+            == sum(model.f[j, i] for j in model.inNodes[i]) + data["q"][i] * model.y[i]
         )
     return model
 
@@ -72,51 +75,25 @@ def solveModel(model: pyomo.ConcreteModel()):
     solver.solve(model, tee=True)
 
 
-def displaySolution(model: pyomo.ConcreteModel(), data: dict):
+def displaySolution(model: pyomo.ConcreteModel(), data: dict, path: str = None):
     print("Total length of the", data["m"], "tours are", pyomo.value(model.obj))
     # Find a tour for each vehicle
-    lastRouteStarter = 0
+    solution = extract_routes(model.x, q=data["q"], dist=data["dist"])
     # Make flag for checking if coordinates are available
     coordinatesPresent = ("xCoord" in data) and ("yCoord" in data)
-    # Create a route for each vehicle
-    for vehicle in range(1, data["m"] + 1):
-        # Each route starts at the depot
-        if coordinatesPresent:
-            displayX = [data["xCoord"][0]]
-            displayY = [data["yCoord"][0]]
-            labels = [0]
-        # Find the customer, that starts this route
-        currentNode = 0
-        for j in model.customers:
-            if j > lastRouteStarter and pyomo.value(model.x[0, j]) >= 0.9999:
-                currentNode = j
-                if coordinatesPresent:
-                    displayX.append(data["xCoord"][currentNode])
-                    displayY.append(data["yCoord"][currentNode])
-                    labels.append(currentNode)
-                break
-        lastRouteStarter = currentNode
+    # Print and plot the route of each vehicle
+    for vehicle, route in enumerate(solution["routes"], start=1):
         print("The route for vehicle", vehicle, "is:")
-        print("0->", currentNode, end="")
-        # Build the route from currentNode back to the depot
-        while currentNode != 0:
-            for j in model.n:
-                if currentNode != j and pyomo.value(model.x[currentNode, j]) >= 0.9999:
-                    print("->", j, end="")
-                    currentNode = j
-                    if coordinatesPresent:
-                        displayX.append(data["xCoord"][currentNode])
-                        displayY.append(data["yCoord"][currentNode])
-                        labels.append(currentNode)
-                    break
-        print("\n")
-        if coordinatesPresent:
-            # Start plotting the solution to a coordinate system if coordinates are present
-            if coordinatesPresent:
-                plt.plot(displayX, displayY, "-o")
-                for i, label in enumerate(labels):
-                    plt.annotate(label, (displayX[i], displayY[i]))
-    plt.show()
+        print("->".join(str(i) for i in route))
+        print("Load:", solution["loads"][vehicle - 1])
+        print("")
+    if solution["subtours"]:
+        print("Subtours:", solution["subtours"])
+    # Plot the solution in a coordinate system if coordinates are present
+    if coordinatesPresent:
+        render(
+            plot_routes, solution["routes"], data["xCoord"], data["yCoord"], path=path
+        )
     for i in model.customers:
         if pyomo.value(model.y[i]) == 1:
             print("Total prize collected is", (model.p[i]))
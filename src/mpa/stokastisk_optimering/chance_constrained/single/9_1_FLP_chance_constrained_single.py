@@ -1,31 +1,12 @@
 import time
 
-import matplotlib.pyplot as plt
-import numpy as np
 import pyomo.environ as pyomo
 from pyomo.environ import quicksum as qsum
 
 from mpa.utilities.file_utils import read_json
-
-
-def generate_scenarios(data: dict, numScenarios) -> list:
-    # Start by putting the expected values into the list of scenarios
-    scenarios = [data["demand_exp"]]
-    np.random.seed(1)
-    # Generate the required number of additional scenarios
-    for i in range(numScenarios):
-        scenarios.append(
-            list(
-                np.random.normal(
-                    data["demand_exp"], data["demand_std"], data["numCustomers"]
-                )
-            )
-        )
-        # Make sure, all demands are non-negative
-        for i in range(len(scenarios[-1])):
-            if scenarios[-1][i] < 0:
-                scenarios[-1][i] = 0
-    return scenarios
+from mpa.utilities.model_utils import SolverSession
+from mpa.utilities.plot_utils import FigureWriter, plot_series
+from mpa.utilities.scenario_utils import generate_scenarios
 
 
 def read_data(filename: str, numScenarios) -> dict:
@@ -90,45 +71,59 @@ def build_model(data: dict, alpha: float) -> pyomo.ConcreteModel():
                 expr=qsum(model.x[i, j, k] for j in model.customers)
                 <= data["numCustomers"] * model.y[i]
             )
-    # Create upper bound on number of z-variables
+    # Create upper bound on number of z-variables. alpha is a mutable parameter, so
+    # the model can be re-solved for other probability levels without a rebuild
+    model.alpha = pyomo.Param(mutable=True, initialize=alpha)
     model.chanceCst = pyomo.ConstraintList()
     for i in model.facilities:
         model.chanceCst.add(
-            expr=qsum(prob * model.z[i, k] for k in model.scenarios) <= 1 - alpha
+            expr=qsum(prob * model.z[i, k] for k in model.scenarios) <= 1 - model.alpha
         )
 
     return model
 
 
-def solve_model(model: pyomo.ConcreteModel()) -> float:
-    solver = pyomo.SolverFactory("gurobi")
-    solver.solve(model, tee=False)
-    return pyomo.value(model.obj)
-
-
-def main(filename: str, numScenarios: int):
+def main(
+    filename: str, numScenarios: int, solver: str = "gurobi", persistent: bool = False
+):
     data = read_data(filename, numScenarios)
     sshs = [0.80 + 0.01 * i for i in range(0, 21)]
     objVals = []
     compTimes = []
+    # Build the model once and only change alpha between the solves. With a
+    # persistent solver, e.g. "gurobi_persistent" (requires gurobipy), the model
+    # is also kept loaded in the solver between the solves
+    model = build_model(data, sshs[0])
+    session = SolverSession(model, solver=solver) if persistent else None
+    folder = "src/mpa/stokastisk_optimering/chance_constrained/single"
     for ssh in sshs:
         print("Probability level is now", ssh, end="\t")
-        model = build_model(data, ssh)
         start = time.time()
-        objVals.append(solve_model(model))
+        if session:
+            session.set_value(model.alpha, ssh)
+            session.solve()
+        else:
+            model.alpha.set_value(ssh)
+            pyomo.SolverFactory(solver).solve(model, tee=False)
+        objVals.append(pyomo.value(model.obj))
         compTimes.append(time.time() - start)
         print("objective value: ", objVals[-1], "\tSolution time:", compTimes[-1])
-    plt.plot(sshs, objVals, "-o")
-    plt.savefig(
-        "src/mpa/stokastisk_optimering/chance_constrained/single/chance_constraints_value_single.eps",
-        bbox_inches="tight",
-    )
-    plt.clf()
-    plt.plot(sshs, compTimes, "-o")
-    plt.savefig(
-        "src/mpa/stokastisk_optimering/chance_constrained/single/chance_constraints_time_single.eps",
-        bbox_inches="tight",
-    )
+    # The two figures are written in the background
+    with FigureWriter() as writer:
+        writer.submit(
+            plot_series,
+            sshs,
+            objVals,
+            style="-o",
+            path=f"{folder}/chance_constraints_value_single.eps",
+        )
+        writer.submit(
+            plot_series,
+            sshs,
+            compTimes,
+            style="-o",
+            path=f"{folder}/chance_constraints_time_single.eps",
+        )
 
 
 if __name__ == "__main__":
@@ -20,19 +20,19 @@
 # f[i, j, s] : Continuous variable. If x[i, j, s] = 1 then f[i, j, s]=amount of goods collected on the tour when leaving
 #               node i. Otherwise f[i, j, s] = 0
 
+import numpy as np
 import pyomo.environ as pyomo
 
+from mpa.utilities.distance_cache import cached_distance_matrix
 from mpa.utilities.file_utils import read_json
 from mpa.utilities.model_utils import solve_model
-from mpa.utilities.support_functions import make_lp_morm_distance_matrix
 
 
 def read_data(filename: str) -> dict:
     data = read_json(filename)
 
-    data["dist"] = make_lp_morm_distance_matrix(
-        data,
-        ["xCoordinates", "yCoordinates"],
+    data["dist"] = cached_distance_matrix(
+        np.column_stack([data["xCoordinates"], data["yCoordinates"]]),
         p=2,
         r=2,  # Rounding decimal places
     )
@@ -0,0 +1,256 @@
+# Progressive hedging for the two stage stochastic CVRP in TS-SP_CVRP_solution.py.
+# Instead of one model with x, f and y for every scenario, each scenario s gets
+# its own CVRP with its own copy m_s of the fleet size. The copies are pushed
+# towards their probability weighted average mbar by the multipliers w_s and a
+# proximal term, so scenario s solves
+#   min L * m_s + routing_s + penalties_s + w_s * m_s + rho / 2 * (m_s - mbar)^2
+# and after each round mbar = sum_s p_s * m_s and w_s += rho * (m_s - mbar).
+# The subproblems are independent, so they are solved in parallel processes,
+# each with a fixed group of scenarios.
+#
+# m_s is integer, so (m_s - mbar)^2 equals the largest of the secants through
+# the consecutive integer points t and t + 1, and the proximal term is modelled
+# with a variable z >= secant_t(m_s) for all t. This keeps the subproblems
+# MILPs, which any MIP solver can handle.
+#
+# Since sum_s p_s * w_s = 0, solving the scenarios with w_s but without the
+# proximal term gives the lower bound sum_s p_s * min(f_s + w_s * m_s) on the
+# optimal value. The final fleet size is evaluated by fixing m in all scenarios.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+import numpy as np
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.model_utils import SolverSession, set_solver_options
+
+# Data and scenario models of each worker process. The models of the scenario
+# group of a worker are built the first time it gets the group, and re-solved
+# with new multipliers after that
+_worker = {}
+
+
+def build_scenario_model(data: dict, s: int) -> pyomo.ConcreteModel():
+    # The build_model of TS-SP_CVRP_solution.py, restricted to scenario s
+    buildModel = _load_build_model()
+    scenarioData = dict(data, demands=[data["demands"][s]], Prob=[1.0])
+    model = buildModel(scenarioData)
+    model.m.setub(data["n"])
+    # Multiplier, consensus value and penalty parameter of progressive hedging
+    model.w = pyomo.Param(mutable=True, initialize=0)
+    model.mbar = pyomo.Param(mutable=True, initialize=0)
+    model.rho = pyomo.Param(mutable=True, initialize=0)
+    # z >= (m - mbar)^2 at all integer values of m
+    model.z = pyomo.Var(within=pyomo.NonNegativeReals)
+    model.secants = pyomo.Constraint(
+        range(data["n"]),
+        rule=lambda model, t: model.z
+        >= (t - model.mbar) ** 2 + (2 * t + 1 - 2 * model.mbar) * (model.m - t),
+    )
+    # The original objective is kept to evaluate the scenario cost
+    model.obj.deactivate()
+    model.phObj = pyomo.Objective(
+        expr=model.obj.expr + model.w * model.m + model.rho / 2 * model.z,
+        sense=pyomo.minimize,
+    )
+    return model
+
+
+def progressive_hedging(
+    data: dict,
+    rho: float = None,
+    max_iterations: int = 50,
+    time_budget: float = 300,
+    tolerance: float = 1e-3,
+    bound_every: int = 1,
+    solver: str = "appsi_highs",
+    timelimit: float = 60,
+    MIPgap: float = 0.01,
+    max_workers: int = None,
+) -> dict:
+    """
+    Solve the two stage stochastic CVRP with progressive hedging on the fleet size m.
+
+    Parameters:
+    data (dict): The data, see read_data in TS-SP_CVRP_solution.py.
+    rho (float, optional): The penalty parameter of the proximal term. Defaults to None, which uses the leasing price L.
+    max_iterations (int, optional): The maximum number of iterations. Defaults to 50.
+    time_budget (float, optional): The wall-clock budget in seconds, checked after each iteration. Defaults to 300.
+    tolerance (float, optional): The consensus gap sum_s p_s * |m_s - mbar| at which to stop. Defaults to 1e-3.
+    bound_every (int, optional): Compute the Lagrangian lower bound every bound_every iterations (it costs an extra solve per scenario). 0 means only the wait-and-see bound of the first iteration. Defaults to 1.
+    solver (str, optional): The name of a persistent solver, see SolverSession. Defaults to "appsi_highs".
+    timelimit (float, optional): The time limit for each subproblem, in seconds. Defaults to 60.
+    MIPgap (float, optional): The MIP gap tolerance for each subproblem. Defaults to 0.01.
+    max_workers (int, optional): The number of worker processes, each solving a fixed group of scenarios. Defaults to None, which uses all cores.
+
+    Returns:
+    dict: The fleet size "m", its expected cost "objective" with m fixed in all scenarios, the best "lower_bound", the number of "iterations", and the "trajectory" with one row per iteration (iteration, mbar, gap, lower_bound and time).
+    """
+    start = time.time()
+    prob = np.asarray(data["Prob"], dtype=np.float64)
+    prob = prob / prob.sum()
+    scenarios = range(len(prob))
+    rho = data["L"] if rho is None else rho
+    w = np.zeros(len(prob))
+    mbar = 0.0
+
+    lowerBound = -np.inf
+    trajectory = []
+
+    # Each worker gets its own pool, so a scenario is always solved by the same
+    # worker and its model is only kept there
+    numWorkers = min(max_workers or os.cpu_count() or 1, len(prob))
+    groups = [list(scenarios[g::numWorkers]) for g in range(numWorkers)]
+
+    with ExitStack() as stack:
+        executors = [
+            stack.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    initializer=_init_worker,
+                    initargs=(data, solver, timelimit, MIPgap),
+                )
+            )
+            for _ in groups
+        ]
+
+        def solve_all(w, mbar, rho, fixed_m=None) -> list:
+            futures = [
+                executor.submit(
+                    _solve_group, group, w[group].tolist(), mbar, rho, fixed_m
+                )
+                for executor, group in zip(executors, groups)
+            ]
+            results = [None] * len(w)
+            for group, future in zip(groups, futures):
+                for s, result in zip(group, future.result()):
+                    results[s] = result
+            return results
+
+        for iteration in range(max_iterations):
+            # The first iteration solves the scenarios independently
+            results = solve_all(w, mbar, rho if iteration > 0 else 0)
+            m = np.array([result["m"] for result in results])
+            mbar = float(prob @ m)
+            gap = float(prob @ np.abs(m - mbar))
+
+            if iteration == 0:
+                # The wait-and-see bound
+                lowerBound = float(prob @ [result["bound"] for result in results])
+            elif bound_every and iteration % bound_every == 0:
+                results = solve_all(w, mbar, 0)
+                lowerBound = max(
+                    lowerBound, float(prob @ [result["bound"] for result in results])
+                )
+
+            w += rho * (m - mbar)
+
+            trajectory.append(
+                {
+                    "iteration": iteration,
+                    "mbar": mbar,
+                    "gap": gap,
+                    "lower_bound": lowerBound,
+                    "time": time.time() - start,
+                }
+            )
+            print(
+                f"Iteration {iteration}: mbar {mbar:.3f}, consensus gap {gap:.4f}, "
+                f"lower bound {lowerBound:.2f}, {trajectory[-1]['time']:.1f} seconds"
+            )
+
+            if gap <= tolerance or time.time() - start >= time_budget:
+                break
+
+        # Evaluate the consensus fleet size by fixing it in all scenarios
+        fleetSize = int(round(mbar))
+        results = solve_all(np.zeros(len(prob)), 0, 0, fixed_m=fleetSize)
+        objective = float(prob @ [result["cost"] for result in results])
+
+    print(f"Fleet size {fleetSize} has expected cost {objective:.2f}")
+
+    return {
+        "m": fleetSize,
+        "objective": objective,
+        "lower_bound": lowerBound,
+        "iterations": len(trajectory),
+        "trajectory": trajectory,
+    }
+
+
+def _init_worker(data: dict, solver: str, timelimit: float, MIPgap: float):
+    _worker.update(
+        data=data, solver=solver, timelimit=timelimit, MIPgap=MIPgap, models={}
+    )
+
+
+def _solve_group(group: list, w: list, mbar: float, rho: float, fixed_m: int) -> list:
+    return [_solve_scenario(s, w_s, mbar, rho, fixed_m) for s, w_s in zip(group, w)]
+
+
+def _solve_scenario(s: int, w: float, mbar: float, rho: float, fixed_m: int) -> dict:
+    if s not in _worker["models"]:
+        model = build_scenario_model(_worker["data"], s)
+        session = SolverSession(
+            model,
+            solver=_worker["solver"],
+            timelimit=_worker["timelimit"],
+            MIPgap=_worker["MIPgap"],
+        )
+        # One solver thread per worker, so the workers do not oversubscribe the cores
+        set_solver_options(session.solver, _worker["solver"], threads=1)
+        _worker["models"][s] = (model, session)
+    model, session = _worker["models"][s]
+
+    session.set_value(model.w, float(w))
+    session.set_value(model.mbar, float(mbar))
+    session.set_value(model.rho, float(rho))
+    if fixed_m is None:
+        model.m.unfix()
+    else:
+        model.m.fix(fixed_m)
+    session.update_var(model.m)
+
+    results = session.solve(load_solutions=False)
+    termination = results.solver.termination_condition
+    # E.g. infeasible, or stopped by the time limit before a solution was found
+    if len(results.solution) == 0:
+        raise RuntimeError(f"Scenario {s} has no solution ({termination})")
+    session.load_solution()
+
+    bound = results.problem.lower_bound
+    if bound is None or not np.isfinite(bound):
+        bound = pyomo.value(model.phObj)
+
+    return {
+        "m": int(round(pyomo.value(model.m))),
+        "cost": pyomo.value(model.obj),
+        "bound": bound,
+    }
+
+
+def _load_build_model():
+    # TS-SP_CVRP_solution.py can not be imported by name, so it is loaded from its path
+    if "buildModel" not in _worker:
+        path = os.path.join(os.path.dirname(__file__), "TS-SP_CVRP_solution.py")
+        module = load_script(path, "ts_sp_cvrp_solution")
+        _worker["buildModel"] = module.build_model
+        _worker["readData"] = module.read_data
+    return _worker["buildModel"]
+
+
+def main(time_budget: float = 300, max_workers: int = None):
+    _load_build_model()
+    data = _worker["readData"](
+        "src/mpa/stokastisk_optimering/opgave/TS-SP-CVRP-data.json"
+    )
+    data["dist"] = np.asarray(data["dist"])
+    progressive_hedging(data, time_budget=time_budget, max_workers=max_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,12 @@
-import time
+from functools import partial
 
-import matplotlib.pyplot as plt
-import numpy as np
 import pyomo.environ as pyomo
 from pyomo.environ import quicksum as qsum
 
 from mpa.utilities.file_utils import read_json
-
-
-def generate_scenarios(data: dict, numScenarios) -> list:
-    # Start by putting the expected values into the list of scenarios
-    np.random.seed(1)
-    scenarios = [data["demand_exp"]]
-    # Generate the required number of additional scenarios
-    for i in range(numScenarios):
-        scenarios.append(
-            list(
-                np.random.normal(
-                    data["demand_exp"], data["demand_std"], data["numCustomers"]
-                )
-            )
-        )
-        # Make sure, all demands are non-negative
-        for i in range(len(scenarios[-1])):
-            if scenarios[-1][i] < 0:
-                scenarios[-1][i] = 0
-    return scenarios
+from mpa.utilities.plot_utils import FigureWriter, plot_series
+from mpa.utilities.scenario_utils import generate_scenarios
+from mpa.utilities.sweep_utils import make_grid, run_sweep
 
 
 def read_data(filename: str, numScenarios) -> dict:
@@ -87,45 +68,67 @@ def solve_model(model: pyomo.ConcreteModel()) -> float:
     return pyomo.value(model.obj)
 
 
-def main(filename: str, numScenarios: int):
-    objValues = []
-    compTimes = []
-    scenarios = []
-    for sc in range(0, numScenarios + 1, 5):
-        print(f"Number of scenarios in the current problem : {sc+1}")
-        data = read_data(filename, sc)
-        model = build_model(data)
-        start = time.time()
-        objValues.append(solve_model(model))
-        compTimes.append(time.time() - start)
-        scenarios.append(sc)
-    plt.plot(scenarios, objValues, "o-r")
-    plt.ylabel("Objective function values")
-    plt.xlabel("Number of scenarios")
-    plt.ylim(1000, 1350)
-    plt.savefig(
-        "src/mpa/stokastisk_optimering/two_stage/obj_values_500.eps",
-        bbox_inches="tight",
+def build_sweep_model(filename: str, numScenarios: int) -> pyomo.ConcreteModel():
+    data = read_data(filename, numScenarios)
+    return build_model(data)
+
+
+def main(
+    filename: str,
+    numScenarios: int,
+    max_workers: int = None,
+    results_path: str = None,
+):
+    # Solve the scenario counts in parallel. With a results_path, an interrupted
+    # sweep continues where it stopped
+    scenarios = list(range(0, numScenarios + 1, 5))
+    results = run_sweep(
+        partial(build_sweep_model, filename),
+        make_grid(numScenarios=scenarios),
+        solver="gurobi",
+        MIPgap=0.001,
+        max_workers=max_workers,
+        results_path=results_path,
     )
-    plt.clf()
-
+    # Only the points that were solved are plotted
+    for row in results:
+        if row["objective"] is None:
+            reason = row["error"] or row["termination_condition"]
+            print(f"{row['numScenarios']} scenarios failed: {reason}")
+    solved = [row for row in results if row["objective"] is not None]
+    scenarios = [row["numScenarios"] for row in solved]
+    objValues = [row["objective"] for row in solved]
+    compTimes = [row["wall_time"] for row in solved]
     differences = [
         abs(objValues[i] - objValues[i + 1]) for i in range(len(objValues) - 1)
     ]
-    plt.plot(scenarios[1:], differences, "o-r")
-    plt.ylabel("Differences in objective function values")
-    plt.xlabel("Number of scenarios")
-    plt.savefig(
-        "src/mpa/stokastisk_optimering/two_stage/obj_diff_500.eps", bbox_inches="tight"
-    )
-    plt.clf()
-
-    plt.plot(scenarios, compTimes, "o-r")
-    plt.ylabel("Computation times in seconds")
-    plt.xlabel("Number of scenarios")
-    plt.savefig(
-        "src/mpa/stokastisk_optimering/two_stage/time_500.eps", bbox_inches="tight"
-    )
+    folder = "src/mpa/stokastisk_optimering/two_stage"
+    with FigureWriter() as writer:
+        writer.submit(
+            plot_series,
+            scenarios,
+            objValues,
+            xlabel="Number of scenarios",
+            ylabel="Objective function values",
+            ylim=(1000, 1350),
+            path=f"{folder}/obj_values_500.eps",
+        )
+        writer.submit(
+            plot_series,
+            scenarios[1:],
+            differences,
+            xlabel="Number of scenarios",
+            ylabel="Differences in objective function values",
+            path=f"{folder}/obj_diff_500.eps",
+        )
+        writer.submit(
+            plot_series,
+            scenarios,
+            compTimes,
+            xlabel="Number of scenarios",
+            ylabel="Computation times in seconds",
+            path=f"{folder}/time_500.eps",
+        )
 
 
 if __name__ == "__main__":
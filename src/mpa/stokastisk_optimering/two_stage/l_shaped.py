@@ -0,0 +1,368 @@
+import time
+
+import numpy as np
+import pyomo.environ as pyomo
+from pyomo.environ import quicksum as qsum
+
+from mpa.utilities.file_utils import read_json
+from mpa.utilities.model_utils import SolverSession
+from mpa.utilities.plot_utils import render
+from mpa.utilities.scenario_utils import generate_scenarios
+
+# The L-shaped method for the two-stage facility location problem in
+# 9_1_two_stage_stochastic_program.py. The master problem keeps the facility
+# decisions y and one variable theta per scenario (or one in total, if the cuts
+# are aggregated) estimating the assignment costs. For a master solution y^ the
+# assignment subproblem of each scenario is solved with y^ fixed, and its duals
+# give the optimality cut
+#   theta_k >= Q_k(y^) + sum_i v_ik * cap_i * (y_i - y^_i)
+# where v_ik <= 0 is the dual of the capacity constraint of facility i.
+# If the open capacity is below the total demand of a scenario, the
+# feasibility cut sum_i cap_i * y_i >= D_k is added instead.
+#
+# The duals come from the LP relaxation of the assignment. With integer=True
+# the subproblems are also solved with binary assignments, and the integer
+# L-shaped cut of Laporte and Louveaux (with lower bound L = 0)
+#   theta_k >= Q_k(y^) * (sum_{i: y^_i = 1} y_i - sum_{i: y^_i = 0} y_i - |S| + 1)
+# makes the method converge to the solution of the extensive form.
+
+
+def read_data(filename: str, numScenarios: int) -> dict:
+    data = read_json(filename)
+    data["demand_scenario"] = generate_scenarios(data, numScenarios)
+    return data
+
+
+def build_master(data: dict, multicut: bool = True) -> pyomo.ConcreteModel():
+    # Create the model object
+    model = pyomo.ConcreteModel()
+    # Create ranges
+    model.facilities = range(data["numFacilities"])
+    model.scenarios = range(len(data["demand_scenario"]))
+    model.thetas = model.scenarios if multicut else range(1)
+    # Create variables. The assignment costs are non-negative, so 0 is a lower
+    # bound on theta
+    model.y = pyomo.Var(model.facilities, within=pyomo.Binary)
+    model.theta = pyomo.Var(model.thetas, within=pyomo.NonNegativeReals)
+    # Probability for the scenarios
+    prob = 1 / len(data["demand_scenario"]) if multicut else 1
+    # Create the objective function
+    model.obj = pyomo.Objective(
+        expr=qsum(data["f"][i] * model.y[i] for i in model.facilities)
+        + prob * qsum(model.theta[k] for k in model.thetas)
+    )
+    # The cuts are added during the solve
+    model.optimalityCuts = pyomo.ConstraintList()
+    model.feasibilityCuts = pyomo.ConstraintList()
+    return model
+
+
+def build_subproblem(data: dict, integer: bool = False) -> pyomo.ConcreteModel():
+    # Create the model object
+    model = pyomo.ConcreteModel()
+    # Create ranges
+    model.facilities = range(data["numFacilities"])
+    model.customers = range(data["numCustomers"])
+    # The demands of the current scenario and the facility decisions of the
+    # master are mutable, so the same model is re-solved for every scenario
+    model.demands = pyomo.Param(
+        model.customers, mutable=True, initialize=data["demand_exp"]
+    )
+    model.yhat = pyomo.Param(model.facilities, mutable=True, initialize=1)
+    # Create variables. x <= 1 follows from the "sum to one" constraints, so
+    # no upper bounds are needed, which keeps the duals of the constraints complete
+    model.x = pyomo.Var(
+        model.facilities,
+        model.customers,
+        within=pyomo.Binary if integer else pyomo.NonNegativeReals,
+    )
+    # Create the objective function
+    model.obj = pyomo.Objective(
+        expr=qsum(
+            data["c"][i][j] * model.demands[j] * model.x[i, j]
+            for i in model.facilities
+            for j in model.customers
+        )
+    )
+    # Create "sum to one" constraints for all customers
+    model.sumToOne = pyomo.Constraint(
+        model.customers,
+        rule=lambda model, j: qsum(model.x[i, j] for i in model.facilities) == 1,
+    )
+    # Create capacity constraints
+    model.capacities = pyomo.Constraint(
+        model.facilities,
+        rule=lambda model, i: qsum(
+            model.demands[j] * model.x[i, j] for j in model.customers
+        )
+        <= data["cap"][i] * model.yhat[i],
+    )
+    return model
+
+
+def solve_l_shaped(
+    data: dict,
+    multicut: bool = True,
+    integer: bool = False,
+    solver: str = "appsi_highs",
+    tolerance: float = 1e-6,
+    max_iterations: int = 200,
+) -> dict:
+    """
+    Solve the two-stage stochastic facility location problem with the L-shaped method.
+
+    Parameters:
+    data (dict): The data, with the scenarios in "demand_scenario", see read_data.
+    multicut (bool, optional): Whether to add one optimality cut per scenario instead of one aggregated cut. Defaults to True.
+    integer (bool, optional): Whether the assignments are binary, as in the extensive form. If False, the LP relaxation of the assignments is solved. Defaults to False.
+    solver (str, optional): The name of a persistent solver, see SolverSession. Defaults to "appsi_highs".
+    tolerance (float, optional): The relative gap between the bounds at which to stop. Defaults to 1e-6.
+    max_iterations (int, optional): The maximum number of iterations. Defaults to 200.
+
+    Returns:
+    dict: The best facility decisions "y", their "objective", the final "lower_bound", the number of "iterations", and the "trajectory" with one row per iteration (iteration, lower_bound, upper_bound, cuts and time).
+    """
+    start = time.time()
+    demands = np.asarray(data["demand_scenario"], dtype=np.float64)
+    totalDemands = demands.sum(axis=1)
+    cap = np.asarray(data["cap"], dtype=np.float64)
+    fixed = np.asarray(data["f"], dtype=np.float64)
+    prob = 1 / len(demands)
+
+    master = build_master(data, multicut)
+    masterSession = SolverSession(master, solver=solver)
+    subproblem = build_subproblem(data)
+    subSession = SolverSession(subproblem, solver=solver)
+    if integer:
+        intSubproblem = build_subproblem(data, integer=True)
+        intSession = SolverSession(intSubproblem, solver=solver)
+
+    lowerBound = -np.inf
+    upperBound = np.inf
+    bestY = None
+    trajectory = []
+    cuts = 0
+
+    for iteration in range(1, max_iterations + 1):
+        # Solve the master problem for the facility decisions and the lower bound
+        masterSession.solve()
+        lowerBound = pyomo.value(master.obj)
+        yhat = np.round([pyomo.value(master.y[i]) for i in master.facilities])
+        openCap = cap @ yhat
+
+        infeasible = totalDemands > openCap + 1e-9
+        if infeasible.any():
+            # Not enough capacity open for some scenario. The strongest cut
+            # covers the largest total demand
+            cut = master.feasibilityCuts.add(
+                expr=qsum(cap[i] * master.y[i] for i in master.facilities)
+                >= float(totalDemands.max())
+            )
+            masterSession.add_constraint(cut)
+            cuts += 1
+        else:
+            values, duals = _solve_subproblems(subproblem, subSession, yhat, demands)
+            cuts += _add_optimality_cuts(
+                master, masterSession, yhat, cap, values, duals, multicut, prob
+            )
+            if integer:
+                values = _solve_integer_subproblems(
+                    intSubproblem, intSession, yhat, demands
+                )
+                if np.isinf(values).any():
+                    # The demand can not be packed into the open facilities, so
+                    # at least one more facility must be opened
+                    cut = master.feasibilityCuts.add(
+                        expr=qsum(
+                            master.y[i] for i in master.facilities if yhat[i] == 0
+                        )
+                        >= 1
+                    )
+                    masterSession.add_constraint(cut)
+                    cuts += 1
+                else:
+                    cuts += _add_integer_cuts(
+                        master, masterSession, yhat, values, multicut, prob
+                    )
+            if not np.isinf(values).any():
+                candidate = fixed @ yhat + prob * values.sum()
+                if candidate < upperBound:
+                    upperBound = candidate
+                    bestY = yhat
+
+        trajectory.append(
+            {
+                "iteration": iteration,
+                "lower_bound": lowerBound,
+                "upper_bound": upperBound,
+                "cuts": cuts,
+                "time": time.time() - start,
+            }
+        )
+        print(
+            f"Iteration {iteration}: lower bound {lowerBound:.4f}, "
+            f"upper bound {upperBound:.4f}, {cuts} cuts"
+        )
+
+        if upperBound - lowerBound <= tolerance * max(1, abs(upperBound)) < np.inf:
+            break
+
+    return {
+        "y": bestY.astype(int).tolist() if bestY is not None else None,
+        "objective": upperBound,
+        "lower_bound": lowerBound,
+        "iterations": len(trajectory),
+        "trajectory": trajectory,
+    }
+
+
+def _solve_subproblems(
+    model: pyomo.ConcreteModel(),
+    session: SolverSession,
+    yhat: np.ndarray,
+    demands: np.ndarray,
+):
+    # Solve the LP subproblem of every scenario, and return the optimal values
+    # and the duals of the capacity constraints multiplied by the capacities
+    for i in model.facilities:
+        session.set_value(model.yhat[i], float(yhat[i]))
+
+    values = np.empty(len(demands))
+    duals = np.empty((len(demands), len(model.facilities)))
+    capacities = [model.capacities[i] for i in model.facilities]
+    for k, demand in enumerate(demands):
+        for j in model.customers:
+            session.set_value(model.demands[j], float(demand[j]))
+        session.solve()
+        values[k] = pyomo.value(model.obj)
+        capDuals = session.get_duals(capacities)
+        duals[k] = [capDuals[constraint] for constraint in capacities]
+
+    return values, duals
+
+
+def _solve_integer_subproblems(
+    model: pyomo.ConcreteModel(),
+    session: SolverSession,
+    yhat: np.ndarray,
+    demands: np.ndarray,
+) -> np.ndarray:
+    # Solve the subproblem with binary assignments for every scenario. A
+    # scenario that can not be assigned gets the value infinity
+    for i in model.facilities:
+        session.set_value(model.yhat[i], float(yhat[i]))
+
+    values = np.empty(len(demands))
+    for k, demand in enumerate(demands):
+        for j in model.customers:
+            session.set_value(model.demands[j], float(demand[j]))
+        results = session.solve(load_solutions=False)
+        if results.solver.termination_condition == pyomo.TerminationCondition.optimal:
+            session.load_solution()
+            values[k] = pyomo.value(model.obj)
+        else:
+            values[k] = np.inf
+            break
+
+    return values
+
+
+def _add_optimality_cuts(
+    master: pyomo.ConcreteModel(),
+    session: SolverSession,
+    yhat: np.ndarray,
+    cap: np.ndarray,
+    values: np.ndarray,
+    duals: np.ndarray,
+    multicut: bool,
+    prob: float,
+) -> int:
+    # theta_k >= Q_k(y^) + sum_i v_ik * cap_i * (y_i - y^_i)
+    slopes = duals * cap
+    if not multicut:
+        values = np.array([prob * values.sum()])
+        slopes = prob * slopes.sum(axis=0, keepdims=True)
+
+    added = 0
+    for k, (value, slope) in enumerate(zip(values, slopes)):
+        # Only add the cut if it cuts off the current master solution
+        if pyomo.value(master.theta[k]) >= value - 1e-6 * max(1, abs(value)):
+            continue
+        cut = master.optimalityCuts.add(
+            expr=master.theta[k]
+            >= float(value)
+            + qsum(
+                float(slope[i]) * (master.y[i] - float(yhat[i]))
+                for i in master.facilities
+                if slope[i] != 0
+            )
+        )
+        session.add_constraint(cut)
+        added += 1
+
+    return added
+
+
+def _add_integer_cuts(
+    master: pyomo.ConcreteModel(),
+    session: SolverSession,
+    yhat: np.ndarray,
+    values: np.ndarray,
+    multicut: bool,
+    prob: float,
+) -> int:
+    # theta_k >= Q_k(y^) * (sum_{i in S} y_i - sum_{i not in S} y_i - |S| + 1),
+    # which is Q_k(y^) at y = y^ and at most 0 for any other y
+    if not multicut:
+        values = np.array([prob * values.sum()])
+
+    opened = yhat.sum()
+    added = 0
+    for k, value in enumerate(values):
+        if pyomo.value(master.theta[k]) >= value - 1e-6 * max(1, abs(value)):
+            continue
+        cut = master.optimalityCuts.add(
+            expr=master.theta[k]
+            >= float(value)
+            * (
+                qsum(
+                    master.y[i] if yhat[i] == 1 else -master.y[i]
+                    for i in master.facilities
+                )
+                - float(opened)
+                + 1
+            )
+        )
+        session.add_constraint(cut)
+        added += 1
+
+    return added
+
+
+def plot_bounds(fig, trajectory: list):
+    ax = fig.add_subplot()
+    iterations = [row["iteration"] for row in trajectory]
+    ax.plot(iterations, [row["lower_bound"] for row in trajectory], "o-b")
+    ax.plot(iterations, [row["upper_bound"] for row in trajectory], "o-r")
+    ax.set_ylabel("Lower and upper bounds")
+    ax.set_xlabel("Iteration")
+
+
+def main(filename: str, numScenarios: int, multicut: bool = True):
+    data = read_data(filename, numScenarios)
+    result = solve_l_shaped(data, multicut=multicut)
+    if result["y"] is None:
+        print("No solution found")
+    else:
+        print("Open facilities:", [i for i, y in enumerate(result["y"]) if y == 1])
+        print("Objective value:", result["objective"])
+
+    render(
+        plot_bounds,
+        result["trajectory"],
+        path="src/mpa/stokastisk_optimering/two_stage/l_shaped_bounds.eps",
+    )
+
+
+if __name__ == "__main__":
+    main("src/mpa/stokastisk_optimering/9_1_data.json", 500)
@@ -0,0 +1,261 @@
+import math
+import time
+from typing import List
+
+import numpy as np
+import pyomo.environ as pyomo
+
+from mpa.utilities.support_functions import find_connected_components
+
+# The rounded capacity inequality (RCI) of a set S of customers is
+#
+#     sum(x[i, j] for i, j in S) <= |S| - ceil(q(S) / Q)
+#
+# i.e. at least ceil(q(S) / Q) vehicles must enter S. It is valid for every
+# CVRP model with arc variables x and in- and out-degree 1 at the customers,
+# and only uses the arcs inside S, so it also fits sparse arc sets.
+
+
+def support_graph(x: pyomo.Var, num_nodes: int) -> np.ndarray:
+    """
+    Read the values of the arc variables x[i, j] into the weights of the undirected support graph.
+
+    Parameters:
+    x (pyomo.Var): The arc variables, indexed by pairs of integer nodes. Arcs may be missing from the index set.
+    num_nodes (int): The number of nodes, including the depot.
+
+    Returns:
+    np.ndarray: A symmetric matrix with the weight x[i, j] + x[j, i] of each edge.
+    """
+    weights = np.zeros((num_nodes, num_nodes))
+    for (i, j), var in x.items():
+        weights[i, j] += var.value or 0
+    weights += weights.T
+    np.fill_diagonal(weights, 0)
+
+    return weights
+
+
+def rci_violation(S: list, weights: np.ndarray, q: np.ndarray, Q: float) -> float:
+    """
+    Compute by how much the rounded capacity inequality of a set of customers is violated.
+
+    Parameters:
+    S (list): The customers of the set.
+    weights (np.ndarray): The edge weights of the support graph, see support_graph.
+    q (np.ndarray): The demand of each node.
+    Q (float): The vehicle capacity.
+
+    Returns:
+    float: The left-hand side minus the right-hand side of the inequality, positive when it is violated.
+    """
+    S = np.asarray(S, dtype=np.int64)
+    inside = weights[np.ix_(S, S)].sum() / 2
+
+    return float(inside - len(S) + math.ceil(q[S].sum() / Q - 1e-9))
+
+
+def separate_rci(
+    weights: np.ndarray,
+    q: np.ndarray,
+    Q: float,
+    depot: int = 0,
+    tolerance: float = 1e-4,
+    max_cuts: int = None,
+) -> List[list]:
+    """
+    Find sets of customers whose rounded capacity inequality is violated by a (fractional) solution.
+
+    Two heuristics are used. The connected components of the support graph
+    without the depot are tried, which finds every violated inequality of an
+    integer solution (a subtour or an overloaded route). Then each customer
+    is greedily extended into a set, adding the customer with the largest
+    edge weight to the set in each step, and the most violated set on the
+    way is kept.
+
+    Parameters:
+    weights (np.ndarray): The edge weights of the support graph, see support_graph.
+    q (np.ndarray): The demand of each node.
+    Q (float): The vehicle capacity.
+    depot (int, optional): The depot node. Defaults to 0.
+    tolerance (float, optional): The violation above which a set is returned. Defaults to 1e-4.
+    max_cuts (int, optional): The maximum number of sets to return. Defaults to None (all sets found).
+
+    Returns:
+    List[list]: The sets, each a sorted list of customers, the most violated first.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    num_nodes = len(weights)
+    customers = [i for i in range(num_nodes) if i != depot]
+
+    found = {}
+
+    def consider(S):
+        key = frozenset(S)
+        if key not in found:
+            violation = rci_violation(sorted(key), weights, q, Q)
+            if violation > tolerance:
+                found[key] = violation
+
+    # The connected components without the depot
+    edges = zip(*np.nonzero(np.triu(weights, 1) > tolerance))
+    edges = [(i, j) for i, j in edges if depot not in (i, j)]
+    for component in find_connected_components(customers, edges):
+        consider(component)
+
+    # Greedy extension from each customer, following the heaviest edges
+    for seed in customers:
+        inS = np.zeros(num_nodes, dtype=bool)
+        inS[[seed, depot]] = True
+        connection = weights[seed].copy()
+        S, inside, load = [seed], 0.0, q[seed]
+        best, bestSize = -np.inf, 0
+        while len(S) < len(customers):
+            connection[inS] = -np.inf
+            v = int(np.argmax(connection))
+            if connection[v] <= tolerance:
+                break
+            inside += connection[v]
+            load += q[v]
+            S.append(v)
+            inS[v] = True
+            connection += weights[v]
+            violation = inside - len(S) + math.ceil(load / Q - 1e-9)
+            if violation > best:
+                best, bestSize = violation, len(S)
+        if best > tolerance:
+            consider(S[:bestSize])
+
+    sets = sorted(found, key=lambda key: (-found[key], sorted(key)))[:max_cuts]
+
+    return [sorted(S) for S in sets]
+
+
+def add_capacity_cuts(
+    model: pyomo.ConcreteModel, sets: List[list], Q: float = None
+) -> list:
+    """
+    Add the rounded capacity inequalities of the given sets to a routing model, in the ConstraintList model.capacity_cuts.
+
+    Parameters:
+    model (pyomo.ConcreteModel): A CVRP model with arc variables model.x, their heads model.out_nodes and demands model.q, see the build_model functions in ruteplanlægning.
+    sets (List[list]): The sets of customers, e.g. from separate_rci.
+    Q (float, optional): The vehicle capacity. Defaults to None (model.Q).
+
+    Returns:
+    list: The added constraints.
+    """
+    if Q is None:
+        Q = model.Q
+    if not hasattr(model, "capacity_cuts"):
+        model.capacity_cuts = pyomo.ConstraintList()
+
+    added = []
+    for S in sets:
+        members = frozenset(S)
+        vehicles = math.ceil(sum(model.q[i] for i in S) / Q - 1e-9)
+        added.append(
+            model.capacity_cuts.add(
+                expr=sum(var for (i, j), var in _arcs_from(model, S) if j in members)
+                <= len(S) - vehicles
+            )
+        )
+
+    return added
+
+
+def capacity_cut_loop(
+    model: pyomo.ConcreteModel,
+    solver: str = "appsi_highs",
+    max_rounds: int = 50,
+    max_cuts: int = 50,
+    tolerance: float = 1e-4,
+    min_improvement: float = 1e-4,
+) -> dict:
+    """
+    Strengthen the LP relaxation of a CVRP model with rounded capacity inequalities, separated in rounds at the root.
+
+    The LP relaxation is solved in a persistent solver, violated inequalities
+    are separated from the fractional solution with separate_rci, and added to
+    the model, until no more are found or the bound stops improving. The
+    integer domains are restored afterwards, so the cuts are kept for solving
+    the MIP, e.g. with the solve_model function of the script.
+
+    Parameters:
+    model (pyomo.ConcreteModel): A CVRP model with arc variables model.x, demands model.q and capacity model.Q, see the build_model functions in ruteplanlægning.
+    solver (str, optional): The name of a persistent LP solver, see SolverSession. Defaults to "appsi_highs".
+    max_rounds (int, optional): The maximum number of rounds. Defaults to 50.
+    max_cuts (int, optional): The maximum number of cuts added per round, the most violated first. Defaults to 50.
+    tolerance (float, optional): The violation above which a cut is added. Defaults to 1e-4.
+    min_improvement (float, optional): The relative bound improvement over the last 3 rounds below which the loop stops. Defaults to 1e-4.
+
+    Returns:
+    dict: The number of "rounds" and "cuts", the root LP "bounds" of the LP relaxation and after each round, and the "round_times" in seconds.
+    """
+    from mpa.utilities.model_utils import SolverSession
+
+    num_nodes = 1 + max(max(index) for index in model.x)
+    q = np.zeros(num_nodes)
+    q[: len(model.q)] = model.q
+
+    # Solve the LP relaxation, and restore the integer domains afterwards
+    relax = pyomo.TransformationFactory("core.relax_integer_vars")
+    reverse = relax.apply_to(model)
+
+    stats = {"rounds": 0, "cuts": 0, "bounds": [], "round_times": []}
+    bounds = stats["bounds"]
+    try:
+        session = SolverSession(model, solver=solver)
+        session.solve()
+        bounds.append(pyomo.value(model.obj))
+        print(f"Round 0: root bound {bounds[0]:.4f} of the LP relaxation")
+
+        while stats["rounds"] < max_rounds:
+            start = time.time()
+            sets = separate_rci(
+                support_graph(model.x, num_nodes),
+                q,
+                model.Q,
+                tolerance=tolerance,
+                max_cuts=max_cuts,
+            )
+            if not sets:
+                break
+
+            for constraint in add_capacity_cuts(model, sets):
+                session.add_constraint(constraint)
+            session.solve()
+            bounds.append(pyomo.value(model.obj))
+
+            stats["rounds"] += 1
+            stats["cuts"] += len(sets)
+            stats["round_times"].append(time.time() - start)
+
+            print(
+                f"Round {stats['rounds']}: root bound {bounds[-1]:.4f} "
+                f"(+{bounds[-1] - bounds[-2]:.4f}) with {len(sets)} cuts added "
+                f"({stats['round_times'][-1]:.2f} seconds)"
+            )
+
+            # Stop when the bound tails off
+            if len(bounds) > 3:
+                earlier = bounds[-4]
+                if bounds[-1] - earlier <= min_improvement * abs(earlier):
+                    break
+    finally:
+        relax.apply_to(model, reverse=reverse)
+
+    print(
+        f"Root bound {bounds[0]:.4f} -> {bounds[-1]:.4f} "
+        f"after {stats['rounds']} rounds with {stats['cuts']} capacity cuts"
+    )
+
+    return stats
+
+
+def _arcs_from(model, S):
+    # The arc variables leaving the nodes of S
+    for i in S:
+        for j in model.out_nodes[i]:
+            yield (i, j), model.x[i, j]
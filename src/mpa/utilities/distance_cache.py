@@ -0,0 +1,155 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from mpa.utilities.support_functions import lp_norm_distance_matrix
+
+DEFAULT_MAX_BYTES = 2 * 2**30  # 2 GB
+
+
+def get_cache_dir(cache_dir: str = None) -> str:
+    """
+    Get the directory in which distance matrices are cached, and create it if needed.
+
+    Parameters:
+    cache_dir (str, optional): The cache directory. Defaults to None, in which case the environment variable MPA_CACHE_DIR is used, or ~/.cache/mpa/distances if it is not set.
+
+    Returns:
+    str: The path of the cache directory.
+    """
+    if cache_dir is None:
+        cache_dir = os.environ.get(
+            "MPA_CACHE_DIR",
+            os.path.join(os.path.expanduser("~"), ".cache", "mpa", "distances"),
+        )
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    return cache_dir
+
+
+def make_cache_key(
+    points: np.ndarray, p: float, r: int = None, dtype=np.float64
+) -> str:
+    """
+    Make a cache key from the content of the coordinates and the distance settings.
+
+    Parameters:
+    points (np.ndarray): An array of shape (n, d) with one row per data point.
+    p (float): The norm used for the distances.
+    r (int, optional): Number of decimal places the distances are rounded to. Defaults to None.
+    dtype (type, optional): The floating point type of the distance matrix. Defaults to np.float64.
+
+    Returns:
+    str: A hex digest identifying the distance matrix.
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64)
+
+    digest = hashlib.sha256()
+    digest.update(str(points.shape).encode())
+    digest.update(points.tobytes())
+    digest.update(f"p={float(p)};r={r};dtype={np.dtype(dtype).str}".encode())
+
+    return digest.hexdigest()
+
+
+def cached_distance_matrix(
+    points: np.ndarray,
+    p: float,
+    r: int = None,
+    dtype=np.float64,
+    cache_dir: str = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> np.ndarray:
+    """
+    Get the Lp-norm distance matrix for the points from the cache, computing and storing it on a miss.
+
+    The matrix is returned as a read-only memory map, so several processes
+    opening the same matrix share it through the page cache.
+
+    Parameters:
+    points (np.ndarray): An array of shape (n, d) with one row per data point.
+    p (float): The norm to use, see lp_norm_distance_matrix.
+    r (int, optional): Number of decimal places to round to. Defaults to None.
+    dtype (type, optional): np.float32 or np.float64. Defaults to np.float64.
+    cache_dir (str, optional): The cache directory, see get_cache_dir. Defaults to None.
+    max_bytes (int, optional): The maximum total size of the cache before least recently used matrices are evicted. Defaults to 2 GB.
+
+    Returns:
+    np.ndarray: The (n, n) distance matrix as a read-only np.memmap.
+    """
+    key = make_cache_key(points, p, r, dtype)
+
+    def compute() -> np.ndarray:
+        return lp_norm_distance_matrix(points, p, r=r, dtype=dtype, symmetric=True)
+
+    return _load_or_store(key, compute, cache_dir, max_bytes)
+
+
+def evict_cache(cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES) -> list:
+    """
+    Remove the least recently used matrices until the cache is at most max_bytes large.
+
+    Parameters:
+    cache_dir (str, optional): The cache directory, see get_cache_dir. Defaults to None.
+    max_bytes (int, optional): The maximum total size of the cache. Defaults to 2 GB.
+
+    Returns:
+    list: The paths of the removed files.
+    """
+    cache_dir = get_cache_dir(cache_dir)
+
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(".npy"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = []
+
+    # Oldest first, as the modification time is bumped on every cache hit
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # Removed by another process
+            pass
+        total -= size
+        removed.append(path)
+
+    return removed
+
+
+def _load_or_store(key: str, compute, cache_dir: str, max_bytes: int) -> np.ndarray:
+    cache_dir = get_cache_dir(cache_dir)
+    path = os.path.join(cache_dir, f"{key}.npy")
+
+    try:
+        matrix = np.load(path, mmap_mode="r")
+        os.utime(path)  # Mark as recently used
+        return matrix
+    except FileNotFoundError:
+        pass
+
+    matrix = compute()
+
+    # Write to a temporary file and rename it, so concurrent readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            np.save(file, matrix)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    evict_cache(cache_dir, max_bytes)
+
+    if not os.path.exists(path):  # Larger than the whole cache, so it was evicted again
+        return matrix
+
+    return np.load(path, mmap_mode="r")
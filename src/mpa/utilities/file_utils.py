@@ -1,4 +1,19 @@
+import importlib.util
 import json
+import mmap
+import os
+import struct
+from collections.abc import Iterator
+from types import ModuleType
+
+import numpy as np
+
+# The binary instance format of write_instance: the magic bytes, the length of
+# a JSON header, the header, and the arrays, each starting at a multiple of
+# ALIGNMENT bytes so they can be used in place from a memory map
+MAGIC = b"MPAI0001"
+ALIGNMENT = 64
+BINARY_SUFFIX = ".mpa"
 
 
 def write_json(obj: dict, path: str, indent: int = 4) -> None:
@@ -17,15 +32,267 @@ def write_json(obj: dict, path: str, indent: int = 4) -> None:
         json.dump(obj=obj, fp=write_path, indent=indent)
 
 
-def read_json(path: str) -> dict:
+def write_json_stream(obj: dict, path: str) -> None:
+    """
+    Write the given object as a JSON file at the specified path, one matrix row at a time.
+
+    Values that are iterators, e.g. generators of rows, are written row by row
+    as they are produced, so a large matrix never has to be held in memory.
+    NumPy arrays are written row by row as well.
+
+    Parameters:
+    obj (dict): The object to write. The values can be JSON values, NumPy arrays or iterators of rows.
+    path (str): The path at which to write the JSON file.
+
+    Returns:
+    None
+    """
+    with open(path, "w") as file:
+        file.write("{")
+        for index, (key, value) in enumerate(obj.items()):
+            file.write(",\n" if index else "\n")
+            file.write(json.dumps(key) + ": ")
+            if isinstance(value, Iterator) or (
+                isinstance(value, np.ndarray) and value.ndim > 1
+            ):
+                file.write("[")
+                for r, row in enumerate(value):
+                    file.write(",\n" if r else "\n")
+                    file.write(json.dumps(_plain(row)))
+                file.write("\n]")
+            else:
+                file.write(json.dumps(_plain(value)))
+        file.write("\n}\n")
+
+
+def read_json(path: str, prefer_binary: bool = True) -> dict:
     """
     Read a JSON file at the specified path and return it as a dictionary.
 
+    If the file has been converted with convert_json and the binary file is
+    newer than the JSON file, the binary file is read instead, see
+    read_instance. The numeric matrices and lists are then NumPy arrays.
+
     Parameters:
     path (str): The path of the JSON file to read.
+    prefer_binary (bool, optional): Whether to read a fresh binary version of the file instead. Defaults to True.
 
     Returns:
     dict: The contents of the JSON file as a dictionary.
     """
+    if prefer_binary:
+        binary = binary_path(path)
+        if os.path.exists(binary) and os.path.getmtime(binary) >= os.path.getmtime(
+            path
+        ):
+            return read_instance(binary)
+
     with open(path) as file:
         return json.load(file)
+
+
+def append_json_line(obj: dict, path: str) -> None:
+    """
+    Append the given object as a single line to a JSON-lines file at the specified path.
+
+    Parameters:
+    obj (dict): The object to append.
+    path (str): The path of the JSON-lines file. It is created if it does not exist.
+
+    Returns:
+    None
+    """
+    with open(path, "a") as write_path:
+        write_path.write(json.dumps(obj) + "\n")
+
+
+def read_json_lines(path: str) -> list:
+    """
+    Read a JSON-lines file at the specified path and return its objects as a list.
+
+    A truncated last line, e.g. from an interrupted run, is ignored.
+
+    Parameters:
+    path (str): The path of the JSON-lines file to read.
+
+    Returns:
+    list: The objects in the file, in the order they were written.
+    """
+    objects = []
+    with open(path) as file:
+        for line in file:
+            try:
+                objects.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return objects
+
+
+def binary_path(path: str) -> str:
+    """
+    Get the path of the binary version of a JSON file, next to it with the suffix ".mpa".
+
+    Parameters:
+    path (str): The path of the JSON file.
+
+    Returns:
+    str: The path of the binary file.
+    """
+    return os.path.splitext(path)[0] + BINARY_SUFFIX
+
+
+def write_instance(data: dict, path: str) -> None:
+    """
+    Write the data of an instance as a binary file, which read_instance can use without parsing or copying.
+
+    Values that are rectangular lists of numbers (or NumPy arrays) are stored
+    as typed arrays, and all other values, like scalars and labels, in the
+    JSON header.
+
+    Parameters:
+    data (dict): The data of the instance.
+    path (str): The path of the binary file.
+
+    Returns:
+    None
+    """
+    metadata, arrays = {}, {}
+    for key, value in data.items():
+        array = _as_array(value)
+        if array is None:
+            metadata[key] = value
+        else:
+            arrays[key] = array
+
+    # The offsets of the arrays relative to the end of the header
+    layout, offset = {}, 0
+    for key, array in arrays.items():
+        layout[key] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = _aligned(offset + array.nbytes)
+
+    header = {"order": list(data), "metadata": metadata, "arrays": layout}
+    header = json.dumps(header).encode()
+    start = _aligned(len(MAGIC) + 8 + len(header))
+    header += b" " * (start - len(MAGIC) - 8 - len(header))
+
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<Q", len(header)))
+        file.write(header)
+        for key, array in arrays.items():
+            file.seek(start + layout[key]["offset"])
+            file.write(array.tobytes())
+        file.truncate(start + offset)
+
+
+def read_instance(path: str) -> dict:
+    """
+    Read the data of an instance written by write_instance.
+
+    The arrays are read-only views of a memory map of the file, so nothing is
+    parsed or copied, and only the parts of the arrays that are used are read
+    from the disk.
+
+    Parameters:
+    path (str): The path of the binary file.
+
+    Returns:
+    dict: The data, with NumPy arrays for the arrays.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a binary instance file")
+        (length,) = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(length))
+        start = len(MAGIC) + 8 + length
+        # An empty file cannot be memory mapped
+        buffer = (
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if header["arrays"] and os.path.getsize(path) > start
+            else b""
+        )
+
+    data = dict(header["metadata"])
+    for key, layout in header["arrays"].items():
+        dtype = np.dtype(layout["dtype"])
+        count = int(np.prod(layout["shape"]))
+        if count == 0:
+            # Zero-size arrays take no bytes, and may end where the file does
+            data[key] = np.empty(layout["shape"], dtype=dtype)
+            continue
+        data[key] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=start + layout["offset"]
+        ).reshape(layout["shape"])
+
+    # Keep the keys in the order of the JSON file
+    return {key: data[key] for key in header["order"]}
+
+
+def convert_json(path: str) -> str:
+    """
+    Convert a JSON file to the binary format, so read_json reads it from the binary file afterwards.
+
+    Parameters:
+    path (str): The path of the JSON file.
+
+    Returns:
+    str: The path of the binary file, see binary_path.
+    """
+    binary = binary_path(path)
+    write_instance(read_json(path, prefer_binary=False), binary)
+
+    return binary
+
+
+def load_script(path: str, name: str = None) -> ModuleType:
+    """
+    Load a script whose file name is not a valid module name, e.g. 5_2_0_ULS.py, as a module.
+
+    Parameters:
+    path (str): The path of the script.
+    name (str, optional): The name of the module. Defaults to None, which uses the file name without the extension.
+
+    Returns:
+    ModuleType: The module.
+    """
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def _plain(value):
+    # NumPy arrays and scalars as the Python values the json module writes
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+def _as_array(value):
+    # A rectangular list of numbers as an int64 or float64 array, else None
+    if isinstance(value, np.ndarray):
+        return np.ascontiguousarray(value) if value.dtype.kind in "biuf" else None
+    if not isinstance(value, list) or not value:
+        return None
+    try:
+        array = np.array(value)
+    except ValueError:  # Ragged lists
+        return None
+    if array.size == 0:  # Nested empty lists, kept as they are in the header
+        return None
+    if array.dtype.kind in "iu":
+        return array.astype(np.int64)
+    if array.dtype.kind == "f":
+        return array.astype(np.float64)
+    return None
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
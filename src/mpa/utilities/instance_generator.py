@@ -0,0 +1,319 @@
+import math
+
+import numpy as np
+
+from mpa.utilities.file_utils import write_json_stream
+
+# The generated instances follow the schemas of the bundled data files, e.g.
+# ruteplanlægning/7_4_CVRP_n_50_data.json for routing, and
+# stokastisk_optimering/9_1_data.json for facility location
+
+PATTERNS = ("uniform", "clustered", "solomon")
+
+
+def generate_points(
+    n: int,
+    pattern: str = "uniform",
+    seed: int = 1,
+    size: float = 100,
+    num_clusters: int = None,
+) -> np.ndarray:
+    """
+    Generate points in the square [0, size] x [0, size].
+
+    The patterns follow the classes of the Solomon instances: "uniform"
+    spreads the points uniformly (R), "clustered" draws them around a number
+    of cluster centres (C), and "solomon" draws half of them uniformly and
+    half of them in clusters (RC).
+
+    Parameters:
+    n (int): The number of points.
+    pattern (str, optional): "uniform", "clustered" or "solomon". Defaults to "uniform".
+    seed (int, optional): The seed of the random number generator. Defaults to 1.
+    size (float, optional): The side length of the square. Defaults to 100.
+    num_clusters (int, optional): The number of clusters. Defaults to None (about the square root of n / 4).
+
+    Returns:
+    np.ndarray: An array of shape (n, 2) with the coordinates.
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"pattern must be one of {PATTERNS}, got {pattern!r}")
+
+    rng = np.random.default_rng(seed)
+    if pattern == "uniform":
+        return rng.uniform(0, size, (n, 2))
+
+    num_clustered = n if pattern == "clustered" else n // 2
+    if num_clusters is None:
+        num_clusters = max(2, round(math.sqrt(num_clustered / 4)))
+
+    centres = rng.uniform(0.1 * size, 0.9 * size, (num_clusters, 2))
+    spread = 0.25 * size / math.sqrt(num_clusters)
+    clustered = centres[rng.integers(0, num_clusters, num_clustered)]
+    clustered += rng.normal(0, spread, (num_clustered, 2))
+    points = np.vstack([clustered, rng.uniform(0, size, (n - num_clustered, 2))])
+
+    return np.clip(points, 0, size)
+
+
+def distance_rows(
+    tails: np.ndarray,
+    heads: np.ndarray = None,
+    decimals: int = None,
+    block_size: int = None,
+):
+    """
+    Generate the rows of the Euclidean distance matrix a block at a time, e.g. for write_json_stream.
+
+    Parameters:
+    tails (np.ndarray): An array of shape (n, 2) with the points of the rows.
+    heads (np.ndarray, optional): An array of shape (k, 2) with the points of the columns. Defaults to None (the tails).
+    decimals (int, optional): The number of decimals the distances are rounded to, where 0 gives integers. Defaults to None (no rounding).
+    block_size (int, optional): The number of rows computed at a time. Defaults to None, which keeps each block at roughly 32 MB.
+
+    Yields:
+    np.ndarray: One row of distances at a time.
+    """
+    tails = np.asarray(tails, dtype=np.float64)
+    heads = tails if heads is None else np.asarray(heads, dtype=np.float64)
+    if block_size is None:
+        block_size = max(1, (32 * 2**20) // (16 * max(1, len(heads))))
+
+    for start in range(0, len(tails), block_size):
+        stop = start + block_size
+        diff = tails[start:stop, None, :] - heads[None, :, :]
+        block = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        yield from _rounded(block, decimals)
+
+
+def routing_instance(
+    n: int,
+    problem: str = "cvrp",
+    pattern: str = "uniform",
+    seed: int = 1,
+    m: int = None,
+    Q: int = None,
+    demand: tuple = (1, 30),
+    size: float = 100,
+    decimals: int = 0,
+    dense: bool = False,
+    stream: bool = False,
+) -> dict:
+    """
+    Generate a TSP, mTSP or CVRP instance in the schema of the data files in ruteplanlægning.
+
+    The depot is node 0, in the centre of the square. The vehicles of the
+    CVRP have room for about 10 % more than the total demand.
+
+    Parameters:
+    n (int): The number of customers.
+    problem (str, optional): "tsp" (n, x_coord, y_coord), "mtsp" (also m and S, the maximum number of customers per route) or "cvrp" (also m, q and Q). Defaults to "cvrp".
+    pattern (str, optional): The placement of the customers, see generate_points. Defaults to "uniform".
+    seed (int, optional): The seed of the random number generator. Defaults to 1.
+    m (int, optional): The number of vehicles. Defaults to None, which is about one per 10 customers, or as many as Q requires.
+    Q (int, optional): The vehicle capacity of the CVRP. Defaults to None, which fits the demand in m vehicles.
+    demand (tuple, optional): The smallest and largest demand of a customer. Defaults to (1, 30).
+    size (float, optional): The side length of the square. Defaults to 100.
+    decimals (int, optional): The number of decimals of the coordinates and distances, where 0 gives integers like the bundled data. Defaults to 0.
+    dense (bool, optional): Whether to add the distance matrix "dist", which the models in ruteplanlægning need. Defaults to False, as it grows quadratically with n.
+    stream (bool, optional): Whether "dist" is a generator of rows for write_json_stream instead of an array. Defaults to False.
+
+    Returns:
+    dict: The instance.
+    """
+    if problem not in ("tsp", "mtsp", "cvrp"):
+        raise ValueError(f"problem must be 'tsp', 'mtsp' or 'cvrp', got {problem!r}")
+
+    # A separate random stream for the demands than for the points
+    rng = np.random.default_rng([seed, 1])
+    customers = generate_points(n, pattern, seed, size)
+    points = np.vstack([[size / 2, size / 2], customers])
+    if decimals is not None:
+        points = np.round(points, decimals)
+    x_coord, y_coord = _rounded(points.T, decimals)
+
+    data = {"n": n}
+    if problem == "mtsp":
+        m = m or max(1, round(n / 10))
+        data.update(m=m, S=math.ceil(1.2 * n / m))
+    elif problem == "cvrp":
+        q = rng.integers(demand[0], demand[1] + 1, n + 1)
+        q[0] = 0
+        if m is None:
+            m = math.ceil(1.1 * q.sum() / Q) if Q else max(1, round(n / 10))
+        if Q is None:
+            Q = max(math.ceil(1.1 * q.sum() / m), int(q.max()))
+        data.update(m=m)
+    data.update(x_coord=x_coord, y_coord=y_coord)
+    if problem == "cvrp":
+        data.update(q=q, Q=Q)
+
+    if dense:
+        rows = distance_rows(points, decimals=decimals)
+        data["dist"] = rows if stream else np.array(list(rows))
+
+    return data
+
+
+def flp_instance(
+    numFacilities: int,
+    numCustomers: int,
+    pattern: str = "uniform",
+    seed: int = 1,
+    capacity_ratio: float = 3.0,
+    size: float = 100,
+    stream: bool = False,
+) -> dict:
+    """
+    Generate a capacitated facility location instance in the schema of stokastisk_optimering/9_1_data.json.
+
+    The unit transport costs c grow with the distance between the facility
+    and the customer, from 1 to about 15 across the square. The capacities
+    add up to capacity_ratio times the expected total demand, and larger
+    facilities have larger fixed costs.
+
+    Parameters:
+    numFacilities (int): The number of facilities.
+    numCustomers (int): The number of customers.
+    pattern (str, optional): The placement of the customers, see generate_points. The facilities are placed uniformly. Defaults to "uniform".
+    seed (int, optional): The seed of the random number generator. Defaults to 1.
+    capacity_ratio (float, optional): The total capacity relative to the expected total demand. Defaults to 3.0.
+    size (float, optional): The side length of the square. Defaults to 100.
+    stream (bool, optional): Whether "c" is a generator of rows for write_json_stream instead of an array. Defaults to False.
+
+    Returns:
+    dict: The instance.
+    """
+    rng = np.random.default_rng(seed)
+    facilities = rng.uniform(0, size, (numFacilities, 2))
+    customers = generate_points(numCustomers, pattern, seed + 1, size)
+
+    demand_exp = rng.integers(5, 21, numCustomers)
+    demand_std = np.round(rng.uniform(0.1, 0.3, numCustomers) * demand_exp, 1)
+
+    shares = rng.uniform(0.5, 1.5, numFacilities)
+    total = capacity_ratio * demand_exp.sum()
+    cap = np.maximum(1, np.round(shares / shares.sum() * total)).astype(np.int64)
+    f = np.round(cap * rng.uniform(3, 6, numFacilities) * 50 / max(1, cap.mean()))
+
+    # Unit costs of 1 for the closest customers up to about 15 across the square
+    scale = 10 / size
+    rows = (1 + row * scale for row in distance_rows(facilities, customers))
+    rows = (np.round(row).astype(np.int64) for row in rows)
+
+    return {
+        "numFacilities": numFacilities,
+        "numCustomers": numCustomers,
+        "c": rows if stream else np.array(list(rows)),
+        "cap": cap,
+        "f": f.astype(np.int64),
+        "demand_exp": demand_exp,
+        "demand_std": demand_std,
+    }
+
+
+def lot_sizing_instance(
+    T: int,
+    products: int = 1,
+    seed: int = 1,
+    base_demand: float = 100_000,
+    seasonality: float = 0.2,
+) -> dict:
+    """
+    Generate a lot sizing instance in the schema of the ULS (one product) or MPS (several products) model in produktionsplanlægning.
+
+    The demands vary around the base demand with a yearly season (52
+    periods) and noise. The production capacity is 25 % above the largest
+    demand of a period.
+
+    Parameters:
+    T (int): The number of periods.
+    products (int, optional): The number of products, where 1 gives the ULS schema and more the MPS schema. Defaults to 1.
+    seed (int, optional): The seed of the random number generator. Defaults to 1.
+    base_demand (float, optional): The average demand of a period, split over the products. Defaults to 100_000.
+    seasonality (float, optional): The relative amplitude of the season. Defaults to 0.2.
+
+    Returns:
+    dict: The instance.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(T)
+
+    share = rng.dirichlet(np.full(products, 5.0)) * base_demand
+    phase = rng.uniform(0, 2 * np.pi, (products, 1))
+    season = 1 + seasonality * np.sin(2 * np.pi * t / 52 + phase)
+    noise = rng.normal(1, 0.05, (products, T))
+    demands = np.maximum(0, np.round(share[:, None] * season * noise)).astype(np.int64)
+
+    var_cost = np.round(rng.uniform(2, 6, (products, T)), 2)
+    fixed_cost = np.repeat(rng.integers(40, 61, (products, 1)) * 1000, T, axis=1)
+    inv_cost = np.round(rng.choice([0.1, 0.2, 0.3, 0.6], T), 1)
+
+    peak = demands.max() if products == 1 else demands.max(axis=1).max()
+    max_prod = int(math.ceil(1.25 * peak / 1000) * 1000)
+    max_inv = int(math.ceil(demands.sum(axis=0).max() / 1000) * 1000)
+
+    if products == 1:
+        return {
+            "periods": [f"week{i + 1}" for i in t],
+            "demands": demands[0],
+            "var_cost": var_cost[0],
+            "fixed_cost": fixed_cost[0],
+            "inv_cost": inv_cost,
+            "max_prod": max_prod,
+            "max_inv": max_inv,
+        }
+
+    return {
+        "products": [f"Product{k + 1}" for k in range(products)],
+        "periods": [f"Week{i + 1}" for i in t],
+        "demands": demands,
+        "var_cost": var_cost,
+        "fixed_cost": fixed_cost,
+        "inv_cost": inv_cost,
+        "max_prod": max_prod,
+        "max_inv": max_inv,
+        "batch_size": 100,
+    }
+
+
+def write_routing_instance(path: str, n: int, **kwargs) -> None:
+    """
+    Generate a routing instance and write it as a JSON file, streaming the distance matrix row by row.
+
+    Parameters:
+    path (str): The path of the JSON file.
+    n (int): The number of customers.
+    **kwargs: The other arguments of routing_instance, e.g. problem, pattern, seed and dense.
+
+    Returns:
+    None
+    """
+    write_json_stream(routing_instance(n, stream=True, **kwargs), path)
+
+
+def write_flp_instance(
+    path: str, numFacilities: int, numCustomers: int, **kwargs
+) -> None:
+    """
+    Generate a facility location instance and write it as a JSON file, streaming the cost matrix row by row.
+
+    Parameters:
+    path (str): The path of the JSON file.
+    numFacilities (int): The number of facilities.
+    numCustomers (int): The number of customers.
+    **kwargs: The other arguments of flp_instance, e.g. pattern and seed.
+
+    Returns:
+    None
+    """
+    data = flp_instance(numFacilities, numCustomers, stream=True, **kwargs)
+    write_json_stream(data, path)
+
+
+def _rounded(block: np.ndarray, decimals: int) -> np.ndarray:
+    # Rounded to the given decimals, as integers for 0 decimals
+    if decimals is None:
+        return block
+    block = np.round(block, decimals)
+    return block.astype(np.int64) if decimals == 0 else block
@@ -0,0 +1,344 @@
+from typing import List, Tuple
+
+import numpy as np
+import pyomo.environ as pyomo
+from pyomo.core.expr.numeric_expr import LinearExpression, MonomialTermExpression
+
+
+def coo_to_csr(
+    rows: np.ndarray, cols: np.ndarray, vals: np.ndarray, nrows: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert a sparse matrix in coordinate (COO) format to compressed sparse row (CSR) format.
+
+    Duplicate (row, col) entries are summed and explicit zeros are dropped.
+
+    Parameters:
+    rows (np.ndarray): The row index of each entry.
+    cols (np.ndarray): The column index of each entry.
+    vals (np.ndarray): The value of each entry.
+    nrows (int): The number of rows in the matrix.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray, np.ndarray]: The CSR data, column indices and row pointers.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    vals = np.asarray(vals, dtype=np.float64)
+
+    # Sort by row, then by column, and sum the duplicates
+    ncols = int(cols.max()) + 1 if cols.size else 1
+    keys, inverse = np.unique(rows * ncols + cols, return_inverse=True)
+    data = np.bincount(inverse.ravel(), weights=vals, minlength=keys.size)
+
+    nonzero = data != 0
+    keys, data = keys[nonzero], data[nonzero]
+    indices = keys % ncols
+    indptr = np.zeros(nrows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // ncols, minlength=nrows), out=indptr[1:])
+
+    return data, indices, indptr
+
+
+class SparseConstraintBuilder:
+    """
+    Assemble a block of linear constraints lb <= Ax <= ub from NumPy index arithmetic.
+
+    Constraints are added in blocks of COO triplets, so a family of
+    constraints, e.g. one per arc, is added with a handful of vectorized
+    NumPy operations instead of one Python expression per constraint.
+    Columns refer to positions in the list of variables, see flatten_vars.
+
+    Example (f[i, j] <= (Q - q[j]) * x[i, j] for all arcs, with x in the first N*N
+    columns and f in the next N*N columns):
+
+        arcs = np.arange(N * N)
+        builder.add_rows(
+            rows=np.concatenate([arcs, arcs]),
+            cols=np.concatenate([N * N + arcs, arcs]),
+            vals=np.concatenate([np.ones(N * N), -(Q - q[arcs % N])]),
+            lb=None,
+            ub=np.zeros(N * N),
+        )
+    """
+
+    def __init__(self):
+        self._rows = []
+        self._cols = []
+        self._vals = []
+        self._lb = []
+        self._ub = []
+        self.nrows = 0
+
+    def add_rows(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        vals: np.ndarray,
+        lb: np.ndarray = None,
+        ub: np.ndarray = None,
+    ) -> range:
+        """
+        Add a block of constraints.
+
+        Parameters:
+        rows (np.ndarray): The row of each entry, counted from 0 within the block.
+        cols (np.ndarray): The column (variable position) of each entry.
+        vals (np.ndarray): The coefficient of each entry.
+        lb (np.ndarray, optional): The lower bound of each row in the block. None means no lower bounds.
+        ub (np.ndarray, optional): The upper bound of each row in the block. None means no upper bounds.
+
+        Returns:
+        range: The indices of the added rows in the assembled matrix.
+        """
+        if lb is None and ub is None:
+            raise ValueError("At least one of lb and ub must be given")
+
+        nrows = len(lb) if lb is not None else len(ub)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        vals = np.broadcast_to(np.asarray(vals, dtype=np.float64), rows.shape)
+
+        self._rows.append(rows + self.nrows)
+        self._cols.append(cols)
+        self._vals.append(vals)
+        self._lb.append(_bounds(lb, nrows, -np.inf))
+        self._ub.append(_bounds(ub, nrows, np.inf))
+
+        added = range(self.nrows, self.nrows + nrows)
+        self.nrows += nrows
+
+        return added
+
+    def to_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Assemble all added blocks into one matrix.
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The CSR data, column indices and row pointers.
+        """
+        return coo_to_csr(
+            _concatenate(self._rows, np.int64),
+            _concatenate(self._cols, np.int64),
+            _concatenate(self._vals, np.float64),
+            self.nrows,
+        )
+
+    @property
+    def lb(self) -> np.ndarray:
+        return _concatenate(self._lb, np.float64)
+
+    @property
+    def ub(self) -> np.ndarray:
+        return _concatenate(self._ub, np.float64)
+
+    def to_pyomo(self, x: List[pyomo.Var]) -> pyomo.Constraint:
+        """
+        Create an indexed Pyomo constraint with one index per row.
+
+        The bodies are created directly as LinearExpression objects from the
+        CSR arrays, which bypasses Pyomo's operator overloading.
+
+        Parameters:
+        x (List[pyomo.Var]): The variables in column order, see flatten_vars.
+
+        Returns:
+        pyomo.Constraint: The constraint, to be assigned to a model attribute.
+        """
+        data, indices, indptr = self.to_csr()
+        lb = [None if np.isinf(value) else float(value) for value in self.lb]
+        ub = [None if np.isinf(value) else float(value) for value in self.ub]
+        coefs = data.tolist()
+        columns = indices.tolist()
+        pointers = indptr.tolist()
+
+        def rule(model, row):
+            terms = [
+                MonomialTermExpression((coefs[p], x[columns[p]]))
+                for p in range(pointers[row], pointers[row + 1])
+            ]
+            return (lb[row], LinearExpression(terms), ub[row])
+
+        return pyomo.Constraint(range(self.nrows), rule=rule)
+
+    def write_lp(
+        self,
+        path: str,
+        c: np.ndarray,
+        col_lb: np.ndarray,
+        col_ub: np.ndarray,
+        integer: np.ndarray = None,
+        sense: str = "minimize",
+        names: List[str] = None,
+    ) -> None:
+        """
+        Write the assembled constraints together with an objective and variable bounds as an LP file.
+
+        Parameters:
+        path (str): The path of the LP file.
+        c (np.ndarray): The objective coefficient of each column.
+        col_lb (np.ndarray): The lower bound of each column (-np.inf for none).
+        col_ub (np.ndarray): The upper bound of each column (np.inf for none).
+        integer (np.ndarray, optional): A boolean per column, True for integer columns. Defaults to None (all continuous).
+        sense (str, optional): "minimize" or "maximize". Defaults to "minimize".
+        names (List[str], optional): The name of each column. Defaults to None, which names them x0, x1, ...
+
+        Returns:
+        None
+        """
+        write_lp_file(
+            path,
+            c,
+            self.to_csr(),
+            self.lb,
+            self.ub,
+            col_lb,
+            col_ub,
+            integer,
+            sense,
+            names,
+        )
+
+
+def flatten_vars(*components: pyomo.Var) -> Tuple[list, list]:
+    """
+    Flatten Pyomo variable components into one list that defines the column order.
+
+    An IndexedVar declared over (model.nodes, model.nodes) is flattened row
+    major, so x[i, j] ends up at offset + i * N + j.
+
+    Parameters:
+    *components (pyomo.Var): The variable components.
+
+    Returns:
+    Tuple[list, list]: The variables in column order, and the column offset of each component.
+    """
+    x = []
+    offsets = []
+    for component in components:
+        offsets.append(len(x))
+        x.extend(component.values())
+
+    return x, offsets
+
+
+def variable_bounds(x: List[pyomo.Var]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the bounds and integrality of a list of Pyomo variables, e.g. for write_lp_file.
+
+    Fixed variables get their fixed value as both bounds.
+
+    Parameters:
+    x (List[pyomo.Var]): The variables in column order.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray, np.ndarray]: The lower bounds, upper bounds and integrality of the columns.
+    """
+    col_lb = np.full(len(x), -np.inf)
+    col_ub = np.full(len(x), np.inf)
+    integer = np.zeros(len(x), dtype=bool)
+
+    for col, var in enumerate(x):
+        if var.fixed:
+            col_lb[col] = col_ub[col] = var.value
+        else:
+            if var.lb is not None:
+                col_lb[col] = var.lb
+            if var.ub is not None:
+                col_ub[col] = var.ub
+        integer[col] = var.is_integer()
+
+    return col_lb, col_ub, integer
+
+
+def write_lp_file(
+    path: str,
+    c: np.ndarray,
+    A: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    row_lb: np.ndarray,
+    row_ub: np.ndarray,
+    col_lb: np.ndarray,
+    col_ub: np.ndarray,
+    integer: np.ndarray = None,
+    sense: str = "minimize",
+    names: List[str] = None,
+) -> None:
+    """
+    Write a mixed integer linear program in matrix form as a CPLEX LP file.
+
+    Ranged rows (both bounds finite and different) are written as two rows.
+
+    Parameters:
+    path (str): The path of the LP file.
+    c (np.ndarray): The objective coefficient of each column.
+    A (Tuple[np.ndarray, np.ndarray, np.ndarray]): The constraint matrix in CSR format, see coo_to_csr.
+    row_lb (np.ndarray): The lower bound of each row (-np.inf for none).
+    row_ub (np.ndarray): The upper bound of each row (np.inf for none).
+    col_lb (np.ndarray): The lower bound of each column (-np.inf for none).
+    col_ub (np.ndarray): The upper bound of each column (np.inf for none).
+    integer (np.ndarray, optional): A boolean per column, True for integer columns. Defaults to None.
+    sense (str, optional): "minimize" or "maximize". Defaults to "minimize".
+    names (List[str], optional): The name of each column. Defaults to None (x0, x1, ...).
+
+    Returns:
+    None
+    """
+    if sense not in ("minimize", "maximize"):
+        raise ValueError(f"sense must be 'minimize' or 'maximize', got {sense!r}")
+
+    data, indices, indptr = A
+    c = np.asarray(c, dtype=np.float64)
+    if names is None:
+        names = [f"x{col}" for col in range(len(c))]
+
+    def terms(coefs, cols) -> str:
+        return " ".join(f"{coef:+.17g} {names[col]}" for coef, col in zip(coefs, cols))
+
+    with open(path, "w") as file:
+        file.write(f"{sense}\n obj: ")
+        objective = np.flatnonzero(c)
+        file.write(
+            terms(c[objective], objective) if objective.size else f"0 {names[0]}"
+        )
+        file.write("\nsubject to\n")
+
+        for row in range(len(row_lb)):
+            start, stop = indptr[row], indptr[row + 1]
+            body = terms(data[start:stop], indices[start:stop])
+            if not body:
+                continue
+            lb, ub = row_lb[row], row_ub[row]
+            if lb == ub:
+                file.write(f" r{row}: {body} = {ub:.17g}\n")
+                continue
+            if np.isfinite(lb):
+                file.write(f" r{row}_lb: {body} >= {lb:.17g}\n")
+            if np.isfinite(ub):
+                file.write(f" r{row}_ub: {body} <= {ub:.17g}\n")
+
+        file.write("bounds\n")
+        for col, (lb, ub) in enumerate(zip(col_lb, col_ub)):
+            lower = "-inf" if np.isneginf(lb) else f"{lb:.17g}"
+            upper = "+inf" if np.isposinf(ub) else f"{ub:.17g}"
+            file.write(f" {lower} <= {names[col]} <= {upper}\n")
+
+        if integer is not None and np.any(integer):
+            file.write("general\n")
+            for col in np.flatnonzero(integer):
+                file.write(f" {names[col]}\n")
+
+        file.write("end\n")
+
+
+def _bounds(values: np.ndarray, nrows: int, default: float) -> np.ndarray:
+    if values is None:
+        return np.full(nrows, default)
+    values = np.array(values, dtype=np.float64)
+    values[np.isnan(values)] = default
+    return values
+
+
+def _concatenate(arrays: list, dtype: type) -> np.ndarray:
+    if not arrays:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(arrays).astype(dtype, copy=False)
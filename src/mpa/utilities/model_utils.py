@@ -1,4 +1,21 @@
+import os
+import re
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable
+
 import pyomo.environ as pyomo
+from pyomo.common.tee import capture_output
+from pyomo.contrib.appsi.base import PersistentSolver as AppsiPersistentSolver
+from pyomo.core.expr.visitor import identify_mutable_parameters, identify_variables
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+
+from mpa.utilities.file_utils import append_json_line
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, where the memory is not recorded
+    resource = None
 
 
 def solve_model(
@@ -30,3 +47,507 @@ def solve_model(
     results = solver.solve(model, tee=True)
 
     return results
+
+
+# Solver specific names of the common solver options
+_OPTION_NAMES = {
+    "highs": {"timelimit": "time_limit", "MIPgap": "mip_rel_gap", "threads": "threads"},
+    "gurobi": {"timelimit": "TimeLimit", "MIPgap": "MIPGap", "threads": "Threads"},
+    "cplex": {
+        "timelimit": "timelimit",
+        "MIPgap": "mip_tolerances_mipgap",
+        "threads": "threads",
+    },
+    "cbc": {"timelimit": "seconds", "MIPgap": "ratioGap", "threads": "threads"},
+}
+
+
+def set_solver_options(
+    solver,
+    solver_name: str,
+    timelimit: float = None,
+    MIPgap: float = None,
+    threads: int = None,
+) -> None:
+    """
+    Set the common solver options under the name the given solver expects.
+
+    Parameters:
+    solver: The solver object returned by pyomo.SolverFactory.
+    solver_name (str): The name the solver was created with, e.g. "gurobi" or "appsi_highs".
+    timelimit (float, optional): The time limit for the solver to run, in seconds. Default is None.
+    MIPgap (float, optional): The MIP gap tolerance for the solver. Default is None.
+    threads (int, optional): The number of threads the solver may use. Default is None.
+
+    Returns:
+    None
+    """
+    family = solver_name.replace("appsi_", "").replace("_persistent", "")
+    family = family.replace("_direct", "")
+    option_names = _OPTION_NAMES.get(family, {})
+
+    for name, value in [
+        ("timelimit", timelimit),
+        ("MIPgap", MIPgap),
+        ("threads", threads),
+    ]:
+        if value:
+            solver.options[option_names.get(name, name)] = value
+
+
+class SolverSession:
+    """
+    Keep a model loaded in a persistent solver, so it can be modified and re-solved incrementally.
+
+    Both Pyomo's appsi solvers (e.g. "appsi_highs", "appsi_gurobi") and the
+    legacy persistent solvers (e.g. "gurobi_persistent") are supported. The
+    model is only sent to the solver once. Afterwards only the changes are
+    sent, and each solve is warm started from the previous solution.
+
+    Right-hand sides and coefficients that change between solves should be
+    mutable Params in the model, e.g. pyomo.Param(mutable=True, initialize=alpha),
+    and be changed through set_value.
+    """
+
+    def __init__(
+        self,
+        model: pyomo.ConcreteModel(),
+        solver: str = "appsi_highs",
+        timelimit: float = None,
+        MIPgap: float = None,
+        tee: bool = False,
+    ):
+        """
+        Load the model in a persistent solver.
+
+        Parameters:
+        model (pyomo.environ.ConcreteModel): The Pyomo ConcreteModel to solve.
+        solver (str, optional): The name of a persistent solver. Default is "appsi_highs".
+        timelimit (float, optional): The time limit for each solve, in seconds. Default is None.
+        MIPgap (float, optional): The MIP gap tolerance for the solver. Default is None.
+        tee (bool, optional): Whether to stream the solver log. Default is False.
+        """
+        self.model = model
+        self.tee = tee
+        self.solver = pyomo.SolverFactory(solver)
+        self._appsi = isinstance(self.solver, AppsiPersistentSolver)
+
+        if not self._appsi and not isinstance(self.solver, PersistentSolver):
+            raise ValueError(f"{solver} is not a persistent solver")
+
+        set_solver_options(self.solver, solver, timelimit=timelimit, MIPgap=MIPgap)
+
+        if not self._appsi:
+            self.solver.set_instance(model)
+
+        # Constraints depending on each mutable Param, used by the legacy solvers
+        self._dependents = None
+
+    def set_value(self, param: pyomo.Param, value: float) -> None:
+        """
+        Change the value of a mutable Param, e.g. a right-hand side or a coefficient.
+
+        Parameters:
+        param (pyomo.Param): A mutable scalar Param or an element of a mutable indexed Param.
+        value (float): The new value.
+
+        Returns:
+        None
+        """
+        param.set_value(value)
+
+        # The appsi solvers detect changed Params themselves on the next solve
+        if not self._appsi:
+            for constraint in self._constraints_depending_on(param):
+                self.update_constraint(constraint)
+
+    def add_constraint(self, constraint: pyomo.Constraint) -> None:
+        """
+        Send a constraint that was added to the model after the session was created, e.g. a cut.
+
+        Parameters:
+        constraint (pyomo.Constraint): The new constraint (e.g. the return value of ConstraintList.add).
+
+        Returns:
+        None
+        """
+        if not self._appsi:
+            self.solver.add_constraint(constraint)
+            self._dependents = None
+
+    def update_constraint(self, constraint: pyomo.Constraint) -> None:
+        """
+        Re-send a constraint whose expression was changed with set_value.
+
+        Parameters:
+        constraint (pyomo.Constraint): The changed constraint.
+
+        Returns:
+        None
+        """
+        if not self._appsi:
+            self.solver.remove_constraint(constraint)
+            self.solver.add_constraint(constraint)
+
+    def update_var(self, var: pyomo.Var) -> None:
+        """
+        Re-send a variable whose bounds, domain or fixed value were changed, e.g. with setub, fix or unfix.
+
+        Parameters:
+        var (pyomo.Var): The changed variable (an element of an indexed Var).
+
+        Returns:
+        None
+        """
+        # The appsi solvers detect changed variables themselves on the next solve
+        if not self._appsi:
+            self.solver.update_var(var)
+
+    def solve(self, load_solutions: bool = True):
+        """
+        Solve the model with the changes made since the last solve.
+
+        The appsi solvers raise an error when loading the solution of a model
+        without a feasible solution. With load_solutions=False the termination
+        condition can be checked first, and the solution loaded with load_solution.
+
+        Parameters:
+        load_solutions (bool, optional): Whether to load the solution into the model. Default is True.
+
+        Returns:
+        pyomo.opt.base.SolverResults: The solver results.
+        """
+        if self._appsi:
+            return self.solver.solve(
+                self.model,
+                tee=self.tee,
+                load_solutions=load_solutions,
+                warmstart=True,
+            )
+
+        return self.solver.solve(
+            tee=self.tee,
+            load_solutions=load_solutions,
+            warmstart=self.solver.warm_start_capable(),
+        )
+
+    def load_solution(self) -> None:
+        """
+        Load the variable values of the last solve into the model, after solve(load_solutions=False).
+
+        Returns:
+        None
+        """
+        self.solver.load_vars()
+
+    def get_duals(self, constraints: list = None) -> dict:
+        """
+        Get the duals of the last solve, which requires the model to be an LP.
+
+        Parameters:
+        constraints (list, optional): The constraints to get duals for. Default is None (all constraints).
+
+        Returns:
+        dict: A mapping from constraint to dual value.
+        """
+        if self._appsi:
+            return dict(self.solver.get_duals(constraints))
+
+        if not hasattr(self.model, "dual"):
+            self.model.dual = pyomo.Suffix(direction=pyomo.Suffix.IMPORT)
+        self.solver.load_duals(constraints)
+
+        if constraints is None:
+            constraints = self.model.component_data_objects(
+                pyomo.Constraint, active=True
+            )
+
+        return {constraint: self.model.dual[constraint] for constraint in constraints}
+
+    def _constraints_depending_on(self, param: pyomo.Param) -> list:
+        if self._dependents is None:
+            self._dependents = {}
+            for constraint in self.model.component_data_objects(
+                pyomo.Constraint, active=True
+            ):
+                for expr in [constraint.lower, constraint.body, constraint.upper]:
+                    if expr is None:
+                        continue
+                    for dependency in identify_mutable_parameters(expr):
+                        dependents = self._dependents.setdefault(id(dependency), [])
+                        if constraint not in dependents:
+                            dependents.append(constraint)
+
+        return self._dependents.get(id(param), [])
+
+
+def model_size(model: pyomo.ConcreteModel()) -> dict:
+    """
+    Count the variables, constraints and nonzeros of a model.
+
+    Parameters:
+    model (pyomo.environ.ConcreteModel): The Pyomo ConcreteModel.
+
+    Returns:
+    dict: The number of "variables", active "constraints" and "nonzeros" (the variables in the constraint bodies, without fixed variables).
+    """
+    constraints = 0
+    nonzeros = 0
+    for constraint in model.component_data_objects(pyomo.Constraint, active=True):
+        constraints += 1
+        nonzeros += sum(1 for _ in identify_variables(constraint.body, False))
+
+    return {
+        "variables": sum(1 for _ in model.component_data_objects(pyomo.Var)),
+        "constraints": constraints,
+        "nonzeros": nonzeros,
+    }
+
+
+# Patterns of the node count and the final gap in the logs of the solvers
+_LOG_PATTERNS = {
+    "nodes": [
+        r"Explored (\d+) nodes",  # Gurobi
+        r"^\s*Nodes\s+(\d+)\s*$",  # HiGHS
+        r"Enumerated nodes:\s+(\d+)",  # CBC
+    ],
+    "gap": [
+        r"gap (\S+)%",  # Gurobi
+        r"^\s*Gap\s+(\S+)%",  # HiGHS
+        r"^Gap:\s+(\S+)",  # CBC, as a fraction
+    ],
+}
+
+
+def parse_solver_log(log: str) -> dict:
+    """
+    Read the node count and the final MIP gap from a Gurobi, HiGHS or CBC log.
+
+    Parameters:
+    log (str): The solver log.
+
+    Returns:
+    dict: The number of branch and bound "nodes" and the relative "gap" (e.g. 0.01 for 1 %), each None if it is not in the log.
+    """
+    parsed = {"nodes": None, "gap": None}
+    for name, patterns in _LOG_PATTERNS.items():
+        for pattern in patterns:
+            matches = re.findall(pattern, log, flags=re.MULTILINE)
+            if matches:
+                value = float(matches[-1])
+                if name == "nodes":
+                    parsed[name] = int(value)
+                else:
+                    parsed[name] = value if pattern.startswith("^Gap:") else value / 100
+                break
+
+    return parsed
+
+
+class SolveRecorder:
+    """
+    Record where the time goes when a model is built, written, solved and loaded.
+
+    For each phase the wall time, the CPU time (of this process and of the
+    solver subprocesses) and the peak memory so far are recorded. A record
+    collects the phases of one model together with its size and the node
+    count and gap parsed from the solver log, and is appended to a
+    JSON-lines file, see file_utils.read_json_lines.
+
+    Example:
+        recorder = SolveRecorder("solves.jsonl", instance="n_50")
+        model = recorder.build(build_model, data)
+        recorder.solve(model, solver="appsi_highs", timelimit=60)
+        recorder.finish(model="7_4_2_CVRP_MTZ")
+    """
+
+    def __init__(self, path: str = None, **tags):
+        """
+        Start a record.
+
+        Parameters:
+        path (str, optional): The JSON-lines file the records are appended to. Default is None (records are only returned).
+        **tags: Fields added to every record, e.g. the instance name.
+        """
+        self.path = path
+        self.tags = tags
+        self.record = {"phases": {}}
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Time the code in a with block as a phase, e.g. with recorder.phase("build"): ...
+
+        A phase entered more than once is accumulated.
+
+        Parameters:
+        name (str): The name of the phase.
+        """
+        start = _resources()
+        try:
+            yield
+        finally:
+            end = _resources()
+            phase = self.record["phases"].setdefault(
+                name, {"wall": 0.0, "cpu": 0.0, "solver_cpu": 0.0}
+            )
+            phase["wall"] += end["wall"] - start["wall"]
+            phase["cpu"] += end["cpu"] - start["cpu"]
+            phase["solver_cpu"] += end["solver_cpu"] - start["solver_cpu"]
+            phase["peak_rss_mb"] = end["peak_rss_mb"]
+            phase["solver_peak_rss_mb"] = end["solver_peak_rss_mb"]
+
+    def build(self, build_model: Callable, *args, **kwargs) -> pyomo.ConcreteModel():
+        """
+        Build a model in the "build" phase and record its size.
+
+        Parameters:
+        build_model (Callable): The function building the model, e.g. the build_model function of a script.
+        *args, **kwargs: The arguments of build_model.
+
+        Returns:
+        pyomo.environ.ConcreteModel: The model.
+        """
+        with self.phase("build"):
+            model = build_model(*args, **kwargs)
+        self.record.update(model_size(model))
+
+        return model
+
+    def solve(
+        self,
+        model: pyomo.ConcreteModel(),
+        solver: str = "gurobi",
+        timelimit: float = None,
+        MIPgap: float = None,
+        tee: bool = False,
+    ):
+        """
+        Solve a model, recording the "write", "solve" and "load" phases separately.
+
+        The write phase is the Pyomo writer (the model file of a shell solver,
+        or loading the model in an appsi solver), the solve phase is the
+        solver itself, and the load phase reads the results and loads the
+        solution into the model. The log is parsed for the node count and gap.
+
+        Parameters:
+        model (pyomo.environ.ConcreteModel): The Pyomo ConcreteModel to solve.
+        solver (str, optional): The name of the solver to use. Default is "gurobi".
+        timelimit (float, optional): The time limit for the solver to run, in seconds. Default is None.
+        MIPgap (float, optional): The MIP gap tolerance for the solver. Default is None.
+        tee (bool, optional): Whether to print the solver log. Default is False.
+
+        Returns:
+        pyomo.opt.base.SolverResults: The solver results.
+        """
+        name = solver
+        solver = pyomo.SolverFactory(name)
+        set_solver_options(solver, name, timelimit=timelimit, MIPgap=MIPgap)
+
+        # Time the steps of the solve through the solver's own methods
+        patched = []
+        if isinstance(solver, AppsiPersistentSolver):
+            with self.phase("write"):
+                solver.set_instance(model)
+            # The model was just loaded, so the solve does not look for changes
+            for option in _APPSI_UPDATES:
+                setattr(solver.update_config, option, False)
+        elif hasattr(solver, "_presolve"):
+            for method, phase in [
+                ("_presolve", "write"),
+                ("_apply_solver", "solve"),
+                ("_postsolve", "load"),
+            ]:
+                patched.append(method)
+                setattr(solver, method, self._timed(getattr(solver, method), phase))
+
+        try:
+            with capture_output() as output:
+                with self.phase("solve") if not patched else nullcontext():
+                    results = solver.solve(model, tee=True, load_solutions=False)
+        finally:
+            for method in patched:
+                delattr(solver, method)
+
+        with self.phase("load"):
+            if len(results.solution) > 0:
+                model.solutions.load_from(results)
+
+        log = output.getvalue()
+        if tee:
+            print(log, end="")
+
+        termination = results.solver.termination_condition
+        self.record.update(
+            solver=name,
+            termination=str(termination),
+            objective=_objective_value(model),
+            **parse_solver_log(log),
+        )
+
+        return results
+
+    def finish(self, **fields) -> dict:
+        """
+        Complete the record, append it to the JSON-lines file and start a new record.
+
+        Parameters:
+        **fields: Fields added to this record, e.g. the model name.
+
+        Returns:
+        dict: The record, with the tags, the fields, the "phases" and the "total" wall time of the phases.
+        """
+        record = {**self.tags, **fields, **self.record}
+        record["total"] = sum(phase["wall"] for phase in record["phases"].values())
+        if self.path is not None:
+            append_json_line(record, self.path)
+        self.record = {"phases": {}}
+
+        return record
+
+    def _timed(self, method: Callable, phase: str) -> Callable:
+        def timed(*args, **kwargs):
+            with self.phase(phase):
+                return method(*args, **kwargs)
+
+        return timed
+
+
+# The checks for model changes that an appsi solver makes before each solve
+_APPSI_UPDATES = [
+    "check_for_new_or_removed_constraints",
+    "check_for_new_or_removed_vars",
+    "check_for_new_or_removed_params",
+    "check_for_new_objective",
+    "update_constraints",
+    "update_vars",
+    "update_params",
+    "update_named_expressions",
+    "update_objective",
+]
+
+
+def _resources() -> dict:
+    times = os.times()
+    usage = {
+        "wall": time.perf_counter(),
+        "cpu": times.user + times.system,
+        "solver_cpu": times.children_user + times.children_system,
+        "peak_rss_mb": None,
+        "solver_peak_rss_mb": None,
+    }
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux
+        usage["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        usage["solver_peak_rss_mb"] = (
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        )
+
+    return usage
+
+
+def _objective_value(model):
+    objective = next(model.component_data_objects(pyomo.Objective, active=True), None)
+    if objective is None:
+        return None
+    return pyomo.value(objective, exception=False)
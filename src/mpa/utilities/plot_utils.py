@@ -0,0 +1,232 @@
+import os
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List
+
+# matplotlib is only imported when a figure is drawn, so scripts that are run
+# without plotting (e.g. in sweeps and benchmarks) do not pay for the import
+
+
+def is_headless() -> bool:
+    """
+    Check whether figures can not be shown on a display.
+
+    Returns:
+    bool: True if MPA_HEADLESS is set, or if no display is available on Linux.
+    """
+    if os.environ.get("MPA_HEADLESS"):
+        return True
+
+    return sys.platform.startswith("linux") and not (
+        os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")
+    )
+
+
+def get_pyplot():
+    """
+    Import matplotlib.pyplot, with the non-interactive Agg backend when running headless.
+
+    An explicitly chosen backend (the MPLBACKEND environment variable) is kept.
+
+    Returns:
+    module: The matplotlib.pyplot module.
+    """
+    import matplotlib
+
+    if is_headless() and not os.environ.get("MPLBACKEND"):
+        matplotlib.use("Agg")
+
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def draw_figure(plot_function: Callable, *args, path: str = None, **kwargs) -> None:
+    """
+    Draw a figure with plot_function(fig, *args, **kwargs) and write it to path.
+
+    The figure is created without pyplot, so it can be drawn in any thread.
+    The file format follows the extension of path, e.g. .png, .svg or .eps.
+
+    Parameters:
+    plot_function (Callable): A function drawing on a matplotlib Figure given as its first argument.
+    *args: Positional arguments for plot_function.
+    path (str): The path of the file to write.
+    **kwargs: Keyword arguments for plot_function.
+
+    Returns:
+    None
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    plot_function(fig, *args, **kwargs)
+    fig.savefig(path, bbox_inches="tight")
+
+
+def render(
+    plot_function: Callable,
+    *args,
+    path: str = None,
+    writer: "FigureWriter" = None,
+    **kwargs,
+):
+    """
+    Draw a figure with plot_function(fig, *args, **kwargs), and show it or write it to a file.
+
+    Without a path the figure is shown with pyplot, which is skipped when
+    running headless. With a path the figure is written to the file, in the
+    background if a FigureWriter is given.
+
+    Parameters:
+    plot_function (Callable): A function drawing on a matplotlib Figure given as its first argument.
+    *args: Positional arguments for plot_function.
+    path (str, optional): The path of the file to write. Defaults to None (show the figure).
+    writer (FigureWriter, optional): A writer to draw and write the figure in the background. Defaults to None.
+    **kwargs: Keyword arguments for plot_function.
+
+    Returns:
+    concurrent.futures.Future or None: The future of the background write, if a writer is given.
+    """
+    if path is not None:
+        if writer is not None:
+            return writer.submit(plot_function, *args, path=path, **kwargs)
+        draw_figure(plot_function, *args, path=path, **kwargs)
+        return None
+
+    if is_headless():
+        print("Running headless, so the figure is not shown. Give a path to save it")
+        return None
+
+    plt = get_pyplot()
+    fig = plt.figure()
+    plot_function(fig, *args, **kwargs)
+    plt.show()
+    return None
+
+
+class FigureWriter:
+    """
+    Draw and write figures in a background thread or process pool, so solve loops never wait on rendering.
+
+    Example:
+        with FigureWriter() as writer:
+            for numScenarios in scenarios:
+                ...  # solve
+                writer.submit(plot_series, x, y, path=f"obj_{numScenarios}.png")
+        # All figures are written when the with block ends
+
+    With processes, plot_function must be picklable, i.e. defined at module
+    level in an importable module.
+    """
+
+    def __init__(self, max_workers: int = 1, processes: bool = False):
+        """
+        Start the background workers.
+
+        Parameters:
+        max_workers (int, optional): The number of threads or processes drawing figures. Defaults to 1.
+        processes (bool, optional): Whether to draw in processes instead of threads. Defaults to False.
+        """
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self._executor = executor(max_workers=max_workers)
+        self._futures = []
+
+    def submit(self, plot_function: Callable, *args, path: str, **kwargs) -> Future:
+        """
+        Draw a figure with plot_function(fig, *args, **kwargs) and write it to path in the background.
+
+        The arguments should not be changed afterwards, as they are used when
+        the figure is drawn.
+
+        Parameters:
+        plot_function (Callable): A function drawing on a matplotlib Figure given as its first argument.
+        *args: Positional arguments for plot_function.
+        path (str): The path of the file to write.
+        **kwargs: Keyword arguments for plot_function.
+
+        Returns:
+        concurrent.futures.Future: The future of the write.
+        """
+        future = self._executor.submit(
+            draw_figure, plot_function, *args, path=path, **kwargs
+        )
+        self._futures.append(future)
+        return future
+
+    def close(self) -> List[str]:
+        """
+        Wait until all figures are written and stop the workers.
+
+        Returns:
+        List[str]: The errors of the figures that could not be written.
+        """
+        self._executor.shutdown(wait=True)
+        errors = [
+            f"{type(future.exception()).__name__}: {future.exception()}"
+            for future in self._futures
+            if future.exception() is not None
+        ]
+        for error in errors:
+            print("Could not write figure:", error)
+        return errors
+
+    def __enter__(self) -> "FigureWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def plot_series(
+    fig,
+    x: list,
+    y: list,
+    xlabel: str = None,
+    ylabel: str = None,
+    style: str = "o-r",
+    ylim: tuple = None,
+) -> None:
+    """
+    Plot a single series, e.g. objective values against the number of scenarios.
+
+    Parameters:
+    fig (matplotlib.figure.Figure): The figure to draw on.
+    x (list): The x values.
+    y (list): The y values.
+    xlabel (str, optional): The label of the x-axis. Defaults to None.
+    ylabel (str, optional): The label of the y-axis. Defaults to None.
+    style (str, optional): The matplotlib format string. Defaults to "o-r".
+    ylim (tuple, optional): The limits of the y-axis. Defaults to None.
+
+    Returns:
+    None
+    """
+    ax = fig.add_subplot()
+    ax.plot(x, y, style)
+    if xlabel is not None:
+        ax.set_xlabel(xlabel)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel)
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+
+
+def plot_routes(fig, routes: List[list], x_coord: list, y_coord: list) -> None:
+    """
+    Plot routes in the plane, one line per route, with the nodes labelled.
+
+    Parameters:
+    fig (matplotlib.figure.Figure): The figure to draw on.
+    routes (List[list]): The routes as lists of nodes, see route_utils.extract_routes.
+    x_coord (list): The x coordinate of each node.
+    y_coord (list): The y coordinate of each node.
+
+    Returns:
+    None
+    """
+    ax = fig.add_subplot()
+    for route in routes:
+        ax.plot([x_coord[i] for i in route], [y_coord[i] for i in route], "-o")
+        for i in route[:-1]:
+            ax.annotate(i, (x_coord[i], y_coord[i]))
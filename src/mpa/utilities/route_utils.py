@@ -0,0 +1,361 @@
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pyomo.environ as pyomo
+
+
+def arc_values(x: pyomo.Var, threshold: float = 0.5) -> np.ndarray:
+    """
+    Read the values of the arc variables x[i, j] once and return the used arcs.
+
+    Parameters:
+    x (pyomo.Var): The arc variables, indexed by pairs of integer nodes. Arcs may be missing from the index set.
+    threshold (float, optional): The value above which an arc counts as used. Defaults to 0.5.
+
+    Returns:
+    np.ndarray: An array of shape (k, 2) with the tail and head of each used arc.
+    """
+    arcs = np.array([index for index, var in x.items() if (var.value or 0) > threshold])
+
+    return arcs.reshape(-1, 2).astype(np.int64)
+
+
+def extract_routes(
+    x: pyomo.Var,
+    depot: int = 0,
+    q: list = None,
+    dist: list = None,
+    threshold: float = 0.5,
+) -> dict:
+    """
+    Extract the routes from a solution of a routing model with arc variables x[i, j].
+
+    The values are read once, and the routes are followed through a successor
+    map, so the work is linear in the number of variables. Cycles that do not
+    visit the depot are returned as subtours instead of looping forever.
+
+    Parameters:
+    x (pyomo.Var): The arc variables, indexed by pairs of integer nodes.
+    depot (int, optional): The depot node. Defaults to 0.
+    q (list, optional): The demand of each node, used to compute the route loads. Defaults to None.
+    dist (list, optional): The distance matrix, used to compute the route lengths. Defaults to None.
+    threshold (float, optional): The value above which an arc counts as used. Defaults to 0.5.
+
+    Returns:
+    dict: "routes" with one list of nodes per route, starting and ending at the depot and ordered by the first customer, "loads" and "lengths" of the routes (None if q or dist is not given), and "subtours" with one list of nodes per cycle not visiting the depot.
+    """
+    arcs = arc_values(x, threshold)
+    numNodes = int(arcs.max()) + 1 if len(arcs) else depot + 1
+    numNodes = max(numNodes, depot + 1)
+
+    # Every node but the depot has at most one successor
+    successor = np.full(numNodes, -1, dtype=np.int64)
+    fromDepot = arcs[:, 0] == depot
+    successor[arcs[~fromDepot, 0]] = arcs[~fromDepot, 1]
+    starts = np.sort(arcs[fromDepot, 1])
+
+    visited = np.zeros(numNodes, dtype=bool)
+    visited[depot] = True
+
+    routes = []
+    for start in starts.tolist():
+        route = [depot]
+        node = start
+        while node != -1 and not visited[node]:
+            visited[node] = True
+            route.append(node)
+            node = int(successor[node])
+        route.append(depot)
+        routes.append(route)
+
+    # The remaining nodes with a successor are on cycles without the depot
+    subtours = []
+    for start in np.flatnonzero((successor != -1) & ~visited).tolist():
+        if visited[start]:
+            continue
+        subtour = []
+        node = start
+        while node != -1 and not visited[node]:
+            visited[node] = True
+            subtour.append(node)
+            node = int(successor[node])
+        subtours.append(subtour)
+
+    return {
+        "routes": routes,
+        "loads": route_loads(routes, q) if q is not None else None,
+        "lengths": route_lengths(routes, dist) if dist is not None else None,
+        "subtours": subtours,
+    }
+
+
+def route_loads(routes: List[list], q: list) -> list:
+    """
+    Compute the total demand of the nodes on each route.
+
+    Parameters:
+    routes (List[list]): The routes, as returned by extract_routes.
+    q (list): The demand of each node.
+
+    Returns:
+    list: The load of each route.
+    """
+    q = np.asarray(q)
+
+    return [q[route[1:-1]].sum().item() for route in routes]
+
+
+def route_lengths(routes: List[list], dist: list) -> list:
+    """
+    Compute the length of each route.
+
+    Parameters:
+    routes (List[list]): The routes, as returned by extract_routes.
+    dist (list): The distance matrix.
+
+    Returns:
+    list: The length of each route.
+    """
+    dist = np.asarray(dist)
+
+    return [dist[route[:-1], route[1:]].sum().item() for route in routes]
+
+
+def complete_arcs(num_nodes: int) -> List[Tuple[int, int]]:
+    """
+    Get all arcs (i, j) with i != j of the complete directed graph.
+
+    Parameters:
+    num_nodes (int): The number of nodes, including the depot.
+
+    Returns:
+    List[Tuple[int, int]]: The arcs, sorted by tail and head.
+    """
+    return [(i, j) for i in range(num_nodes) for j in range(num_nodes) if i != j]
+
+
+def knn_arcs(
+    dist: np.ndarray = None,
+    k: int = 10,
+    depot: int = 0,
+    coords: np.ndarray = None,
+    symmetric: bool = True,
+) -> List[Tuple[int, int]]:
+    """
+    Get a sparse arc set with the arcs to the k nearest neighbours of each node and all depot arcs.
+
+    The neighbours are found with np.argpartition on the rows of dist, or with
+    a KD-tree from scipy if coords are given instead of dist.
+
+    Parameters:
+    dist (np.ndarray, optional): The distance matrix. Either dist or coords must be given.
+    k (int, optional): The number of neighbours of each node. Defaults to 10.
+    depot (int, optional): The depot node, which is connected to all nodes. Defaults to 0.
+    coords (np.ndarray, optional): An array of shape (n, d) with the coordinates of the nodes, used with a KD-tree if scipy is installed. Defaults to None.
+    symmetric (bool, optional): Whether to add the reverse of every arc, so (j, i) is an arc whenever (i, j) is. Defaults to True.
+
+    Returns:
+    List[Tuple[int, int]]: The arcs, sorted by tail and head.
+    """
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+
+    if coords is not None:
+        coords = np.asarray(coords, dtype=np.float64)
+        num_nodes = len(coords)
+        neighbours = _kdtree_neighbours(coords, min(k, num_nodes - 1))
+    elif dist is not None:
+        dist = np.array(dist, dtype=np.float64)
+        num_nodes = len(dist)
+        k = min(k, num_nodes - 1)
+        np.fill_diagonal(dist, np.inf)
+        neighbours = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    else:
+        raise ValueError("Either dist or coords must be given")
+
+    used = np.zeros((num_nodes, num_nodes), dtype=bool)
+    rows = np.repeat(np.arange(num_nodes), neighbours.shape[1])
+    used[rows, neighbours.ravel()] = True
+    used[depot, :] = used[:, depot] = True
+    if symmetric:
+        used |= used.T
+    np.fill_diagonal(used, False)
+
+    tails, heads = np.nonzero(used)
+
+    return list(zip(tails.tolist(), heads.tolist()))
+
+
+def make_arcs(
+    dist: np.ndarray, k: int = None, arcs: List[Tuple[int, int]] = None
+) -> List[Tuple[int, int]]:
+    """
+    Choose the arc set of a routing model, see the build_model functions of the routing scripts.
+
+    Parameters:
+    dist (np.ndarray): The distance matrix.
+    k (int, optional): The number of nearest neighbours to keep per node, see knn_arcs. Defaults to None (the complete graph).
+    arcs (List[Tuple[int, int]], optional): An explicit arc set, which takes precedence over k. Defaults to None.
+
+    Returns:
+    List[Tuple[int, int]]: The arcs.
+    """
+    if arcs is not None:
+        return sorted(arcs)
+    if k is None:
+        return complete_arcs(len(dist))
+    return knn_arcs(dist, k)
+
+
+def adjacency(arcs: List[Tuple[int, int]], num_nodes: int) -> Tuple[list, list]:
+    """
+    Get the successors and predecessors of each node in an arc set.
+
+    Parameters:
+    arcs (List[Tuple[int, int]]): The arcs.
+    num_nodes (int): The number of nodes.
+
+    Returns:
+    Tuple[list, list]: For each node, the list of heads of its outgoing arcs and the list of tails of its incoming arcs.
+    """
+    out_nodes = [[] for _ in range(num_nodes)]
+    in_nodes = [[] for _ in range(num_nodes)]
+    for i, j in arcs:
+        out_nodes[i].append(j)
+        in_nodes[j].append(i)
+
+    return out_nodes, in_nodes
+
+
+def price_arcs(
+    model: pyomo.ConcreteModel,
+    duals: dict,
+    dist: np.ndarray,
+    tolerance: float = 1e-6,
+) -> List[Tuple[int, int]]:
+    """
+    Find the arcs missing from a sparse routing model whose LP reduced cost is negative.
+
+    The rows shared by all outgoing (incoming) arcs of a node are taken as its
+    degree rows, and the reduced cost of a missing arc (i, j) is computed from
+    the duals of the degree rows of i and j. This is exact when the missing
+    arcs only enter degree rows of the existing model (the rows of a new arc,
+    like its MTZ or flow bound rows, have dual 0), and a pricing heuristic for
+    formulations where other variables of the arc are priced as well.
+
+    Parameters:
+    model (pyomo.ConcreteModel): A solved LP relaxation of a routing model with arc variables model.x, an objective summing dist[i][j] * x[i, j] (or minus that, when maximizing), and nodes 0, 1, ..., n.
+    duals (dict): The dual value of each constraint, e.g. from SolverSession.get_duals.
+    dist (np.ndarray): The distance matrix.
+    tolerance (float, optional): The reduced cost below which an arc is returned. Defaults to 1e-6.
+
+    Returns:
+    List[Tuple[int, int]]: The missing arcs with negative reduced cost, the most negative first.
+    """
+    from pyomo.repn import generate_standard_repn
+
+    dist = np.asarray(dist, dtype=np.float64)
+    num_nodes = len(dist)
+    arc_of = {id(var): index for index, var in model.x.items()}
+
+    # The rows (and coefficients) of each arc
+    rows = {index: set() for index in model.x}
+    for constraint in model.component_data_objects(pyomo.Constraint, active=True):
+        repn = generate_standard_repn(constraint.body, compute_values=True)
+        for var, coef in zip(repn.linear_vars, repn.linear_coefs):
+            if id(var) in arc_of:
+                rows[arc_of[id(var)]].add((constraint, coef))
+
+    # The rows shared by all outgoing and by all incoming arcs of each node
+    out_rows = [None] * num_nodes
+    in_rows = [None] * num_nodes
+    for (i, j), arc_rows in rows.items():
+        out_rows[i] = arc_rows if out_rows[i] is None else out_rows[i] & arc_rows
+        in_rows[j] = arc_rows if in_rows[j] is None else in_rows[j] & arc_rows
+
+    def dual_sum(node_rows) -> np.ndarray:
+        return np.array(
+            [
+                sum(duals.get(row, 0) * coef for row, coef in node or ())
+                for node in node_rows
+            ]
+        )
+
+    # Reduced costs in minimization form, where the duals change sign when maximizing
+    objective = next(model.component_data_objects(pyomo.Objective, active=True))
+    sign = 1 if objective.sense == pyomo.minimize else -1
+    reduced = dist - sign * (dual_sum(out_rows)[:, None] + dual_sum(in_rows)[None, :])
+
+    existing = np.zeros((num_nodes, num_nodes), dtype=bool)
+    for i, j in model.x:
+        existing[i, j] = True
+    np.fill_diagonal(existing, True)
+    reduced[existing] = np.inf
+
+    tails, heads = np.nonzero(reduced < -tolerance)
+    order = np.argsort(reduced[tails, heads], kind="stable")
+
+    return list(zip(tails[order].tolist(), heads[order].tolist()))
+
+
+def repair_arcs(
+    build_model: Callable[..., pyomo.ConcreteModel],
+    data: dict,
+    arcs: List[Tuple[int, int]],
+    solver: str = "appsi_highs",
+    max_rounds: int = 20,
+    max_add: int = None,
+) -> List[Tuple[int, int]]:
+    """
+    Add pruned arcs back to a sparse arc set until no arc has a negative LP reduced cost.
+
+    In each round the LP relaxation of build_model(data, arcs=arcs) is solved,
+    the missing arcs are priced with price_arcs, and the improving arcs (and
+    their reverse arcs) are added.
+
+    Parameters:
+    build_model (Callable): The build_model function of a routing script, taking data and an arcs keyword.
+    data (dict): The data of the instance, with the distance matrix in "dist".
+    arcs (List[Tuple[int, int]]): The initial arc set, e.g. from knn_arcs.
+    solver (str, optional): The name of a persistent LP solver giving duals, see SolverSession. Defaults to "appsi_highs".
+    max_rounds (int, optional): The maximum number of pricing rounds. Defaults to 20.
+    max_add (int, optional): The maximum number of arcs added per round. Defaults to None (all improving arcs).
+
+    Returns:
+    List[Tuple[int, int]]: The repaired arc set.
+    """
+    from mpa.utilities.model_utils import SolverSession
+
+    arcs = set(arcs)
+    for iteration in range(1, max_rounds + 1):
+        model = build_model(data, arcs=sorted(arcs))
+        pyomo.TransformationFactory("core.relax_integer_vars").apply_to(model)
+        session = SolverSession(model, solver=solver)
+        session.solve()
+
+        improving = price_arcs(model, session.get_duals(), data["dist"])[:max_add]
+        print(
+            f"Arc repair round {iteration}: LP bound {pyomo.value(model.obj):.4f}, "
+            f"{len(arcs)} arcs, {len(improving)} arcs with negative reduced cost"
+        )
+        if not improving:
+            break
+
+        for i, j in improving:
+            arcs.update([(i, j), (j, i)])
+
+    return sorted(arcs)
+
+
+def _kdtree_neighbours(coords: np.ndarray, k: int) -> np.ndarray:
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:  # Fall back to the dense search without scipy
+        diff = coords[:, None, :] - coords[None, :, :]
+        dist = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        np.fill_diagonal(dist, np.inf)
+        return np.argpartition(dist, k - 1, axis=1)[:, :k]
+
+    # The nearest point of each query is the point itself
+    _, neighbours = cKDTree(coords).query(coords, k=k + 1)
+    return neighbours[:, 1:]
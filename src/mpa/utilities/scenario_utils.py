@@ -0,0 +1,153 @@
+from typing import List
+
+import numpy as np
+
+DISTRIBUTIONS = ["normal", "lognormal", "empirical"]
+
+
+class ScenarioGenerator:
+    """
+    Draw demand scenarios as rows of an (S x customers) matrix from a seeded np.random.Generator.
+
+    The random numbers are drawn in one call per request and consumed row by
+    row, so scenario k is identical no matter how many scenarios are drawn,
+    and growing a scenario set only draws the new scenarios.
+
+    Example:
+        generator = ScenarioGenerator(data["demand_exp"], data["demand_std"], seed=1)
+        first = generator.draw(10)
+        more = generator.draw(50)  # more[:10] equals first, only 40 new rows are drawn
+    """
+
+    def __init__(
+        self,
+        mean: list,
+        std: list = None,
+        seed: int = 1,
+        distribution: str = "normal",
+        samples: np.ndarray = None,
+    ):
+        """
+        Set up the generator.
+
+        Parameters:
+        mean (list): The expected demand of each customer.
+        std (list, optional): The standard deviation of the demand of each customer. Required for "normal" and "lognormal".
+        seed (int or np.random.SeedSequence, optional): The seed of the random stream. Defaults to 1.
+        distribution (str, optional): "normal" (truncated at zero), "lognormal" (with the given mean and std) or "empirical" (resampled rows of samples). Defaults to "normal".
+        samples (np.ndarray, optional): Observed demands, one row per observation. Required for "empirical".
+        """
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(
+                f"distribution must be one of {DISTRIBUTIONS}, got {distribution!r}"
+            )
+        if distribution == "empirical" and samples is None:
+            raise ValueError("The empirical distribution requires samples")
+        if distribution != "empirical" and std is None:
+            raise ValueError(f"The {distribution} distribution requires std")
+
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = None if std is None else np.asarray(std, dtype=np.float64)
+        self.distribution = distribution
+        self.samples = None if samples is None else np.asarray(samples, np.float64)
+
+        self._seed_sequence = (
+            seed
+            if isinstance(seed, np.random.SeedSequence)
+            else np.random.SeedSequence(seed)
+        )
+        self._rng = np.random.default_rng(self._seed_sequence)
+        self._scenarios = np.empty((0, len(self.mean)))
+
+    def draw(self, num_scenarios: int) -> np.ndarray:
+        """
+        Get the first num_scenarios scenarios, drawing only those not drawn before.
+
+        Parameters:
+        num_scenarios (int): The number of scenarios.
+
+        Returns:
+        np.ndarray: A read-only (num_scenarios x customers) array of non-negative demands.
+        """
+        missing = num_scenarios - len(self._scenarios)
+        if missing > 0:
+            new = self._draw_new(missing)
+            self._scenarios = np.concatenate([self._scenarios, new])
+            self._scenarios.flags.writeable = False
+
+        return self._scenarios[:num_scenarios]
+
+    def spawn(self, n: int) -> List["ScenarioGenerator"]:
+        """
+        Create independent generators with the same distribution, e.g. one per worker or replication.
+
+        Parameters:
+        n (int): The number of generators.
+
+        Returns:
+        List[ScenarioGenerator]: Generators with statistically independent streams.
+        """
+        return [
+            ScenarioGenerator(
+                self.mean, self.std, child, self.distribution, self.samples
+            )
+            for child in self._seed_sequence.spawn(n)
+        ]
+
+    def _draw_new(self, num_scenarios: int) -> np.ndarray:
+        shape = (num_scenarios, len(self.mean))
+
+        if self.distribution == "normal":
+            scenarios = self.mean + self.std * self._rng.standard_normal(shape)
+            # Truncate at zero, as demands can not be negative
+            np.maximum(scenarios, 0, out=scenarios)
+
+        elif self.distribution == "lognormal":
+            # Choose the parameters of the underlying normal distribution, so the
+            # lognormal demands get the given mean and standard deviation. Customers
+            # without a positive mean get no demand
+            positive = self.mean > 0
+            mean = self.mean[positive]
+            std = np.broadcast_to(self.std, self.mean.shape)[positive]
+            sigma = np.sqrt(np.log1p((std / mean) ** 2))
+            mu = np.log(mean) - sigma**2 / 2
+            normals = self._rng.standard_normal(shape)
+            scenarios = np.zeros(shape)
+            scenarios[:, positive] = np.exp(mu + sigma * normals[:, positive])
+
+        else:
+            # Resample whole observations to keep the correlation between customers.
+            # Uniforms are used instead of integers, as they are consumed one per row
+            rows = self._rng.random(num_scenarios) * len(self.samples)
+            scenarios = self.samples[rows.astype(np.int64)]
+
+        return scenarios
+
+
+def generate_scenarios(
+    data: dict,
+    numScenarios: int,
+    seed: int = 1,
+    distribution: str = "normal",
+    samples: np.ndarray = None,
+) -> list:
+    """
+    Generate demand scenarios for the 9_1_data.json-style facility location models.
+
+    The expected demands are the first scenario, followed by numScenarios random scenarios.
+
+    Parameters:
+    data (dict): The data with "demand_exp" and "demand_std".
+    numScenarios (int): The number of random scenarios.
+    seed (int, optional): The seed of the random stream. Defaults to 1.
+    distribution (str, optional): "normal", "lognormal" or "empirical", see ScenarioGenerator. Defaults to "normal".
+    samples (np.ndarray, optional): Observed demands for the empirical distribution. Defaults to None.
+
+    Returns:
+    list: A list of numScenarios + 1 lists of demands, one per customer.
+    """
+    generator = ScenarioGenerator(
+        data["demand_exp"], data.get("demand_std"), seed, distribution, samples
+    )
+
+    return [list(data["demand_exp"])] + generator.draw(numScenarios).tolist()
@@ -1,4 +1,5 @@
-from typing import List
+import itertools
+from typing import Iterable, Iterator, List, Sequence, Tuple
 
 import numpy as np
 
@@ -16,23 +17,97 @@ def extract_key_names(dictionary: dict) -> list:
     return list(dictionary.keys())
 
 
+def lp_norm_distance_matrix(
+    points: np.ndarray,
+    p: float,
+    r: int = None,
+    dtype: type = np.float64,
+    symmetric: bool = False,
+    block_size: int = None,
+) -> np.ndarray:
+    """
+    Compute the Lp-norm distance matrix for a set of points using blocked broadcasting.
+
+    Parameters:
+    points (np.ndarray): An array of shape (n, d) with one row per data point.
+    p (float): The norm to use. 1 is Manhattan, 2 is Euclidian, np.inf is Chebyshev and any other p >= 1 is the general Lp-norm.
+    r (int, optional): Number of decimal places to round to. Defaults to None (no rounding).
+    dtype (type, optional): The floating point type of the returned matrix, np.float32 or np.float64. Defaults to np.float64.
+    symmetric (bool, optional): If True, only the upper triangle is computed and mirrored into the lower triangle. Defaults to False.
+    block_size (int, optional): Number of rows computed per block. Defaults to None, which keeps each block at roughly 32 MB.
+
+    Returns:
+    np.ndarray: A C-contiguous (n, n) array where entry [i, j] is the Lp-norm distance between point i and point j.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.dtype(np.float32), np.dtype(np.float64)):
+        raise ValueError(f"dtype must be float32 or float64, got {dtype}")
+
+    p = float(p)
+    if p < 1:
+        raise ValueError(f"p must be at least 1, got {p}")
+
+    points = np.asarray(points, dtype=dtype)
+    if points.ndim == 1:
+        points = points[:, np.newaxis]
+    nrPoints, nrDims = points.shape
+
+    if block_size is None:
+        rowBytes = nrPoints * nrDims * dtype.itemsize
+        block_size = max(1, (32 * 2**20) // max(1, rowBytes))
+
+    dist = np.empty((nrPoints, nrPoints), dtype=dtype)
+
+    for start in range(0, nrPoints, block_size):
+        stop = min(start + block_size, nrPoints)
+        # In symmetric mode only the columns on and right of the diagonal are needed
+        first_col = start if symmetric else 0
+        diff = np.abs(
+            points[start:stop, np.newaxis, :] - points[np.newaxis, first_col:, :]
+        )
+
+        if p == 1:
+            block = diff.sum(axis=2)
+        elif p == 2:
+            block = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+        elif np.isinf(p):
+            block = diff.max(axis=2, initial=0)
+        else:
+            block = (diff**p).sum(axis=2) ** (1 / p)
+
+        dist[start:stop, first_col:] = block
+
+        if symmetric:
+            # Mirror the already computed upper triangle of the previous blocks
+            dist[start:stop, :start] = dist[:start, start:stop].T
+
+    if r is not None:
+        np.round(dist, r, out=dist)
+
+    return dist
+
+
 def make_lp_morm_distance_matrix(
     data: dict,
     keys: List[str],
-    p: int,
+    p: float,
     r: int = None,
-) -> list:
+    dtype: type = np.float64,
+    symmetric: bool = True,
+) -> np.ndarray:
     """
     Compute the Lp-norm distance matrix for the given data.
 
     Parameters:
     data (dict): A dictionary with keys corresponding to the data points and values corresponding to the data itself.
     keys (List[str]): A list of keys corresponding to the data points to be included in the distance matrix.
-    p (int): If 1, then Manhattan (Taxi cap) distance. If 2, then Euclidian distance.
+    p (float): If 1, then Manhattan (Taxi cap) distance. If 2, then Euclidian distance. np.inf and general p are also supported.
     r (int): number of decimal places
+    dtype (type, optional): np.float32 or np.float64. Defaults to np.float64.
+    symmetric (bool, optional): Only compute the upper triangle. Defaults to True, as Lp-norms are symmetric.
 
     Returns:
-    list: A list representing the distance matrix where the i-th row and j-th column represent the Lp-norm distance between the i-th and j-th data points.
+    np.ndarray: A matrix where the i-th row and j-th column represent the Lp-norm distance between the i-th and j-th data points.
     """
 
     if p == 1:
@@ -42,66 +117,128 @@ def make_lp_morm_distance_matrix(
         print("Creating Euclidian distance matrix")
 
     points = np.column_stack([data[key] for key in keys])
-    nrPoints = len(data[keys[0]])
-    dist = []
-
-    for i in range(0, nrPoints):
-        dist.append([])
-        for j in range(0, nrPoints):
-            value = np.linalg.norm(points[i] - points[j], p)
-
-            if r:
-                value = round(value, r)
 
-            dist[i].append(value)
-
-    return dist
+    return lp_norm_distance_matrix(points, p, r=r, dtype=dtype, symmetric=symmetric)
 
 
 # From lecturer #######################################################################
-def makeLpNormDistanceMatrix(data: dict, p: int) -> list:
+def makeLpNormDistanceMatrix(data: dict, p: int) -> np.ndarray:
     points = np.column_stack(
         (data["Murder"], data["Assault"], data["UrbanPop"], data["Rape"])
     )
-    nrPoints = len(data["Murder"])
-    dist = []
-    for i in range(0, nrPoints):
-        dist.append([])
-        for j in range(0, nrPoints):
-            dist[i].append(np.linalg.norm(points[i] - points[j], p))
-    return dist
+    return lp_norm_distance_matrix(points, p, symmetric=True)
+
+
+def find_connected_components(nodes: Iterable, arcs: Iterable[Tuple]) -> List[list]:
+    """
+    Find the connected components of the undirected graph spanned by the given arcs.
+
+    Parameters:
+    nodes (Iterable): The nodes of the graph.
+    arcs (Iterable[Tuple]): The (i, j) pairs connecting the nodes. The direction of the arcs is ignored.
+
+    Returns:
+    List[list]: A list of components, each a sorted list of nodes. The components are sorted by their smallest node.
+    """
+    parent = {node: node for node in nodes}
+
+    def find(node):
+        # Path halving keeps the trees flat
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for i, j in arcs:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[root_j] = root_i
+
+    components = {}
+    for node in parent:
+        components.setdefault(find(node), []).append(node)
+
+    return sorted((sorted(component) for component in components.values()), key=min)
+
+
+def iter_subsets(
+    items: Sequence,
+    min_size: int = 0,
+    max_size: int = None,
+    order: str = "binary",
+    as_bitmask: bool = False,
+) -> Iterator:
+    """
+    Lazily generate the subsets of the given items, optionally bounded in size.
+
+    Bit j of a subset's bitmask corresponds to items[j]. As the subsets are
+    generated one at a time, the consumer can stop early at no extra cost.
+
+    Parameters:
+    items (Sequence): The items to generate subsets of.
+    min_size (int, optional): The minimum number of items in a subset. Defaults to 0.
+    max_size (int, optional): The maximum number of items in a subset. Defaults to None (all items).
+    order (str, optional): "binary" for counting order of the bitmasks, "gray" for Gray-code order, where consecutive subsets differ in a single item, or "size" for increasing cardinality. Defaults to "binary".
+    as_bitmask (bool, optional): If True, yield each subset as an int bitmask instead of a tuple of items. Defaults to False.
+
+    Returns:
+    Iterator: An iterator of tuples of items, or of int bitmasks.
+    """
+    items = tuple(items)
+    n = len(items)
+    min_size = max(min_size, 0)
+    max_size = n if max_size is None else min(max_size, n)
+
+    if order not in ("binary", "gray", "size"):
+        raise ValueError(f"order must be 'binary', 'gray' or 'size', got {order!r}")
+
+    if min_size > max_size:
+        return
+
+    if order == "size":
+        # Only the subsets within the size bounds are ever visited
+        for size in range(min_size, max_size + 1):
+            for combination in itertools.combinations(range(n), size):
+                if as_bitmask:
+                    yield sum(1 << j for j in combination)
+                else:
+                    yield tuple(items[j] for j in combination)
+        return
+
+    for i in range(1 << n):
+        mask = i ^ (i >> 1) if order == "gray" else i
+        if min_size <= mask.bit_count() <= max_size:
+            yield mask if as_bitmask else _decode_bitmask(mask, items)
+
+
+def _decode_bitmask(mask: int, items: tuple) -> tuple:
+    # Only visit the set bits instead of testing every bit
+    subset = []
+    while mask:
+        lowest_bit = mask & -mask
+        subset.append(items[lowest_bit.bit_length() - 1])
+        mask ^= lowest_bit
+    return tuple(subset)
 
 
 def create_subsets(n: int) -> list:
     """
     Create a list of all subsets given a number of customers
 
+    Use iter_subsets to generate the subsets lazily instead.
+
     Parameters:
     n (int): The number of customers. (The storage is not counted as it is considered to be 0)
 
     Returns:
     list: A list of all subsets.
     """
-    s = list(range(1, n + 1))
-    all_subsets = []
-    for i in range(1, 2**n + 1):
-        nextList = [s[j] for j in range(n) if (i & (1 << j))]
-        nextListLength = len(nextList)
-        if 2 <= nextListLength <= n - 1:
-            all_subsets.append(nextList)
-    return all_subsets
+    return [
+        list(subset)
+        for subset in iter_subsets(range(1, n + 1), min_size=2, max_size=n - 1)
+    ]
 
 
 # From lecturer #######################################################################
 def powerset(s: list) -> list:
-    x = len(s)
-    allSubSets = []
-    for i in range(1 << x):
-        nextList = [s[j] for j in range(x) if (i & (1 << j))]
-        nextListLength = len(nextList)
-        if 2 <= nextListLength <= x - 1:
-            allSubSets.append(nextList)
-    return allSubSets
-
-
-print(create_subsets(4))
+    return [list(subset) for subset in iter_subsets(s, 2, len(s) - 1)]
@@ -0,0 +1,171 @@
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List
+
+import pyomo.environ as pyomo
+
+from mpa.utilities.file_utils import append_json_line, read_json_lines
+from mpa.utilities.model_utils import set_solver_options
+
+
+def make_grid(**values: list) -> List[dict]:
+    """
+    Make the full parameter grid (the cartesian product) of the given values.
+
+    Example: make_grid(numScenarios=[1, 6], alpha=[0.8, 0.9]) gives four parameter sets.
+
+    Parameters:
+    **values (list): The values of each parameter.
+
+    Returns:
+    List[dict]: One dictionary of keyword arguments per point in the grid.
+    """
+    names = list(values)
+    return [dict(zip(names, point)) for point in itertools.product(*values.values())]
+
+
+def run_sweep(
+    build_model: Callable[..., pyomo.ConcreteModel],
+    grid: List[dict],
+    solver: str = "gurobi",
+    timelimit: float = None,
+    MIPgap: float = None,
+    max_workers: int = None,
+    threads_per_worker: int = 1,
+    results_path: str = None,
+) -> List[dict]:
+    """
+    Build and solve a model for every point in a parameter grid in parallel worker processes.
+
+    Each point is solved by calling build_model(**params) and solving the
+    model. The number of threads of each solver is capped through the solver
+    options, so the workers do not oversubscribe the cores. If results_path is
+    given, each result is appended to it as soon as it is done, and points that
+    were solved without an error are skipped, so an interrupted sweep can be
+    resumed and failed points are retried.
+
+    Parameters:
+    build_model (Callable): A function returning a Pyomo ConcreteModel. It must be picklable, i.e. defined at module level (functools.partial of such a function also works).
+    grid (List[dict]): The keyword arguments for build_model, one dictionary per point, see make_grid.
+    solver (str, optional): The name of the solver to use. Default is "gurobi".
+    timelimit (float, optional): The time limit for each solve, in seconds. Default is None.
+    MIPgap (float, optional): The MIP gap tolerance for the solver. Default is None.
+    max_workers (int, optional): The number of worker processes. Default is None, which uses all cores divided by threads_per_worker.
+    threads_per_worker (int, optional): The number of threads the solver of each worker may use. Default is 1.
+    results_path (str, optional): A JSON-lines file to write the results to and resume from. Default is None.
+
+    Returns:
+    List[dict]: One row per grid point, in grid order, with the parameters, "objective", "status", "termination_condition", "build_time", "wall_time", "solver_time" and "error".
+    """
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    done = {}
+    if results_path is not None and os.path.exists(results_path):
+        for row in read_json_lines(results_path):
+            # Failed points are solved again
+            if row["error"] is None:
+                done[_grid_key(row["params"])] = row
+
+    todo = [params for params in grid if _grid_key(params) not in done]
+    if done:
+        print(f"Resuming sweep: {len(grid) - len(todo)} of {len(grid)} points done")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _solve_point,
+                build_model,
+                params,
+                solver,
+                timelimit,
+                MIPgap,
+                threads_per_worker,
+            )
+            for params in todo
+        ]
+
+        for future in as_completed(futures):
+            row = future.result()
+            done[_grid_key(row["params"])] = row
+            if results_path is not None:
+                append_json_line(row, results_path)
+            print(
+                f"Solved {row['params']}: objective {row['objective']} "
+                f"in {row['wall_time']:.2f} seconds ({row['termination_condition']})"
+            )
+
+    return [_flatten(done[_grid_key(params)]) for params in grid]
+
+
+def _solve_point(
+    build_model: Callable,
+    params: dict,
+    solver_name: str,
+    timelimit: float,
+    MIPgap: float,
+    threads: int,
+) -> dict:
+    row = {
+        "params": params,
+        "objective": None,
+        "status": None,
+        "termination_condition": None,
+        "build_time": None,
+        "wall_time": None,
+        "solver_time": None,
+        "error": None,
+    }
+
+    try:
+        start = time.perf_counter()
+        model = build_model(**params)
+        row["build_time"] = time.perf_counter() - start
+
+        solver = pyomo.SolverFactory(solver_name)
+        set_solver_options(solver, solver_name, timelimit, MIPgap, threads)
+
+        start = time.perf_counter()
+        results = solver.solve(model, tee=False, load_solutions=False)
+        row["wall_time"] = time.perf_counter() - start
+
+        row["status"] = str(results.solver.status)
+        row["termination_condition"] = str(results.solver.termination_condition)
+        row["solver_time"] = _solver_time(results)
+
+        if len(results.solution) > 0:
+            model.solutions.load_from(results)
+            row["objective"] = pyomo.value(_active_objective(model))
+    except Exception as error:  # Keep the sweep going and record the failure
+        row["status"] = "error"
+        row["error"] = f"{type(error).__name__}: {error}"
+        if row["wall_time"] is None:
+            row["wall_time"] = 0.0
+
+    return row
+
+
+def _solver_time(results) -> float:
+    # Solver plugins report their own run time under different names, if at all
+    for name in ["wallclock_time", "time"]:
+        value = getattr(results.solver, name, None)
+        if isinstance(value, (int, float)):
+            return float(value)
+    return None
+
+
+def _active_objective(model: pyomo.ConcreteModel()):
+    return next(model.component_data_objects(pyomo.Objective, active=True))
+
+
+def _grid_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+def _flatten(row: dict) -> dict:
+    flat = dict(row["params"])
+    flat.update({name: value for name, value in row.items() if name != "params"})
+    return flat
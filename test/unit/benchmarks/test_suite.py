@@ -0,0 +1,76 @@
+import unittest
+
+from mpa.utilities.file_utils import load_script
+
+suite = load_script("benchmarks/suite.py")
+
+
+def make_record(
+    case: str,
+    objective: float = 100,
+    termination: str = "optimal",
+    sense: str = "minimize",
+    build: float = 1,
+    solve: float = 2,
+    gap: float = 0.0,
+) -> dict:
+    return {
+        "case": case,
+        "phases": {"build": {"wall": build}, "solve": {"wall": solve}},
+        "objective": objective,
+        "gap": gap,
+        "termination": termination,
+        "sense": sense,
+    }
+
+
+class TestCompare(unittest.TestCase):
+    def compare(self, record: dict, baseline: dict) -> list:
+        return suite.compare([record], {record["case"]: suite.summarize(baseline)})
+
+    def test_unchanged(self):
+        self.assertEqual(self.compare(make_record("a"), make_record("a")), [])
+
+    def test_optimal_to_time_limit(self):
+        record = make_record("a", termination="maxTimeLimit", gap=0.05)
+
+        regressions = self.compare(record, make_record("a"))
+
+        self.assertIn("a: maxTimeLimit (was optimal)", regressions)
+        self.assertTrue(any("gap" in regression for regression in regressions))
+
+        # A case stopped by the time limit in the baseline is only compared on build time
+        baseline = make_record("a", objective=90, termination="maxTimeLimit")
+        self.assertEqual(self.compare(record, baseline), [])
+
+    def test_worse_objective(self):
+        for sense, worse, better in [("minimize", 101, 99), ("maximize", 99, 101)]:
+            baseline = make_record("a", sense=sense)
+
+            regressions = self.compare(make_record("a", worse, sense=sense), baseline)
+
+            self.assertEqual(len(regressions), 1)
+            self.assertIn("objective", regressions[0])
+            self.assertEqual(
+                self.compare(make_record("a", better, sense=sense), baseline), []
+            )
+
+        # Within the tolerance
+        self.assertEqual(self.compare(make_record("a", 100.001), make_record("a")), [])
+
+    def test_times(self):
+        # Five times slower, but less than min_seconds
+        record = make_record("a", build=0.5, solve=0.4)
+        self.assertEqual(
+            self.compare(record, make_record("a", build=0.1, solve=0.1)), []
+        )
+
+        regressions = self.compare(make_record("a", solve=4), make_record("a"))
+        self.assertEqual(regressions, ["a: solve time 4.00 seconds (was 2.00)"])
+
+    def test_not_in_baseline(self):
+        self.assertEqual(suite.compare([make_record("a")], {}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
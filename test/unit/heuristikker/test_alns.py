@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+
+from mpa.heuristikker.alns import (
+    DESTROY_OPERATORS,
+    REPAIR_OPERATORS,
+    Solution,
+    alns,
+    random_instance,
+)
+from mpa.heuristikker.construction import clarke_wright, total_cost
+
+
+class TestALNS(unittest.TestCase):
+    def setUp(self):
+        self.data = random_instance(40, seed=3, Q=60)
+        self.dist = np.asarray(self.data["dist"], dtype=np.float64)
+        self.q = np.asarray(self.data["q"], dtype=np.float64)
+        self.Q = self.data["Q"]
+
+    def assertFeasible(self, solution: Solution):
+        routes = [list(route) for route in solution.routes]
+        visited = sorted(i for route in routes for i in route)
+        self.assertEqual(visited, list(range(1, len(self.dist))))
+        for r, route in enumerate(routes):
+            self.assertLessEqual(self.q[route].sum(), self.Q)
+            self.assertAlmostEqual(solution.loads[r], self.q[route].sum())
+        self.assertAlmostEqual(solution.cost, total_cost(routes, self.dist))
+
+    def test_solution_bookkeeping(self):
+        solution = Solution(
+            clarke_wright(self.dist, self.q, self.Q), self.dist, self.q, self.Q
+        )
+        copy = solution.copy()
+
+        solution.remove(5)
+        solution.insert(5, 0, 0)
+        self.assertFeasible(solution)
+        self.assertFeasible(copy)
+        self.assertEqual(solution.route_of[5], 0)
+
+    def test_operators(self):
+        rng = np.random.default_rng(0)
+        for destroy_name, destroy in DESTROY_OPERATORS.items():
+            for repair_name, repair in REPAIR_OPERATORS.items():
+                with self.subTest(destroy=destroy_name, repair=repair_name):
+                    solution = Solution(
+                        clarke_wright(self.dist, self.q, self.Q),
+                        self.dist,
+                        self.q,
+                        self.Q,
+                    )
+                    solution.add_route()
+
+                    removed = destroy(solution, 8, rng)
+                    self.assertTrue(removed)
+                    self.assertTrue(all(solution.route_of[c] == -1 for c in removed))
+                    self.assertTrue(repair(solution, removed, rng))
+                    self.assertFeasible(solution)
+
+    def test_alns(self):
+        start = total_cost(clarke_wright(self.dist, self.q, self.Q), self.dist)
+
+        result = alns(self.data, max_iterations=300, verbose=False)
+        again = alns(self.data, max_iterations=300, verbose=False)
+
+        self.assertLessEqual(result["cost"], start + 1e-9)
+        self.assertEqual(result["cost"], again["cost"])
+        self.assertAlmostEqual(result["cost"], total_cost(result["routes"], self.dist))
+        self.assertEqual(len(result["trace"]["best"]), result["iterations"])
+        self.assertTrue(np.all(np.diff(result["trace"]["best"]) <= 0))
+
+    def test_fixed_fleet(self):
+        # The demands need at least 7 vehicles
+        self.data["m"] = 7
+
+        result = alns(self.data, max_iterations=100, verbose=False)
+
+        self.assertLessEqual(len(result["routes"]), self.data["m"])
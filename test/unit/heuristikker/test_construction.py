@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+
+from mpa.heuristikker.construction import (
+    clarke_wright,
+    merge_routes,
+    nearest_neighbour,
+    route_cost,
+    split_routes,
+)
+
+
+def random_instance(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    coords = rng.uniform(0, 100, (n + 1, 2))
+    dist = np.linalg.norm(coords[:, None] - coords[None, :], axis=2)
+    q = np.concatenate([[0], rng.integers(1, 10, n)])
+    return dist, q
+
+
+class TestConstruction(unittest.TestCase):
+    def assertValidRoutes(self, routes, n, q=None, Q=np.inf):
+        self.assertEqual(
+            sorted(c for route in routes for c in route), list(range(1, n + 1))
+        )
+        if q is not None:
+            self.assertTrue(all(q[route].sum() <= Q for route in routes))
+
+    def test_route_cost(self):
+        dist = np.array([[0, 1, 2], [1, 0, 3], [2, 3, 0]])
+
+        self.assertEqual(route_cost([1, 2], dist), 6)
+        self.assertEqual(route_cost([], dist), 0)
+
+    def test_clarke_wright(self):
+        dist, q = random_instance(30)
+
+        routes = clarke_wright(dist, q, 40)
+        self.assertValidRoutes(routes, 30, q, 40)
+
+        routes = clarke_wright(dist, q, 40, num_routes=5)
+        self.assertEqual(len(routes), 5)
+        self.assertValidRoutes(routes, 30, q, 40)
+
+        # Without capacity all customers end up on one route
+        self.assertEqual(len(clarke_wright(dist)), 1)
+
+    def test_nearest_neighbour(self):
+        dist, q = random_instance(30)
+
+        routes = nearest_neighbour(dist, q, 40)
+        self.assertValidRoutes(routes, 30, q, 40)
+
+        routes = nearest_neighbour(dist, num_routes=4)
+        self.assertEqual(len(routes), 4)
+        self.assertValidRoutes(routes, 30)
+
+    def test_demand_larger_than_capacity(self):
+        dist, q = random_instance(5)
+
+        with self.assertRaises(ValueError):
+            clarke_wright(dist, q, 0.5)
+        with self.assertRaises(ValueError):
+            nearest_neighbour(dist, q, 0.5)
+
+    def test_split_and_merge_routes(self):
+        dist, q = random_instance(10)
+        routes = [list(range(1, 11))]
+
+        split = split_routes(routes, dist, 3)
+        self.assertEqual(len(split), 3)
+        self.assertValidRoutes(split, 10)
+
+        merged = merge_routes(split, dist, q, np.inf, 1)
+        self.assertEqual(len(merged), 1)
+        self.assertValidRoutes(merged, 10)
+
+        # The routes are kept if the customers do not fit in fewer routes
+        full = [[1], [2]]
+        self.assertEqual(merge_routes(full, dist, q, q[1:3].max(), 1), full)
@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+
+from mpa.heuristikker.construction import nearest_neighbour, route_cost, total_cost
+from mpa.heuristikker.local_search import (
+    drop_and_insert,
+    exchange,
+    local_search,
+    neighbour_lists,
+    or_opt,
+    relocate,
+    two_opt,
+)
+
+
+def random_instance(n: int, seed: int = 0, symmetric: bool = True):
+    rng = np.random.default_rng(seed)
+    coords = rng.uniform(0, 100, (n + 1, 2))
+    dist = np.linalg.norm(coords[:, None] - coords[None, :], axis=2)
+    if not symmetric:
+        dist = dist + rng.uniform(0, 20, dist.shape)
+        np.fill_diagonal(dist, 0)
+    q = np.concatenate([[0], rng.integers(1, 10, n)])
+    return dist, q
+
+
+class TestLocalSearch(unittest.TestCase):
+    def test_neighbour_lists(self):
+        dist = np.abs(np.subtract.outer(np.arange(5.0), np.arange(5.0)))
+
+        neighbours = neighbour_lists(dist, k=2)
+
+        self.assertIn(neighbours[2, 0], [1, 3])
+        self.assertEqual(neighbours[1].tolist(), [2, 3])
+        self.assertTrue((neighbours != 0).all())
+
+    def test_intra_route_moves(self):
+        for symmetric in [True, False]:
+            dist, _ = random_instance(20, symmetric=symmetric)
+            route = list(range(1, 21))
+
+            for move in [two_opt, or_opt]:
+                improved, gain = move(route, dist)
+
+                self.assertEqual(sorted(improved), route)
+                self.assertGreater(gain, 0)
+                self.assertAlmostEqual(
+                    route_cost(route, dist) - route_cost(improved, dist), gain
+                )
+
+    def test_inter_route_moves(self):
+        dist, q = random_instance(30)
+        neighbours = neighbour_lists(dist, 5)
+        routes = [list(range(1, 31, 3)), list(range(2, 31, 3)), list(range(3, 31, 3))]
+
+        for move in [relocate, exchange]:
+            moved = [list(route) for route in routes]
+            gain = move(moved, dist, q, 60, neighbours)
+
+            self.assertGreater(gain, 0)
+            self.assertAlmostEqual(
+                total_cost(routes, dist) - total_cost(moved, dist), gain
+            )
+            self.assertEqual(len(moved), 3)
+            self.assertTrue(all(q[route].sum() <= 60 for route in moved))
+
+    def test_local_search(self):
+        dist, q = random_instance(40)
+        routes = nearest_neighbour(dist, q, 50)
+
+        improved = local_search(routes, dist, q, 50)
+
+        self.assertLess(total_cost(improved, dist), total_cost(routes, dist))
+        self.assertEqual(len(improved), len(routes))
+        self.assertTrue(all(q[route].sum() <= 50 for route in improved))
+
+    def test_drop_and_insert(self):
+        dist = np.array([[0, 1, 1, 50], [1, 0, 1, 50], [1, 1, 0, 50], [50, 50, 50, 0]])
+        prize = np.array([0, 10, 10, 10])
+        q = np.zeros(4)
+        routes = [[1, 3]]
+
+        gain = drop_and_insert(routes, dist, prize, q, np.inf, max_routes=1)
+
+        # Node 3 is too far away for its prize, and node 2 is worth a detour
+        self.assertEqual(sorted(routes[0]), [1, 2])
+        self.assertAlmostEqual(gain, (101 - 2 - 10) + (10 - 1))
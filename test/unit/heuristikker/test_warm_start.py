@@ -0,0 +1,62 @@
+import unittest
+
+import pyomo.environ as pyomo
+
+from mpa.heuristikker.routing import solve_routing
+from mpa.heuristikker.warm_start import set_warm_start
+from mpa.utilities.file_utils import load_script, read_json
+from mpa.utilities.route_utils import complete_arcs
+
+ROUTING_PATH = "src/mpa/ruteplanlægning/"
+
+
+def load_build_model(script: str):
+    module = load_script(ROUTING_PATH + script)
+    return getattr(module, "build_model", None) or module.buildModel
+
+
+def max_violation(model: pyomo.ConcreteModel) -> float:
+    violation = 0.0
+    for constraint in model.component_data_objects(pyomo.Constraint, active=True):
+        body = pyomo.value(constraint.body)
+        if constraint.has_lb():
+            violation = max(violation, pyomo.value(constraint.lower) - body)
+        if constraint.has_ub():
+            violation = max(violation, body - pyomo.value(constraint.upper))
+    for var in model.component_data_objects(pyomo.Var):
+        if var.has_lb():
+            violation = max(violation, var.lb - var.value)
+        if var.has_ub():
+            violation = max(violation, var.value - var.ub)
+    return violation
+
+
+class TestWarmStart(unittest.TestCase):
+    def test_warm_start_is_feasible(self):
+        cases = [
+            ("7_2_1_TSP_MTZ.py", "7_2_data.json"),
+            ("7_3_2_mTSP_One_commodity_flow.py", "7_3_small_data.json"),
+            ("7_4_2_CVRP_MTZ.py", "7_4_CVRP_n_29_data.json"),
+            ("7_4_3_CVRP_One_commodity_flow.py", "7_4_CVRP_n_29_data.json"),
+            ("7_5_2_CVRP_Prize_collection_OCF.py", "7_5_CVRP_data.json"),
+        ]
+        for script, instance in cases:
+            with self.subTest(script=script):
+                data = read_json(ROUTING_PATH + instance)
+                model = load_build_model(script)(data)
+                result = solve_routing(data)
+
+                set_warm_start(model, result["routes"], q=data.get("q"))
+
+                self.assertLessEqual(max_violation(model), 1e-9)
+                self.assertAlmostEqual(pyomo.value(model.obj), result["objective"])
+
+    def test_missing_arc(self):
+        data = read_json(ROUTING_PATH + "7_2_data.json")
+        arcs = [
+            arc for arc in complete_arcs(data["n"] + 1) if arc not in [(1, 2), (2, 1)]
+        ]
+        model = load_build_model("7_2_1_TSP_MTZ.py")(data, arcs=arcs)
+
+        with self.assertRaises(ValueError):
+            set_warm_start(model, [list(range(1, data["n"] + 1))])
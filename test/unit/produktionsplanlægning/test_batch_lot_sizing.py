@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import unittest
+
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.produktionsplanlægning.batch_lot_sizing import (
+    iter_instances,
+    run_batch,
+    solve_batch,
+    uls_data,
+)
+from mpa.utilities.file_utils import read_json, read_json_lines
+
+DATA_PATH = "src/mpa/EKSAMEN/ordinary2022Data.json"
+
+
+def write_instances(path: str, count: int) -> list:
+    # Copies of the exam instance with scaled demands
+    data = read_json(DATA_PATH)
+    instances = []
+    for i in range(count):
+        demands = [demand * (1 + i % 3) // 2 for demand in data["demands"]]
+        instances.append(dict(data, name=f"item{i}", demands=demands))
+    with open(path, "w") as file:
+        for instance in instances:
+            file.write(json.dumps(instance) + "\n")
+    return instances
+
+
+class TestBatchLotSizing(unittest.TestCase):
+    def test_iter_instances(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ["b.json", "a.json", "notes.txt"]:
+                with open(os.path.join(tmp_dir, name), "w") as file:
+                    file.write("{}")
+
+            self.assertEqual(
+                [name for name, _ in iter_instances(tmp_dir)], ["a.json", "b.json"]
+            )
+
+            path = os.path.join(tmp_dir, "instances.jsonl")
+            with open(path, "w") as file:
+                file.write('{"a": 1}\n\n{"a": 2}\n')
+
+            self.assertEqual(
+                list(iter_instances(path)),
+                [("line 1", '{"a": 1}\n'), ("line 3", '{"a": 2}\n')],
+            )
+
+    def test_uls_data(self):
+        data = uls_data(read_json(DATA_PATH))
+
+        self.assertEqual(len(data["periods"]), 15)
+        self.assertEqual(data["max_prod"], 190)
+        self.assertIsNone(data["max_inv"])
+
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            next(solve_batch(DATA_PATH, model="opgave_9_9"))
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_solve_batch(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, "instances.jsonl")
+            instances = write_instances(source, 7)
+            with open(source, "a") as file:
+                file.write('{"name": "broken", "nrPeriods": 3}\n')
+
+            rows = list(solve_batch(source, max_workers=2, max_pending=3, ordered=True))
+
+            self.assertEqual([row["index"] for row in rows], list(range(8)))
+            self.assertEqual(rows[0]["name"], "item0")
+            for row, instance in zip(rows, instances):
+                self.assertIsNone(row["error"])
+                self.assertEqual(row["termination_condition"], "optimal")
+                self.assertEqual(len(row["x"]), instance["nrPeriods"])
+            self.assertIn("KeyError", rows[-1]["error"])
+            # Instances with the same demands have the same plan
+            self.assertAlmostEqual(rows[0]["objective"], rows[3]["objective"])
+
+            results_path = os.path.join(tmp_dir, "plans.jsonl")
+            summary = run_batch(source, results_path, max_workers=2, model="5_2_0_ULS")
+
+            self.assertEqual(summary["instances"], 8)
+            self.assertEqual(summary["failed"], ["broken"])
+            self.assertGreater(summary["throughput"], 0)
+            self.assertEqual(len(read_json_lines(results_path)), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
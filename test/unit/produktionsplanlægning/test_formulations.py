@@ -0,0 +1,63 @@
+import unittest
+
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.instance_generator import lot_sizing_instance
+
+PRODUCTION_PATH = "src/mpa/produktionsplanlægning/"
+
+
+def lp_bound(model: pyomo.ConcreteModel()) -> float:
+    pyomo.TransformationFactory("core.relax_integer_vars").apply_to(model)
+    pyomo.SolverFactory("appsi_highs").solve(model)
+    return pyomo.value(model.obj)
+
+
+class TestFormulations(unittest.TestCase):
+    def test_unknown_formulation(self):
+        script = load_script(PRODUCTION_PATH + "5_2_0_ULS.py")
+
+        with self.assertRaises(ValueError):
+            script.build_model(script.read_data(), formulation="shortest_path")
+
+    def test_tight_big_m(self):
+        script = load_script(PRODUCTION_PATH + "5_3_0_MPS.py")
+        data = script.read_data()
+
+        model = script.build_model(data, formulation="tight_big_m")
+
+        self.assertEqual(model.bigM[0][0], data["max_prod"])
+        self.assertEqual(model.bigM[0][-1], data["demands"][0][-1])
+        self.assertEqual(model.bigM[0][-2], sum(data["demands"][0][-2:]))
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_formulations(self):
+        cases = [("5_2_0_ULS", lot_sizing_instance(12)), ("5_3_0_MPS", None)]
+        for name, data in cases:
+            script = load_script(f"{PRODUCTION_PATH}{name}.py")
+            data = data or script.read_data()
+            with self.subTest(script=name):
+                objectives, bounds = [], []
+                for formulation in script.FORMULATIONS:
+                    model = script.build_model(data, formulation)
+                    pyomo.SolverFactory("appsi_highs").solve(model)
+                    objectives.append(pyomo.value(model.obj))
+                    bounds.append(lp_bound(model))
+
+                # The same optimum, and stronger LP bounds in the order of FORMULATIONS
+                for objective in objectives[1:]:
+                    self.assertAlmostEqual(
+                        objective, objectives[0], delta=1e-4 * objectives[0]
+                    )
+                self.assertLess(bounds[0], bounds[1])
+                self.assertLessEqual(bounds[1], bounds[2] + 1e-6)
+                self.assertLessEqual(bounds[2], min(objectives) + 1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+
+import numpy as np
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.produktionsplanlægning.relax_and_fix import (
+    fix_and_optimize,
+    lot_sizing_heuristic,
+    relax_and_fix,
+    unfix_setups,
+)
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.instance_generator import lot_sizing_instance
+from mpa.utilities.model_utils import SolverSession
+
+
+def plan(model: pyomo.ConcreteModel()) -> tuple:
+    return tuple(
+        np.array([[var[k, t].value for t in model.t] for k in model.k])
+        for var in [model.x, model.y, model.s]
+    )
+
+
+class TestRelaxAndFix(unittest.TestCase):
+    def test_invalid_overlap(self):
+        with self.assertRaises(ValueError):
+            relax_and_fix(None, window=4, overlap=4)
+        with self.assertRaises(ValueError):
+            fix_and_optimize(None, window=4, overlap=-1)
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_relax_and_fix(self):
+        script = load_script("src/mpa/produktionsplanlægning/5_3_0_MPS.py")
+        data = lot_sizing_instance(12, 3)
+        model = script.build_model(data)
+        pyomo.SolverFactory("appsi_highs").solve(model)
+        optimal = pyomo.value(model.obj)
+
+        model = script.build_model(data)
+        session = SolverSession(model)
+        cost = relax_and_fix(session, window=4, overlap=1, products=2)
+        x, y, s = plan(model)
+
+        # The plan is integer and feasible for the original model
+        for var in model.component_data_objects(pyomo.Var):
+            self.assertTrue(var.is_integer() or var.is_binary())
+        self.assertTrue(all(model.y[k, t].fixed for k in model.k for t in model.t))
+        np.testing.assert_array_equal(x, np.round(x))
+        opening = np.hstack([np.zeros((3, 1)), s[:, :-1]])
+        np.testing.assert_allclose(opening + x, np.array(data["demands"]) + s)
+        self.assertTrue((x <= data["max_prod"] * y + 1e-6).all())
+        self.assertGreaterEqual(cost, optimal * (1 - 1e-4))
+
+        history = fix_and_optimize(session, window=6, overlap=3, passes=2)
+
+        self.assertEqual(history[0], cost)
+        self.assertTrue(all(b <= a + 1e-6 for a, b in zip(history, history[1:])))
+        self.assertAlmostEqual(pyomo.value(model.obj), history[-1])
+
+        unfix_setups(session)
+        session.solve()
+
+        self.assertAlmostEqual(pyomo.value(model.obj), optimal, delta=1e-4 * optimal)
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_infeasible_window(self):
+        script = load_script("src/mpa/produktionsplanlægning/5_3_0_MPS.py")
+        data = lot_sizing_instance(6, 2)
+        # The demand of the first period exceeds the capacity, with no stock to cover it
+        data["demands"][0, 0] = 2 * data["max_prod"]
+        session = SolverSession(script.build_model(data))
+
+        with self.assertRaisesRegex(RuntimeError, "is infeasible"):
+            relax_and_fix(session, window=2, overlap=1)
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_no_solution_within_time_limit(self):
+        script = load_script("src/mpa/produktionsplanlægning/5_3_0_MPS.py")
+        session = SolverSession(
+            script.build_model(lot_sizing_instance(52, 30)), timelimit=1e-9
+        )
+
+        with self.assertRaisesRegex(RuntimeError, "has no solution"):
+            relax_and_fix(session, window=12, overlap=4)
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_lot_sizing_heuristic(self):
+        script = load_script("src/mpa/produktionsplanlægning/5_3_0_MPS.py")
+        model = script.build_model(script.read_data())
+
+        result = lot_sizing_heuristic(model, window=3, overlap=1, passes=0)
+
+        self.assertEqual(result["history"], [result["cost"]])
+        times = result["times"]
+        self.assertGreaterEqual(times["total"], times["relax_and_fix"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+
+import numpy as np
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.produktionsplanlægning.rolling_horizon import (
+    build_model,
+    plan_cost,
+    rolling_horizon,
+    set_window,
+)
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.instance_generator import lot_sizing_instance
+
+
+class TestRollingHorizon(unittest.TestCase):
+    def test_set_window(self):
+        data = lot_sizing_instance(10, 2)
+        model = build_model(data, window=4)
+
+        self.assertEqual(model.d[1, 2].value, data["demands"][1][2])
+        self.assertEqual(model.s[0, 0].ub, 0)
+
+        set_window(model, 8, np.array([5, 7]))
+
+        self.assertEqual(model.s0[1].value, 7)
+        self.assertEqual(model.p[0, 1].value, data["var_cost"][0][9])
+        self.assertEqual(model.s[0, 0].ub, data["max_inv"])
+        # The stock is empty at the end of the horizon, and the periods after it are idle
+        self.assertEqual(model.s[0, 1].ub, 0)
+        self.assertTrue(model.x[0, 2].fixed and model.y[1, 3].fixed)
+        self.assertEqual(model.d[0, 3].value, 0)
+
+        set_window(model, 4, np.zeros(2))
+
+        self.assertFalse(model.x[0, 2].fixed)
+
+    def test_invalid_frozen(self):
+        with self.assertRaises(ValueError):
+            rolling_horizon(lot_sizing_instance(10, 2), window=4, frozen=5)
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_rolling_horizon(self):
+        data = lot_sizing_instance(16, 2)
+        script = load_script("src/mpa/produktionsplanlægning/5_3_0_MPS.py")
+        model = script.build_model(data)
+        pyomo.SolverFactory("appsi_highs").solve(model)
+        monolithic = pyomo.value(model.obj)
+
+        # A single window over the whole horizon is the monolithic model
+        result = rolling_horizon(data, window=16, frozen=16)
+        self.assertEqual(result["windows"], 1)
+        self.assertAlmostEqual(result["cost"], monolithic, delta=1e-4 * monolithic)
+
+        result = rolling_horizon(data, window=6, frozen=2)
+        x, s = np.array(result["x"]), np.array(result["s"])
+        opening = np.hstack([np.zeros((2, 1)), s[:, :-1]])
+
+        self.assertEqual(result["windows"], 6)
+        self.assertEqual(len(result["times"]["windows"]), 6)
+        np.testing.assert_array_equal(opening + x, np.array(data["demands"]) + s)
+        self.assertTrue((s[:, -1] == 0).all())
+        self.assertAlmostEqual(result["cost"], plan_cost(data, result))
+        self.assertGreaterEqual(result["cost"], monolithic * (1 - 1e-4))
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_infeasible_window(self):
+        # The monolithic model builds stock ahead of the demand in the last
+        # period, which a window of two periods does not see in time
+        data = {
+            "products": ["Product1"],
+            "periods": [f"Week{t + 1}" for t in range(6)],
+            "demands": [[0, 0, 0, 0, 0, 30]],
+            "var_cost": [[1] * 6],
+            "fixed_cost": [[10] * 6],
+            "inv_cost": [1] * 6,
+            "max_prod": 10,
+            "max_inv": 30,
+            "batch_size": 1,
+        }
+        script = load_script("src/mpa/produktionsplanlægning/5_3_0_MPS.py")
+        model = script.build_model(data)
+        results = pyomo.SolverFactory("appsi_highs").solve(model)
+        self.assertEqual(
+            results.solver.termination_condition, pyomo.TerminationCondition.optimal
+        )
+
+        with self.assertRaisesRegex(RuntimeError, "The window starting in period"):
+            rolling_horizon(data, window=2, frozen=1)
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_no_solution_within_time_limit(self):
+        data = lot_sizing_instance(52, 30)
+
+        with self.assertRaisesRegex(RuntimeError, "has no solution"):
+            rolling_horizon(data, window=12, frozen=4, timelimit=1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
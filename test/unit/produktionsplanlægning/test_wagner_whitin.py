@@ -0,0 +1,112 @@
+import unittest
+
+import numpy as np
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.produktionsplanlægning.wagner_whitin import (
+    load_plan,
+    wagner_whitin,
+    wagner_whitin_batch,
+)
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.instance_generator import lot_sizing_instance
+
+
+def plan_cost(data: dict, plan: dict) -> float:
+    return float(
+        np.dot(data["var_cost"], plan["x"])
+        + np.dot(data["fixed_cost"], plan["y"])
+        + np.dot(data["inv_cost"], plan["s"])
+    )
+
+
+class TestWagnerWhitin(unittest.TestCase):
+    def test_plan(self):
+        data = lot_sizing_instance(30, seed=4)
+
+        plan = wagner_whitin(data)
+
+        self.assertEqual(len(plan["x"]), 30)
+        self.assertEqual(plan["s"][-1], 0)
+        self.assertTrue(all(s >= 0 for s in plan["s"]))
+        # Production only when the stock has run out
+        for t in range(1, 30):
+            if plan["x"][t] > 0:
+                self.assertEqual(plan["s"][t - 1], 0)
+        self.assertAlmostEqual(plan["cost"], plan_cost(data, plan), places=4)
+
+    def test_zero_demand(self):
+        data = {
+            "demands": [0, 0, 5, 0, 5],
+            "var_cost": [1, 1, 1, 1, 1],
+            "fixed_cost": [10, 10, 10, 10, 10],
+            "inv_cost": [1, 1, 1, 1, 1],
+        }
+
+        plan = wagner_whitin(data)
+
+        self.assertEqual(plan["x"], [0, 0, 10, 0, 0])
+        self.assertEqual(plan["y"], [0, 0, 1, 0, 0])
+        self.assertEqual(plan["cost"], 10 + 10 + 5 + 5)
+
+    def test_fractional_demand(self):
+        data = {
+            "demands": [2.5, 1.25, 3.7],
+            "var_cost": [1, 1, 1],
+            "fixed_cost": [10, 10, 10],
+            "inv_cost": [0.1, 0.1, 0.1],
+        }
+
+        plan = wagner_whitin(data)
+
+        self.assertAlmostEqual(plan["x"][0], 7.45)
+        self.assertTrue(all(s >= 0 for s in plan["s"]))
+        self.assertEqual(plan["s"][-1], 0)
+
+    def test_batch(self):
+        items = [lot_sizing_instance(20, seed=seed) for seed in range(5)]
+        demands = np.array([item["demands"] for item in items])
+        var_cost = np.array([item["var_cost"] for item in items])
+        fixed_cost = np.array([item["fixed_cost"] for item in items])
+        inv_cost = items[0]["inv_cost"]
+
+        plans = wagner_whitin_batch(
+            demands, var_cost, fixed_cost, inv_cost, chunk_size=2
+        )
+
+        for k, item in enumerate(items):
+            item["inv_cost"] = inv_cost
+            plan = wagner_whitin(item)
+            np.testing.assert_array_equal(plans["x"][k], plan["x"])
+            np.testing.assert_array_equal(plans["s"][k], plan["s"])
+            self.assertAlmostEqual(plans["cost"][k], plan["cost"])
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_matches_milp(self):
+        script = load_script("src/mpa/produktionsplanlægning/5_2_0_ULS.py")
+        solver = pyomo.SolverFactory("appsi_highs")
+
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                data = lot_sizing_instance(15, seed=seed)
+                data.update(max_prod=None, max_inv=None)
+                model = script.build_model(data)
+                model.beginningInventory.deactivate()
+                solver.solve(model)
+
+                plan = wagner_whitin(data)
+
+                self.assertAlmostEqual(
+                    plan["cost"], pyomo.value(model.obj), delta=1e-4 * plan["cost"]
+                )
+
+                load_plan(model, plan)
+                self.assertAlmostEqual(pyomo.value(model.obj), plan["cost"], places=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.utilities.file_utils import load_script
+from mpa.utilities.route_utils import extract_routes
+
+SCRIPT_PATH = "src/mpa/ruteplanlægning/7_2_0_TSP_DFJ.py"
+DATA_PATH = "src/mpa/ruteplanlægning/7_2_data.json"
+
+
+@pytest.mark.skipif(
+    not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+    reason="Requires HiGHS (pip install highspy)",
+)
+class TestLazySECs(unittest.TestCase):
+    def setUp(self):
+        self.script = load_script(SCRIPT_PATH)
+
+    def test_matches_all_SECs(self):
+        data = self.script.read_data(DATA_PATH)
+        model = self.script.build_model(data)
+        pyomo.SolverFactory("appsi_highs").solve(model)
+        optimal = pyomo.value(model.obj)
+
+        data = self.script.read_data(DATA_PATH, lazy=True)
+        model = self.script.build_model(data, lazy=True)
+        stats = self.script.solve_model_lazy(model, solver="appsi_highs")
+
+        self.assertEqual(stats["termination"], "optimal")
+        self.assertEqual(len(stats["round_times"]), stats["iterations"])
+        self.assertEqual(len(model.SECs), stats["cuts"])
+        self.assertAlmostEqual(pyomo.value(model.obj), optimal, places=4)
+        self.assertEqual(extract_routes(model.x)["subtours"], [])
+
+    def test_max_rounds(self):
+        data = self.script.read_data(DATA_PATH, lazy=True)
+        model = self.script.build_model(data, lazy=True)
+
+        stats = self.script.solve_model_lazy(model, solver="appsi_highs", max_rounds=1)
+
+        # The assignment relaxation of the instance has subtours
+        self.assertEqual(stats["iterations"], 1)
+        self.assertGreater(stats["cuts"], 0)
+        self.assertEqual(stats["termination"], "maxIterations")
+
+    def test_infeasible(self):
+        data = self.script.read_data(DATA_PATH, lazy=True)
+        # Two halves without arcs between them, so the SECs of the subtours
+        # eventually leave no feasible solution
+        halves = [range(0, 4), range(4, data["n"] + 1)]
+        arcs = [(i, j) for nodes in halves for i in nodes for j in nodes if i != j]
+        model = self.script.build_model(data, lazy=True, arcs=arcs)
+
+        with self.assertRaisesRegex(RuntimeError, "ended with infeasible"):
+            self.script.solve_model_lazy(model, solver="appsi_highs")
+
+
+if __name__ == "__main__":
+    unittest.main()
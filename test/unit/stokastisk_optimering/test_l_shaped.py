@@ -0,0 +1,67 @@
+import unittest
+
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.stokastisk_optimering.two_stage.l_shaped import solve_l_shaped
+from mpa.utilities.file_utils import load_script
+
+
+def extensive_form(data: dict, integer: bool = True) -> float:
+    script = load_script(
+        "src/mpa/stokastisk_optimering/two_stage/9_1_two_stage_stochastic_program.py"
+    )
+    model = script.build_model(data)
+    if not integer:
+        for x in model.x.values():
+            x.domain = pyomo.NonNegativeReals
+    pyomo.SolverFactory("appsi_highs").solve(model)
+    return pyomo.value(model.obj)
+
+
+def make_data(f: list, demand_scenario: list) -> dict:
+    return {
+        "numFacilities": 3,
+        "numCustomers": 3,
+        "c": [[1, 3, 5], [4, 1, 3], [6, 4, 1]],
+        "f": f,
+        "cap": [10, 10, 30],
+        "demand_exp": demand_scenario[0],
+        "demand_scenario": demand_scenario,
+    }
+
+
+@pytest.mark.skipif(
+    not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+    reason="Requires HiGHS (pip install highspy)",
+)
+class TestLShaped(unittest.TestCase):
+    def test_matches_extensive_form(self):
+        data = make_data([20, 25, 30], [[6, 6, 6], [5, 7, 4], [3, 6, 8]])
+
+        for multicut in [True, False]:
+            relaxed = solve_l_shaped(data, multicut=multicut)
+            self.assertAlmostEqual(
+                relaxed["objective"], extensive_form(data, integer=False), places=4
+            )
+            self.assertLessEqual(relaxed["lower_bound"], relaxed["objective"] + 1e-6)
+
+            integer = solve_l_shaped(data, multicut=multicut, integer=True)
+            self.assertAlmostEqual(integer["objective"], extensive_form(data), places=4)
+
+    def test_integer_infeasible_capacity(self):
+        # Facilities 0 and 1 have enough capacity in total, but each only fits
+        # one customer, so the cheap master solution is infeasible with binary
+        # assignments and facility 2 must be opened
+        data = make_data([1, 1, 100], [[6, 6, 6]])
+
+        relaxed = solve_l_shaped(data)
+        result = solve_l_shaped(data, integer=True)
+
+        self.assertEqual(relaxed["y"], [1, 1, 0])
+        self.assertEqual(result["y"][2], 1)
+        self.assertAlmostEqual(result["objective"], extensive_form(data), places=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.stokastisk_optimering.opgave import progressive_hedging as ph
+from mpa.utilities.file_utils import load_script
+
+SCRIPT_PATH = "src/mpa/stokastisk_optimering/opgave/TS-SP_CVRP_solution.py"
+DATA_PATH = "src/mpa/stokastisk_optimering/opgave/TS-SP-CVRP-data.json"
+
+
+@pytest.mark.skipif(
+    not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+    reason="Requires HiGHS (pip install highspy)",
+)
+class TestProgressiveHedging(unittest.TestCase):
+    def setUp(self):
+        # The first 6 customers and 4 equally likely scenarios
+        self.script = load_script(SCRIPT_PATH)
+        data = self.script.read_data(DATA_PATH)
+        n, S = 6, 4
+        self.data = dict(
+            data,
+            n=n,
+            demands=[row[: n + 1] for row in data["demands"][:S]],
+            Prob=[1 / S] * S,
+            dist=np.asarray(data["dist"])[: n + 1, : n + 1],
+        )
+
+    def tearDown(self):
+        ph._worker.clear()
+
+    def test_small_instance(self):
+        data = self.data
+        model = self.script.build_model(data)
+        pyomo.SolverFactory("appsi_highs").solve(model)
+
+        result = ph.progressive_hedging(data, max_workers=3, MIPgap=1e-6)
+
+        # Consensus on the fleet size of the extensive form, with the bound below the cost
+        self.assertLessEqual(result["trajectory"][-1]["gap"], 1e-3)
+        self.assertEqual(result["m"], round(pyomo.value(model.m)))
+        self.assertAlmostEqual(result["objective"], pyomo.value(model.obj), places=3)
+        self.assertLessEqual(result["lower_bound"], result["objective"] + 1e-6)
+
+    def test_scenario_without_solution(self):
+        # Solve scenario 1 in this process, then make its subproblem infeasible
+        ph._init_worker(self.data, "appsi_highs", None, None)
+        ph._solve_scenario(1, 0.0, 0.0, 0.0, None)
+        model, session = ph._worker["models"][1]
+        model.infeasible = pyomo.Constraint(expr=model.m <= -1)
+        session.add_constraint(model.infeasible)
+
+        with self.assertRaisesRegex(RuntimeError, "Scenario 1 has no solution"):
+            ph._solve_scenario(1, 0.0, 0.0, 0.0, None)
+
+
+if __name__ == "__main__":
+    unittest.main()
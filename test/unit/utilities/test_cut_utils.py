@@ -0,0 +1,97 @@
+import unittest
+
+import numpy as np
+import pyomo.environ as pyomo
+import pytest
+from pyomo.core.expr import identify_variables
+
+from mpa.utilities.cut_utils import (
+    add_capacity_cuts,
+    capacity_cut_loop,
+    rci_violation,
+    separate_rci,
+    support_graph,
+)
+from mpa.utilities.file_utils import load_script, read_json
+
+
+def tour_weights(num_nodes: int, tours: list) -> np.ndarray:
+    weights = np.zeros((num_nodes, num_nodes))
+    for tour in tours:
+        for i, j in zip(tour, tour[1:] + tour[:1]):
+            weights[i, j] += 1
+            weights[j, i] += 1
+    return weights
+
+
+class TestCutUtils(unittest.TestCase):
+    def test_support_graph(self):
+        model = pyomo.ConcreteModel()
+        model.x = pyomo.Var([(0, 1), (1, 0), (1, 2)])
+        model.x[0, 1].value = 0.5
+        model.x[1, 0].value = 0.25
+
+        weights = support_graph(model.x, 3)
+
+        self.assertEqual(weights[0, 1], 0.75)
+        self.assertEqual(weights[1, 0], 0.75)
+        self.assertEqual(weights[1, 2], 0)
+
+    def test_rci_violation(self):
+        q = np.array([0, 4, 4, 4, 4])
+        # A subtour 1 -> 2 -> 1 and an overloaded route 0 -> 3 -> 4 -> 0
+        weights = tour_weights(5, [[1, 2], [0, 3, 4]])
+
+        self.assertEqual(rci_violation([1, 2], weights, q, 10), 1)
+        self.assertEqual(rci_violation([3, 4], weights, q, 6), 1)
+        self.assertEqual(rci_violation([3, 4], weights, q, 10), 0)
+
+    def test_separate_rci(self):
+        q = np.array([0, 3, 3, 3, 3, 3, 3])
+        # A feasible route and a subtour
+        weights = tour_weights(7, [[0, 1, 2, 3], [4, 5, 6]])
+
+        self.assertEqual(separate_rci(weights, q, 10), [[4, 5, 6]])
+
+        # Half of each of the routes 0 -> 1 -> 2 -> 3 -> 0 and 0 -> 3 -> 4 -> 0 ...
+        weights = (tour_weights(7, [[0, 1, 2, 3], [0, 4, 5, 6]]) + weights) / 2
+
+        sets = separate_rci(weights, q, 6)
+
+        self.assertTrue(sets)
+        for S in sets:
+            self.assertGreater(rci_violation(S, weights, q, 6), 0)
+
+    def test_add_capacity_cuts(self):
+        model = pyomo.ConcreteModel()
+        model.q = [0, 3, 3, 3]
+        model.Q = 5
+        model.out_nodes = [[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]]
+        model.x = pyomo.Var([(i, j) for i in range(4) for j in model.out_nodes[i]])
+
+        (cut,) = add_capacity_cuts(model, [[1, 2, 3]])
+
+        self.assertEqual(len(model.capacity_cuts), 1)
+        self.assertEqual(pyomo.value(cut.upper), 1)
+        self.assertEqual(
+            sorted(str(var) for var in identify_variables(cut.body)),
+            sorted(f"x[{i},{j}]" for i in [1, 2, 3] for j in [1, 2, 3] if i != j),
+        )
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_capacity_cut_loop(self):
+        data = read_json("src/mpa/ruteplanlægning/7_4_CVRP_n_29_data.json")
+        model = load_script("src/mpa/ruteplanlægning/7_4_2_CVRP_MTZ.py").build_model(
+            data
+        )
+
+        stats = capacity_cut_loop(model)
+
+        self.assertGreater(stats["cuts"], 0)
+        self.assertEqual(len(stats["bounds"]), stats["rounds"] + 1)
+        self.assertTrue(np.all(np.diff(stats["bounds"]) >= -1e-6))
+        self.assertGreater(stats["bounds"][-1], stats["bounds"][0] + 100)
+        self.assertTrue(all(var.is_binary() for var in model.x.values()))
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from mpa.utilities.distance_cache import cached_distance_matrix, evict_cache
+from mpa.utilities.support_functions import lp_norm_distance_matrix
+
+
+class TestDistanceCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp_dir.name
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_cached_distance_matrix(self):
+        points = np.random.default_rng(1).uniform(0, 10, size=(15, 2))
+
+        cold = cached_distance_matrix(points, p=2, r=2, cache_dir=self.cache_dir)
+        warm = cached_distance_matrix(points, p=2, r=2, cache_dir=self.cache_dir)
+
+        self.assertIsInstance(warm, np.memmap)
+        np.testing.assert_array_equal(cold, lp_norm_distance_matrix(points, 2, r=2))
+        np.testing.assert_array_equal(cold, warm)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # A different norm is a different cache entry
+        cached_distance_matrix(points, p=1, r=2, cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_evict_cache(self):
+        rng = np.random.default_rng(2)
+        for _ in range(3):
+            cached_distance_matrix(
+                rng.uniform(size=(10, 2)), 2, cache_dir=self.cache_dir
+            )
+
+        entry_size = 10 * 10 * 8 + 128  # float64 data plus the .npy header
+        removed = evict_cache(self.cache_dir, max_bytes=2 * entry_size)
+
+        self.assertEqual(len(removed), 1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,19 +1,35 @@
 import os
+import tempfile
 import unittest
 
-from mpa.utilities.file_utils import read_json, write_json
+import numpy as np
+
+from mpa.utilities.file_utils import (
+    append_json_line,
+    binary_path,
+    convert_json,
+    load_script,
+    read_instance,
+    read_json,
+    read_json_lines,
+    write_instance,
+    write_json,
+)
 
 
 class TestFileUtils(unittest.TestCase):
     def __init__(self, methodName: str = ...) -> None:
         super().__init__(methodName)
         self.test_file_path_json = "test/unit/utilities/test_file.json"
+        self.test_file_path_jsonl = "test/unit/utilities/test_file.jsonl"
 
     def setUp(self) -> None:
         check_and_remove_file(self.test_file_path_json)
+        check_and_remove_file(self.test_file_path_jsonl)
 
     def tearDown(self) -> None:
         check_and_remove_file(self.test_file_path_json)
+        check_and_remove_file(self.test_file_path_jsonl)
 
     # writing and reading the same dict
     def test_read_and_write_json(self):
@@ -27,6 +43,99 @@ class TestFileUtils(unittest.TestCase):
 
         self.assertEqual(first=write_data, second=read_data)
 
+    # appending lines and reading them back, ignoring a truncated last line
+    def test_append_and_read_json_lines(self):
+        append_json_line(obj={"x": 1}, path=self.test_file_path_jsonl)
+        append_json_line(obj={"x": 2}, path=self.test_file_path_jsonl)
+
+        with open(self.test_file_path_jsonl, "a") as file:
+            file.write('{"x": ')
+
+        read_data = read_json_lines(path=self.test_file_path_jsonl)
+
+        self.assertEqual(first=[{"x": 1}, {"x": 2}], second=read_data)
+
+
+class TestInstanceStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.folder = tempfile.TemporaryDirectory()
+        self.path_json = os.path.join(self.folder.name, "data.json")
+        self.data = {
+            "n": 2,
+            "labels": ["a", "b", "c"],
+            "dist": [[0, 1.5, 2], [1.5, 0, 3], [2, 3, 0]],
+            "q": [0, 4, 5],
+            "ragged": [[1], [2, 3]],
+            "empty": [],
+        }
+
+    def tearDown(self) -> None:
+        self.folder.cleanup()
+
+    # writing and reading an instance in the binary format
+    def test_write_and_read_instance(self):
+        path = os.path.join(self.folder.name, "data.mpa")
+
+        write_instance(self.data, path)
+        read_data = read_instance(path)
+
+        self.assertEqual(list(read_data), list(self.data))
+        self.assertEqual(read_data["labels"], ["a", "b", "c"])
+        self.assertEqual(read_data["ragged"], [[1], [2, 3]])
+        self.assertEqual(read_data["dist"].dtype, np.float64)
+        self.assertEqual(read_data["q"].dtype, np.int64)
+        np.testing.assert_array_equal(read_data["dist"], self.data["dist"])
+        np.testing.assert_array_equal(read_data["q"], self.data["q"])
+        self.assertFalse(read_data["dist"].flags.writeable)
+        self.assertEqual(read_data["dist"].ctypes.data % 64, 0)
+
+    # Zero-size values, also as the last or only array of the file
+    def test_write_and_read_empty_arrays(self):
+        path = os.path.join(self.folder.name, "data.mpa")
+
+        write_instance({"arcs": [[], []]}, path)
+        self.assertEqual(read_instance(path), {"arcs": [[], []]})
+
+        write_instance({"q": np.array([1, 2]), "empty": np.zeros((2, 0))}, path)
+        read_data = read_instance(path)
+
+        np.testing.assert_array_equal(read_data["q"], [1, 2])
+        self.assertEqual(read_data["empty"].shape, (2, 0))
+        self.assertEqual(read_data["empty"].dtype, np.float64)
+
+    # read_json uses the binary file only while it is newer than the JSON file
+    def test_read_json_prefers_fresh_binary(self):
+        write_json(self.data, self.path_json)
+
+        self.assertIsInstance(read_json(self.path_json)["dist"], list)
+
+        binary = convert_json(self.path_json)
+
+        self.assertEqual(binary, binary_path(self.path_json))
+        self.assertIsInstance(read_json(self.path_json)["dist"], np.ndarray)
+        self.assertIsInstance(
+            read_json(self.path_json, prefer_binary=False)["dist"], list
+        )
+
+        modified = os.path.getmtime(binary) + 10
+        os.utime(self.path_json, (modified, modified))
+
+        self.assertIsInstance(read_json(self.path_json)["dist"], list)
+
+    def test_read_instance_not_binary(self):
+        write_json(self.data, self.path_json)
+
+        with self.assertRaises(ValueError):
+            read_instance(self.path_json)
+
+    def test_load_script(self):
+        script = load_script("src/mpa/produktionsplanlægning/5_2_0_ULS.py")
+        named = load_script("src/mpa/produktionsplanlægning/5_2_0_ULS.py", "uls")
+
+        self.assertEqual(script.__name__, "5_2_0_ULS")
+        self.assertEqual(named.__name__, "uls")
+        self.assertTrue(callable(script.build_model))
+
 
 def check_and_remove_file(path) -> None:
     if os.path.exists(path=path):
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from mpa.utilities.file_utils import load_script, read_json
+from mpa.utilities.instance_generator import (
+    PATTERNS,
+    flp_instance,
+    generate_points,
+    lot_sizing_instance,
+    routing_instance,
+    write_flp_instance,
+    write_routing_instance,
+)
+
+
+class TestInstanceGenerator(unittest.TestCase):
+    def test_generate_points(self):
+        for pattern in PATTERNS:
+            with self.subTest(pattern=pattern):
+                points = generate_points(500, pattern, seed=3)
+
+                self.assertEqual(points.shape, (500, 2))
+                self.assertTrue(((points >= 0) & (points <= 100)).all())
+                np.testing.assert_array_equal(
+                    points, generate_points(500, pattern, seed=3)
+                )
+
+        # Clustered points are closer to their nearest neighbour
+        def nearest(points):
+            dist = np.linalg.norm(points[:, None] - points[None, :], axis=2)
+            np.fill_diagonal(dist, np.inf)
+            return dist.min(axis=1).mean()
+
+        self.assertLess(
+            nearest(generate_points(500, "clustered")),
+            nearest(generate_points(500, "uniform")),
+        )
+
+        with self.assertRaises(ValueError):
+            generate_points(10, "grid")
+
+    def test_routing_instance(self):
+        bundled = {
+            "tsp": "7_2_data.json",
+            "mtsp": "7_3_small_data.json",
+            "cvrp": "7_4_CVRP_n_50_data.json",
+        }
+        for problem, name in bundled.items():
+            with self.subTest(problem=problem):
+                data = routing_instance(30, problem, dense=True)
+                schema = read_json(f"src/mpa/ruteplanlægning/{name}")
+
+                self.assertEqual(list(data), list(schema))
+                self.assertEqual(data["dist"].shape, (31, 31))
+                self.assertEqual(data["dist"].dtype, np.int64)
+
+        data = routing_instance(30)
+        self.assertNotIn("dist", data)
+        self.assertEqual(data["q"][0], 0)
+        self.assertGreaterEqual(data["m"] * data["Q"], data["q"].sum())
+
+    def test_routing_instance_builds(self):
+        script = load_script("src/mpa/ruteplanlægning/7_4_2_CVRP_MTZ.py")
+
+        model = script.build_model(routing_instance(10, dense=True))
+
+        self.assertEqual(len(model.x), 11 * 10)
+
+    def test_flp_instance(self):
+        data = flp_instance(5, 20, pattern="clustered")
+        schema = read_json("src/mpa/stokastisk_optimering/9_1_data.json")
+
+        self.assertEqual(list(data), list(schema))
+        self.assertEqual(data["c"].shape, (5, 20))
+        self.assertGreaterEqual(data["c"].min(), 1)
+        self.assertGreaterEqual(data["cap"].sum(), 2.5 * data["demand_exp"].sum())
+
+    def test_lot_sizing_instance(self):
+        for products, script_name in [(1, "5_2_0_ULS.py"), (3, "5_3_0_MPS.py")]:
+            with self.subTest(products=products):
+                script = load_script(f"src/mpa/produktionsplanlægning/{script_name}")
+                data = lot_sizing_instance(20, products)
+
+                self.assertEqual(list(data), list(script.read_data()))
+                self.assertEqual(len(data["periods"]), 20)
+                self.assertLessEqual(np.max(data["demands"]), data["max_prod"])
+                script.build_model(data)
+
+    def test_streaming_writes(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "data.json")
+
+            write_routing_instance(path, 25, pattern="solomon", seed=2, dense=True)
+            data = routing_instance(25, pattern="solomon", seed=2, dense=True)
+            read_data = read_json(path)
+
+            self.assertEqual(list(read_data), list(data))
+            for key, value in data.items():
+                np.testing.assert_array_equal(read_data[key], value)
+
+            write_flp_instance(path, 4, 30)
+            np.testing.assert_array_equal(
+                read_json(path)["c"], flp_instance(4, 30)["c"]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pyomo.environ as pyomo
+
+from mpa.utilities.matrix_utils import (
+    SparseConstraintBuilder,
+    coo_to_csr,
+    flatten_vars,
+    variable_bounds,
+)
+
+
+class TestMatrixUtils(unittest.TestCase):
+    def test_coo_to_csr(self):
+        # Unsorted, with a duplicate entry in (1, 0) and an explicit zero in (0, 1)
+        data, indices, indptr = coo_to_csr(
+            rows=[1, 0, 1, 0, 1],
+            cols=[2, 0, 0, 1, 0],
+            vals=[3.0, 1.0, 2.0, 0.0, 4.0],
+            nrows=3,
+        )
+
+        np.testing.assert_array_equal(data, [1.0, 6.0, 3.0])
+        np.testing.assert_array_equal(indices, [0, 0, 2])
+        np.testing.assert_array_equal(indptr, [0, 1, 3, 3])
+
+    def test_to_pyomo(self):
+        model = pyomo.ConcreteModel()
+        model.x = pyomo.Var(range(2), range(2), bounds=(0, 10))
+        x, offsets = flatten_vars(model.x)
+
+        self.assertEqual(offsets, [0])
+        self.assertIs(x[2], model.x[1, 0])
+
+        builder = SparseConstraintBuilder()
+        # x[i, 0] + x[i, 1] <= 5 for all i
+        added = builder.add_rows([0, 0, 1, 1], [0, 1, 2, 3], 1.0, ub=[5, 5])
+        # 2 <= x[0, 0] - x[1, 1] <= 3
+        builder.add_rows([0, 0], [0, 3], [1.0, -1.0], lb=[2], ub=[3])
+
+        self.assertEqual(added, range(0, 2))
+        self.assertEqual(builder.nrows, 3)
+
+        model.c = builder.to_pyomo(x)
+
+        self.assertEqual(len(model.c), 3)
+        self.assertEqual(str(model.c[2].body), "x[0,0] - x[1,1]")
+        self.assertEqual((model.c[2].lower, model.c[2].upper), (2, 3))
+        self.assertIsNone(model.c[0].lower)
+
+    def test_write_lp(self):
+        model = pyomo.ConcreteModel()
+        model.y = pyomo.Var(range(3), within=pyomo.Binary)
+        model.y[2].fix(0)
+        x, _ = flatten_vars(model.y)
+        col_lb, col_ub, integer = variable_bounds(x)
+
+        np.testing.assert_array_equal(col_ub, [1, 1, 0])
+        self.assertTrue(integer.all())
+
+        builder = SparseConstraintBuilder()
+        builder.add_rows([0, 0, 0], [0, 1, 2], 1.0, lb=[1], ub=[1])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "model.lp")
+            builder.write_lp(path, [2.0, 1.0, 0.0], col_lb, col_ub, integer)
+
+            with open(path) as file:
+                content = file.read()
+
+        self.assertIn("minimize\n obj: +2 x0 +1 x1\n", content)
+        self.assertIn(" r0: +1 x0 +1 x1 +1 x2 = 1\n", content)
+        self.assertIn("general\n x0\n x1\n x2\n", content)
+
+        with self.assertRaises(ValueError):
+            builder.add_rows([0], [0], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
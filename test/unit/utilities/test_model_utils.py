@@ -1,10 +1,19 @@
+import os
+import tempfile
 import unittest
 
 import pyomo.environ as pyomo
 import pytest
 from pyomo.opt import SolverStatus
 
-from mpa.utilities.model_utils import solve_model
+from mpa.utilities.file_utils import read_json_lines
+from mpa.utilities.model_utils import (
+    SolveRecorder,
+    SolverSession,
+    model_size,
+    parse_solver_log,
+    solve_model,
+)
 
 
 @pytest.mark.skip(
@@ -30,10 +39,143 @@ class TestModelUtils(unittest.TestCase):
         )
 
     def test_solve_model_with_timelimit(self):
-        ...
+        pass
 
     def test_solve_model_with_mipgap(self):
-        ...
+        pass
+
+
+@pytest.mark.skipif(
+    not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+    reason="Requires HiGHS (pip install highspy)",
+)
+class TestSolverSession(unittest.TestCase):
+    def build_model(self):
+        model = pyomo.ConcreteModel()
+        model.rhs = pyomo.Param(mutable=True, initialize=1.5)
+        model.x = pyomo.Var(within=pyomo.NonNegativeIntegers)
+        model.y = pyomo.Var(within=pyomo.NonNegativeReals)
+        model.obj = pyomo.Objective(expr=model.x + 3 * model.y)
+        model.cover = pyomo.Constraint(expr=model.x + model.y >= model.rhs)
+        model.cuts = pyomo.ConstraintList()
+        return model
+
+    def test_resolve_after_changes(self):
+        model = self.build_model()
+        session = SolverSession(model, solver="appsi_highs")
+
+        results = session.solve()
+        self.assertEqual(
+            results.solver.termination_condition, pyomo.TerminationCondition.optimal
+        )
+        self.assertAlmostEqual(pyomo.value(model.obj), 2)
+
+        # Change the right-hand side
+        session.set_value(model.rhs, 3.2)
+        session.solve()
+        self.assertAlmostEqual(pyomo.value(model.obj), 3 + 3 * 0.2)
+
+        # Add a cut
+        session.add_constraint(model.cuts.add(expr=model.x <= 2))
+        session.solve()
+        self.assertAlmostEqual(pyomo.value(model.x), 2)
+        self.assertAlmostEqual(pyomo.value(model.obj), 2 + 3 * 1.2)
+
+    def test_get_duals(self):
+        model = self.build_model()
+        model.x.domain = pyomo.NonNegativeReals
+        session = SolverSession(model, solver="appsi_highs")
+
+        session.solve()
+
+        self.assertAlmostEqual(session.get_duals([model.cover])[model.cover], 1)
+
+    def test_solve_without_loading(self):
+        model = self.build_model()
+        session = SolverSession(model, solver="appsi_highs")
+
+        results = session.solve(load_solutions=False)
+        self.assertIsNone(model.x.value)
+        session.load_solution()
+        self.assertAlmostEqual(pyomo.value(model.obj), 2)
+
+        # An infeasible model can be checked before anything is loaded
+        session.add_constraint(model.cuts.add(expr=model.x + model.y <= 1))
+        results = session.solve(load_solutions=False)
+        self.assertEqual(
+            results.solver.termination_condition,
+            pyomo.TerminationCondition.infeasible,
+        )
+
+    def test_not_persistent(self):
+        with self.assertRaises(ValueError):
+            SolverSession(self.build_model(), solver="highs")
+
+
+def build_knapsack(values: list = (3, 4, 5)) -> pyomo.ConcreteModel:
+    model = pyomo.ConcreteModel()
+    model.x = pyomo.Var(range(len(values)), within=pyomo.Binary)
+    model.obj = pyomo.Objective(
+        expr=sum(v * model.x[i] for i, v in enumerate(values)), sense=pyomo.maximize
+    )
+    model.capacity = pyomo.Constraint(expr=sum(model.x.values()) <= 2)
+    return model
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_model_size(self):
+        model = build_knapsack()
+        model.fixed = pyomo.Var(initialize=1)
+        model.fixed.fix()
+        model.link = pyomo.Constraint(expr=model.x[0] + model.fixed <= 2)
+
+        self.assertEqual(
+            model_size(model), {"variables": 4, "constraints": 2, "nonzeros": 4}
+        )
+
+    def test_parse_solver_log(self):
+        gurobi = (
+            "Explored 1234 nodes (56789 simplex iterations) in 3.21 seconds\n"
+            "Best objective 5.210000000000e+02, best bound 5.150000000000e+02, gap 1.1516%"
+        )
+        highs = "\n".join(
+            ["  Gap               1.25% (tolerance: 0.01%)", "  Nodes             330"]
+        )
+
+        self.assertEqual(parse_solver_log(gurobi)["nodes"], 1234)
+        self.assertAlmostEqual(parse_solver_log(gurobi)["gap"], 0.011516)
+        self.assertEqual(parse_solver_log(highs)["nodes"], 330)
+        self.assertAlmostEqual(parse_solver_log(highs)["gap"], 0.0125)
+        self.assertEqual(
+            parse_solver_log("  Gap               inf"), {"nodes": None, "gap": None}
+        )
+
+    @pytest.mark.skipif(
+        not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+        reason="Requires HiGHS (pip install highspy)",
+    )
+    def test_solve_recorder(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "solves.jsonl")
+            recorder = SolveRecorder(path, instance="knapsack")
+
+            for solver in ["appsi_highs", "highs"]:
+                model = recorder.build(build_knapsack)
+                recorder.solve(model, solver=solver)
+                record = recorder.finish(solver_name=solver)
+
+                self.assertEqual(record["instance"], "knapsack")
+                self.assertEqual(record["variables"], 3)
+                self.assertEqual(record["termination"], "optimal")
+                self.assertAlmostEqual(record["objective"], 9)
+                self.assertAlmostEqual(pyomo.value(model.obj), 9)
+                self.assertTrue({"build", "solve", "load"} <= set(record["phases"]))
+                self.assertAlmostEqual(
+                    record["total"],
+                    sum(phase["wall"] for phase in record["phases"].values()),
+                )
+
+            self.assertEqual(len(read_json_lines(path)), 2)
 
 
 if __name__ == "__main__":
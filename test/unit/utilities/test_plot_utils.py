@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from mpa.utilities.plot_utils import (
+    FigureWriter,
+    plot_routes,
+    plot_series,
+    render,
+)
+
+
+def failing_plot(fig):
+    raise ValueError("Nothing to plot")
+
+
+class TestPlotUtils(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp_dir.name, name)
+
+    def test_import_is_lazy(self):
+        code = (
+            "import sys, mpa.utilities.plot_utils; "
+            "print('matplotlib' in sys.modules)"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        self.assertEqual(output.stdout.strip(), "False")
+
+    def test_render_to_file(self):
+        render(plot_series, [1, 2, 3], [4, 5, 6], path=self.path("series.png"))
+        render(
+            plot_routes,
+            [[0, 1, 2, 0]],
+            [0, 1, 1],
+            [0, 0, 1],
+            path=self.path("routes.svg"),
+        )
+
+        self.assertGreater(os.path.getsize(self.path("series.png")), 0)
+        with open(self.path("routes.svg")) as file:
+            self.assertIn("<svg", file.read())
+
+    def test_figure_writer(self):
+        with FigureWriter(max_workers=2) as writer:
+            futures = [
+                writer.submit(plot_series, [0, i], [0, i], path=self.path(f"{i}.png"))
+                for i in range(4)
+            ]
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertEqual(
+            sorted(os.listdir(self.tmp_dir.name)), [f"{i}.png" for i in range(4)]
+        )
+
+    def test_figure_writer_collects_errors(self):
+        writer = FigureWriter()
+        writer.submit(failing_plot, path=self.path("failed.png"))
+
+        errors = writer.close()
+
+        self.assertEqual(errors, ["ValueError: Nothing to plot"])
+        self.assertFalse(os.path.exists(self.path("failed.png")))
@@ -0,0 +1,131 @@
+import unittest
+
+import numpy as np
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.utilities.route_utils import (
+    adjacency,
+    arc_values,
+    complete_arcs,
+    extract_routes,
+    knn_arcs,
+    make_arcs,
+    repair_arcs,
+)
+
+
+def make_solution(num_nodes: int, arcs: list) -> pyomo.ConcreteModel:
+    model = pyomo.ConcreteModel()
+    model.nodes = range(num_nodes)
+    model.x = pyomo.Var(model.nodes, model.nodes, within=pyomo.Binary)
+    for i in model.nodes:
+        for j in model.nodes:
+            model.x[i, j].value = 1 if (i, j) in arcs else 0
+    return model
+
+
+def build_tsp(data: dict, arcs: list = None) -> pyomo.ConcreteModel:
+    # An MTZ TSP over an arc set, like the build_model of the routing scripts
+    model = pyomo.ConcreteModel()
+    n = len(data["dist"])
+    model.arcs = make_arcs(data["dist"], arcs=arcs)
+    out_nodes, in_nodes = adjacency(model.arcs, n)
+    model.x = pyomo.Var(model.arcs, within=pyomo.Binary)
+    model.u = pyomo.Var(range(1, n), bounds=(1, n - 1))
+    model.obj = pyomo.Objective(
+        expr=sum(data["dist"][i][j] * model.x[i, j] for i, j in model.arcs)
+    )
+    model.degree = pyomo.ConstraintList()
+    for i in range(n):
+        model.degree.add(sum(model.x[i, j] for j in out_nodes[i]) == 1)
+        model.degree.add(sum(model.x[j, i] for j in in_nodes[i]) == 1)
+    model.mtz = pyomo.ConstraintList()
+    for i, j in model.arcs:
+        if i != 0 and j != 0:
+            model.mtz.add(model.u[i] - model.u[j] + n * model.x[i, j] <= n - 1)
+    return model
+
+
+def lp_bound(model: pyomo.ConcreteModel) -> float:
+    pyomo.TransformationFactory("core.relax_integer_vars").apply_to(model)
+    pyomo.SolverFactory("appsi_highs").solve(model)
+    return pyomo.value(model.obj)
+
+
+class TestRouteUtils(unittest.TestCase):
+    def test_arc_values(self):
+        model = make_solution(3, [(0, 2), (2, 0)])
+        model.x[0, 1].value = None  # Variables without a value are unused
+
+        self.assertEqual(arc_values(model.x).tolist(), [[0, 2], [2, 0]])
+
+    def test_extract_routes(self):
+        arcs = [(0, 3), (3, 1), (1, 0), (0, 2), (2, 4), (4, 0)]
+        model = make_solution(5, arcs)
+        q = [0, 1, 2, 3, 4]
+        dist = [[abs(i - j) for j in range(5)] for i in range(5)]
+
+        solution = extract_routes(model.x, q=q, dist=dist)
+
+        self.assertEqual(solution["routes"], [[0, 2, 4, 0], [0, 3, 1, 0]])
+        self.assertEqual(solution["loads"], [6, 4])
+        self.assertEqual(solution["lengths"], [8, 6])
+        self.assertEqual(solution["subtours"], [])
+
+    def test_extract_routes_with_subtours(self):
+        arcs = [(0, 1), (1, 0), (2, 3), (3, 4), (4, 2)]
+        model = make_solution(5, arcs)
+
+        solution = extract_routes(model.x)
+
+        self.assertEqual(solution["routes"], [[0, 1, 0]])
+        self.assertEqual(solution["loads"], None)
+        self.assertEqual(solution["subtours"], [[2, 3, 4]])
+
+    def test_extract_routes_sparse_index(self):
+        model = pyomo.ConcreteModel()
+        model.x = pyomo.Var([(0, 2), (2, 1), (1, 0), (1, 2)], within=pyomo.Binary)
+        model.x[0, 2].value = model.x[2, 1].value = model.x[1, 0].value = 1
+        model.x[1, 2].value = 0
+
+        self.assertEqual(extract_routes(model.x)["routes"], [[0, 2, 1, 0]])
+
+    def test_knn_arcs(self):
+        coords = np.array([[0, 0], [1, 0], [2, 0], [10, 0], [11, 0]])
+        dist = np.abs(coords[:, None, 0] - coords[None, :, 0])
+
+        arcs = knn_arcs(dist, k=1, symmetric=False)
+
+        # The depot arcs and the arc to the nearest neighbour of each node
+        depot_arcs = [(0, j) for j in range(1, 5)] + [(i, 0) for i in range(1, 5)]
+        self.assertEqual(sorted(arcs), sorted(depot_arcs + [(2, 1), (3, 4), (4, 3)]))
+        self.assertEqual(knn_arcs(dist, k=1), knn_arcs(coords=coords, k=1))
+        self.assertEqual(knn_arcs(dist, k=10), complete_arcs(5))
+        with self.assertRaises(ValueError):
+            knn_arcs(dist, k=0)
+
+    def test_adjacency(self):
+        out_nodes, in_nodes = adjacency([(0, 1), (0, 2), (2, 0)], 3)
+
+        self.assertEqual(out_nodes, [[1, 2], [], [0]])
+        self.assertEqual(in_nodes, [[2], [0], [0]])
+
+
+@pytest.mark.skipif(
+    not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+    reason="Requires HiGHS (pip install highspy)",
+)
+class TestRepairArcs(unittest.TestCase):
+    def test_repair_arcs(self):
+        rng = np.random.default_rng(3)
+        coords = rng.uniform(0, 10, (8, 2))
+        data = {"dist": np.linalg.norm(coords[:, None] - coords[None, :], axis=2)}
+        arcs = sorted({(i, (i + 1) % 8) for i in range(8)} | {(0, 4), (4, 0)})
+
+        repaired = repair_arcs(build_tsp, data, arcs)
+
+        self.assertTrue(set(arcs) <= set(repaired))
+        self.assertAlmostEqual(
+            lp_bound(build_tsp(data, arcs=repaired)), lp_bound(build_tsp(data)), 6
+        )
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from mpa.utilities.scenario_utils import ScenarioGenerator, generate_scenarios
+
+
+class TestScenarioUtils(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mean = [10.0, 0.0, 25.0]
+        self.std = [4.0, 1.0, 20.0]
+
+    def test_draw_is_prefix_stable(self):
+        grown = ScenarioGenerator(self.mean, self.std, seed=3)
+        small = grown.draw(5)
+        large = grown.draw(20)
+
+        fresh = ScenarioGenerator(self.mean, self.std, seed=3).draw(20)
+
+        self.assertEqual(large.shape, (20, 3))
+        np.testing.assert_array_equal(small, large[:5])
+        np.testing.assert_array_equal(large, fresh)
+
+    def test_normal_is_truncated(self):
+        scenarios = ScenarioGenerator(self.mean, self.std, seed=1).draw(1000)
+
+        self.assertTrue(np.all(scenarios >= 0))
+        self.assertTrue(np.any(scenarios[:, 1] == 0))
+
+    def test_lognormal_matches_moments(self):
+        with np.errstate(all="raise"):
+            scenarios = ScenarioGenerator(
+                self.mean, self.std, seed=1, distribution="lognormal"
+            ).draw(200000)
+
+        np.testing.assert_allclose(scenarios.mean(axis=0), self.mean, atol=0.3)
+        np.testing.assert_allclose(scenarios[:, [0, 2]].std(axis=0), [4, 20], rtol=0.05)
+        self.assertTrue(np.all(scenarios[:, 1] == 0))
+
+    def test_empirical_resamples_rows(self):
+        samples = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+        scenarios = ScenarioGenerator(
+            self.mean, distribution="empirical", samples=samples
+        ).draw(50)
+
+        for scenario in scenarios:
+            self.assertTrue(any(np.array_equal(scenario, row) for row in samples))
+        np.testing.assert_array_equal(
+            scenarios[:10],
+            ScenarioGenerator(
+                self.mean, distribution="empirical", samples=samples
+            ).draw(10),
+        )
+
+    def test_spawn_gives_independent_streams(self):
+        first, second = ScenarioGenerator(self.mean, self.std, seed=1).spawn(2)
+
+        self.assertFalse(np.array_equal(first.draw(5), second.draw(5)))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            ScenarioGenerator(self.mean, self.std, distribution="uniform")
+        with self.assertRaises(ValueError):
+            ScenarioGenerator(self.mean)
+        with self.assertRaises(ValueError):
+            ScenarioGenerator(self.mean, distribution="empirical")
+
+    def test_generate_scenarios(self):
+        data = {"demand_exp": self.mean, "demand_std": self.std}
+
+        scenarios = generate_scenarios(data, 4)
+
+        self.assertEqual(len(scenarios), 5)
+        self.assertEqual(scenarios[0], self.mean)
+        self.assertEqual(scenarios[1:3], generate_scenarios(data, 2)[1:])
@@ -1,6 +1,14 @@
 import unittest
 
-from mpa.utilities.support_functions import create_subsets
+import numpy as np
+
+from mpa.utilities.support_functions import (
+    create_subsets,
+    find_connected_components,
+    iter_subsets,
+    lp_norm_distance_matrix,
+    make_lp_morm_distance_matrix,
+)
 
 
 class TestSupportFunctions(unittest.TestCase):
@@ -33,6 +41,79 @@ class TestSupportFunctions(unittest.TestCase):
         # Test for n = 0
         self.assertEqual(create_subsets(0), [])
 
+    def test_iter_subsets(self):
+        items = ["a", "b", "c"]
+
+        self.assertEqual(len(list(iter_subsets(items))), 8)
+
+        self.assertEqual(
+            list(iter_subsets(items, min_size=1, max_size=2, order="size")),
+            [("a",), ("b",), ("c",), ("a", "b"), ("a", "c"), ("b", "c")],
+        )
+
+        # Consecutive Gray-code subsets differ in exactly one item
+        gray = list(iter_subsets(items, order="gray", as_bitmask=True))
+        self.assertEqual(sorted(gray), list(range(8)))
+        for previous, current in zip(gray, gray[1:]):
+            self.assertEqual((previous ^ current).bit_count(), 1)
+
+        self.assertEqual(
+            list(iter_subsets(items, min_size=2, order="size", as_bitmask=True)),
+            [0b011, 0b101, 0b110, 0b111],
+        )
+
+        # Consumers can stop early on huge item sets
+        subsets = iter_subsets(range(60), min_size=59, order="size")
+        self.assertEqual(len(next(subsets)), 59)
+
+        self.assertEqual(list(iter_subsets(items, min_size=3, max_size=2)), [])
+
+        with self.assertRaises(ValueError):
+            list(iter_subsets(items, order="random"))
+
+    def test_lp_norm_distance_matrix(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(0, 100, size=(23, 3))
+
+        for p in [1, 2, 3.5, np.inf]:
+            expected = np.array(
+                [[np.linalg.norm(a - b, p) for b in points] for a in points]
+            )
+            for symmetric in [False, True]:
+                dist = lp_norm_distance_matrix(
+                    points, p, symmetric=symmetric, block_size=5
+                )
+                self.assertTrue(dist.flags["C_CONTIGUOUS"])
+                np.testing.assert_allclose(dist, expected, rtol=1e-12)
+
+        dist = lp_norm_distance_matrix(points, 2, r=2, dtype=np.float32)
+        self.assertEqual(dist.dtype, np.float32)
+        np.testing.assert_allclose(dist, np.round(expected_l2(points), 2), atol=1e-3)
+
+        with self.assertRaises(ValueError):
+            lp_norm_distance_matrix(points, 0.5)
+
+    def test_make_lp_morm_distance_matrix(self):
+        data = {"x": [0, 3, 0], "y": [0, 4, 1]}
+
+        dist = make_lp_morm_distance_matrix(data, keys=["x", "y"], p=2, r=2)
+
+        np.testing.assert_array_equal(
+            dist, [[0.0, 5.0, 1.0], [5.0, 0.0, 4.24], [1.0, 4.24, 0.0]]
+        )
+
+    def test_find_connected_components(self):
+        arcs = [(0, 3), (3, 0), (1, 2), (2, 4), (4, 1)]
+
+        self.assertEqual(
+            find_connected_components(range(6), arcs), [[0, 3], [1, 2, 4], [5]]
+        )
+        self.assertEqual(find_connected_components([], []), [])
+
+
+def expected_l2(points: np.ndarray) -> np.ndarray:
+    return np.array([[np.linalg.norm(a - b) for b in points] for a in points])
+
 
 if __name__ == "__main__":
     unittest.main()
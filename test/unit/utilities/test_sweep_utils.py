@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+import pyomo.environ as pyomo
+import pytest
+
+from mpa.utilities.file_utils import read_json_lines
+from mpa.utilities.sweep_utils import make_grid, run_sweep
+
+
+def build_knapsack(capacity: float, bonus: float = 0) -> pyomo.ConcreteModel():
+    model = pyomo.ConcreteModel()
+    model.items = range(4)
+    model.x = pyomo.Var(model.items, within=pyomo.Binary)
+    model.obj = pyomo.Objective(
+        expr=sum((i + 1 + bonus) * model.x[i] for i in model.items),
+        sense=pyomo.maximize,
+    )
+    model.capacity = pyomo.Constraint(
+        expr=sum((i + 2) * model.x[i] for i in model.items) <= capacity
+    )
+    return model
+
+
+def build_broken(capacity: float) -> pyomo.ConcreteModel():
+    raise ValueError("no model")
+
+
+@pytest.mark.skipif(
+    not pyomo.SolverFactory("appsi_highs").available(exception_flag=False),
+    reason="Requires HiGHS (pip install highspy)",
+)
+class TestSweepUtils(unittest.TestCase):
+    def test_make_grid(self):
+        self.assertEqual(
+            make_grid(capacity=[2, 5], bonus=[0]),
+            [{"capacity": 2, "bonus": 0}, {"capacity": 5, "bonus": 0}],
+        )
+
+    def test_run_sweep(self):
+        grid = make_grid(capacity=[2, 5, 9], bonus=[0, 1])
+
+        results = run_sweep(build_knapsack, grid, solver="appsi_highs", max_workers=2)
+
+        self.assertEqual([row["capacity"] for row in results], [2, 2, 5, 5, 9, 9])
+        self.assertEqual([row["objective"] for row in results], [1, 2, 4, 5, 7, 9])
+        for row in results:
+            self.assertEqual(row["termination_condition"], "optimal")
+            self.assertGreaterEqual(row["wall_time"], 0)
+            self.assertIsNone(row["error"])
+
+    def test_resume_sweep(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "results.jsonl")
+
+            run_sweep(
+                build_knapsack,
+                make_grid(capacity=[2]),
+                solver="appsi_highs",
+                results_path=path,
+            )
+            results = run_sweep(
+                build_knapsack,
+                make_grid(capacity=[2, 5]),
+                solver="appsi_highs",
+                results_path=path,
+            )
+
+            self.assertEqual([row["objective"] for row in results], [1, 4])
+            # Only the new point was solved and appended
+            self.assertEqual(len(read_json_lines(path)), 2)
+
+    def test_resume_retries_failed_points(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "results.jsonl")
+
+            run_sweep(build_broken, make_grid(capacity=[2]), results_path=path)
+            results = run_sweep(
+                build_knapsack,
+                make_grid(capacity=[2]),
+                solver="appsi_highs",
+                results_path=path,
+            )
+
+            self.assertEqual(results[0]["objective"], 1)
+            self.assertIsNone(results[0]["error"])
+            self.assertEqual(len(read_json_lines(path)), 2)
+
+    def test_failing_point(self):
+        results = run_sweep(build_broken, make_grid(capacity=[2]), max_workers=1)
+
+        self.assertEqual(results[0]["status"], "error")
+        self.assertEqual(results[0]["error"], "ValueError: no model")
+
+
+if __name__ == "__main__":
+    unittest.main()